@@ -1,8 +1,16 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 from fastapi.params import Depends
+from fastapi.responses import ORJSONResponse
 
-from app.schemas.group_schema import (GroupCreate, GroupResponseForCreate,
-                                      GroupResponseForGet)
+from app.core.exceptions import PreconditionFailed
+from app.core.http_cache import (conditional_response, if_match_versions,
+                                 version_etag)
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.schemas.group_schema import (GroupCreate, GroupMemberCount,
+                                      GroupMembers, GroupMembersAdded,
+                                      GroupMembersPage, GroupMembersRemoved,
+                                      GroupResponseForCreate,
+                                      GroupResponseForGet, GroupResponsePage)
 from app.service.group_service import GroupService
 
 router = APIRouter()
@@ -14,47 +22,83 @@ async def create_group(
     group_service: GroupService = Depends(),
 ):
     try:
-        group_service.check_existing_group_name(group.name)
-        return group_service.add_new_group(group.name)
+        return await group_service.add_new_group(group.name)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=e.args[0])
     except KeyError as e:
         raise HTTPException(status_code=404, detail=e.args[0])
 
 
-@router.get("/group", response_model=list[GroupResponseForGet])
-async def get_all_groups(group_service: GroupService = Depends()):
+@router.get("/group", response_model=GroupResponsePage)
+async def get_all_groups(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    group_service: GroupService = Depends(),
+):
     try:
-        return group_service.get_all_groups()
+        page = await group_service.get_all_groups(limit, cursor)
+        return conditional_response(
+            request, GroupResponsePage.model_validate(page).model_dump()
+        )
     except ValueError as e:
         raise HTTPException(status_code=400, detail=e.args[0])
 
 
+# declared before /group/{group_id}, which would otherwise match it
+@router.get("/group/member-counts", response_model=list[GroupMemberCount])
+async def get_member_counts(group_service: GroupService = Depends()):
+    return await group_service.get_member_counts()
+
+
 @router.get("/group/{group_id}", response_model=GroupResponseForGet)
 async def get_group_by_id(
     group_id: str,
+    request: Request,
     group_service: GroupService = Depends(),
 ):
     try:
-        return group_service.get_group_by_id(group_id)
+        group = await group_service.get_group_by_id(group_id)
+        return conditional_response(request, group, version_etag(group["version"]))
     except KeyError as e:
         raise HTTPException(status_code=404, detail=e.args[0])
 
 
+@router.get("/group/{group_id}/members", response_model=GroupMembersPage)
+async def get_group_members(
+    group_id: str,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    group_service: GroupService = Depends(),
+):
+    try:
+        page = await group_service.get_group_members(group_id, limit, cursor)
+        # built from rows in the response shape already, like the user pages
+        return ORJSONResponse(page)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=e.args[0])
+
+
 @router.put("/group/{group_id}", response_model=GroupResponseForCreate)
 async def update_group(
     group_id: str,
     group_name: GroupCreate,
+    response: Response,
+    versions: set[int] | None = Depends(if_match_versions),
     group_service: GroupService = Depends(),
 ):
     try:
-        group_service.get_group_by_id(group_id)
-        group_service.check_existing_group_name(group_name.name)
-        return group_service.update_group(group_id, group_name.name)
+        group = await group_service.update_group(group_id, group_name.name, versions)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=e.args[0])
     except KeyError as e:
         raise HTTPException(status_code=404, detail=e.args[0])
+    except PreconditionFailed as e:
+        raise HTTPException(status_code=412, detail=e.args[0])
+    response.headers["ETag"] = version_etag(group.version)
+    return group
 
 
 @router.delete("/group/{group_id}")
@@ -63,7 +107,30 @@ async def delete_group_by_id(
     group_service: GroupService = Depends(),
 ):
     try:
-        group_service.get_group_by_id(group_id)
-        return group_service.delete_group_by_id(group_id)
+        return await group_service.delete_group_by_id(group_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+@router.post("/group/{group_id}/members", response_model=GroupMembersAdded)
+async def add_group_members(
+    group_id: str,
+    members: GroupMembers,
+    group_service: GroupService = Depends(),
+):
+    try:
+        return await group_service.add_members(group_id, members.user_ids)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+@router.delete("/group/{group_id}/members", response_model=GroupMembersRemoved)
+async def remove_group_members(
+    group_id: str,
+    members: GroupMembers,
+    group_service: GroupService = Depends(),
+):
+    try:
+        return await group_service.remove_members(group_id, members.user_ids)
     except KeyError as e:
         raise HTTPException(status_code=404, detail=e.args[0])
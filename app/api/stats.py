@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from app.core.cache import Cache, get_cache
+from app.core.group_registry import GroupRegistry, get_group_registry
+from app.core.http_client import UrlFetcher, get_url_fetcher
+from app.core.url_template_cache import (UrlTemplateCache,
+                                         get_url_template_cache)
+from app.service.job_service import JobService
+
+router = APIRouter()
+
+
+@router.get("/stats/fetcher")
+async def get_fetcher_stats(url_fetcher: UrlFetcher = Depends(get_url_fetcher)):
+    return url_fetcher.metrics()
+
+
+@router.get("/stats/url-templates")
+async def get_url_template_stats(
+    url_template_cache: UrlTemplateCache = Depends(get_url_template_cache),
+):
+    return url_template_cache.metrics()
+
+
+@router.get("/stats/cache")
+async def get_cache_stats(cache: Cache = Depends(get_cache)):
+    return cache.metrics()
+
+
+@router.get("/stats/group-registry")
+async def get_group_registry_stats(
+    registry: GroupRegistry = Depends(get_group_registry),
+):
+    return registry.metrics()
+
+
+@router.get("/stats/jobs")
+async def get_job_stats(job_service: JobService = Depends()):
+    return await job_service.get_job_metrics()
+
+
+@router.get("/metrics")
+async def get_metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
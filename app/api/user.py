@@ -1,8 +1,18 @@
-from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
+from typing import Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import ValidationError
 
-from app.schemas.user_schema import (UserCreate, UserResponse,
-                                     UserResponseForGet, UserUpdate)
+from app.core.exceptions import PreconditionFailed
+from app.core.http_cache import (conditional_response, if_match_versions,
+                                 version_etag)
+from app.core.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from app.schemas.user_schema import (UserBulkCreate, UserBulkDelete,
+                                     UserBulkDeleteResponse, UserBulkResponse,
+                                     UserCreate, UserResponse,
+                                     UserResponseForGet, UserResponsePage,
+                                     UserUpdate)
 from app.service.group_service import GroupService
 from app.service.user_service import UserService
 
@@ -12,36 +22,72 @@ router = APIRouter()
 @router.post("/user", response_model=UserResponse)
 async def create_user(
     user: UserCreate,
-    background_task: BackgroundTasks,
     user_service: UserService = Depends(),
     group_service: GroupService = Depends(),
 ):
     try:
-        group_service.get_group_by_id(user.user_group)
-        return user_service.add_new_user(
-            user.user_name, user.user_group, background_task
-        )
+        await group_service.get_group_by_id(user.user_group)
+        return await user_service.add_new_user(user.user_name, user.user_group)
     except KeyError as e:
         raise HTTPException(status_code=404, detail=e.args[0])
     except ValueError as e:
         raise HTTPException(status_code=400, detail=e.args[0])
 
 
-@router.get("/user", response_model=list[UserResponseForGet])
-async def get_all_users(user_service: UserService = Depends()):
+@router.post("/user/bulk", response_model=UserBulkResponse)
+async def create_users_bulk(
+    bulk: UserBulkCreate,
+    user_service: UserService = Depends(),
+    group_service: GroupService = Depends(),
+):
+    existing_group_ids = await group_service.get_existing_group_ids(
+        {user.user_group for user in bulk.users}
+    )
+    try:
+        return await user_service.add_new_users(bulk.users, existing_group_ids)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+
+
+@router.get("/user", response_model=UserResponsePage)
+async def get_all_users(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    name_prefix: str | None = None,
+    group_id: str | None = None,
+    user_service: UserService = Depends(),
+):
     try:
-        users = user_service.get_all_users()
-        return users
+        users = await user_service.get_all_users(limit, cursor, name_prefix, group_id)
+        # The page is built from database rows in the response shape already;
+        # returning a response skips re-validating every item on the way out
+        return ORJSONResponse(users)
     except ValidationError as e:
         raise HTTPException(status_code=400, detail=e.json())
     except ValueError as e:
         raise HTTPException(status_code=400, detail=e.args[0])
 
 
+@router.get("/user/export")
+async def export_users(
+    export_format: Literal["ndjson", "json"] = Query("ndjson", alias="format"),
+    user_service: UserService = Depends(),
+):
+    media_type = (
+        "application/x-ndjson" if export_format == "ndjson" else "application/json"
+    )
+    return StreamingResponse(
+        user_service.export_users(export_format), media_type=media_type
+    )
+
+
 @router.get("/user/{user_id}", response_model=UserResponseForGet)
-async def get_user_by_id(user_id: str, user_service: UserService = Depends()):
+async def get_user_by_id(
+    user_id: str, request: Request, user_service: UserService = Depends()
+):
     try:
-        return user_service.get_user_by_id(user_id)
+        user = await user_service.get_user_by_id(user_id)
+        return conditional_response(request, user, version_etag(user["version"]))
     except KeyError as e:
         raise HTTPException(status_code=404, detail=e.args[0])
 
@@ -50,22 +96,37 @@ async def get_user_by_id(user_id: str, user_service: UserService = Depends()):
 async def update_user(
     user_id: str,
     user_group: UserUpdate,
+    response: Response,
+    versions: set[int] | None = Depends(if_match_versions),
     user_service: UserService = Depends(),
 ):
     try:
-        user = user_service.check_user_validation(user_id)
+        user = await user_service.check_user_validation(user_id)
         user_service.check_group_in_user(user, user_group.group_name)
-        return user_service.update_user(user_id, user_group.user_name)
+        updated = await user_service.update_user(user, user_group.user_name, versions)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=e.args[0])
     except KeyError as e:
         raise HTTPException(status_code=404, detail=e.args[0])
+    except PreconditionFailed as e:
+        raise HTTPException(status_code=412, detail=e.args[0])
+    response.headers["ETag"] = version_etag(updated["version"])
+    return updated
 
 
 @router.delete("/user/{user_id}")
 async def delete_user_by_id(user_id: str, user_service: UserService = Depends()):
     try:
-        user_service.get_user_by_id(user_id)
-        return user_service.delete_user_by_id(user_id)
+        return await user_service.delete_user_by_id(user_id)
     except KeyError as e:
         raise HTTPException(status_code=404, detail=e.args[0])
+
+
+@router.delete("/user", response_model=UserBulkDeleteResponse)
+async def delete_users(bulk: UserBulkDelete, user_service: UserService = Depends()):
+    try:
+        return await user_service.delete_users(
+            bulk.user_ids, bulk.name_prefix, bulk.group_id
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=e.args[0])
@@ -0,0 +1,227 @@
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+import orjson
+from fastapi import Request
+
+from app.core.constants import CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS
+
+
+class Cache:
+    """
+    Read-through cache for JSON-compatible values. Backends implement the
+    storage, the hit/miss accounting lives here
+    """
+
+    backend = "none"
+
+    def __init__(self, ttl_seconds: float = CACHE_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get(self, key: str) -> Any:
+        value = await self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def get_or_load(self, key: str, load: Callable[[], Awaitable[Any]]):
+        value = await self.get(key)
+        if value is None:
+            # a value loaded while an invalidation landed may predate the
+            # write behind it, so it is returned but not cached
+            generation = await self._generation()
+            value = await load()
+            if value is not None:
+                await self._set_if_generation(key, value, generation)
+        return value
+
+    async def delete(self, *keys: str):
+        self.invalidations += len(keys)
+        await self._delete(keys)
+
+    async def delete_prefix(self, prefix: str):
+        self.invalidations += 1
+        await self._delete_prefix(prefix)
+
+    async def _get(self, key: str) -> Any:
+        return None
+
+    async def set(self, key: str, value: Any):
+        pass
+
+    async def _generation(self) -> Any:
+        """
+        Returns a token that changes with every invalidation
+        """
+        return None
+
+    async def _set_if_generation(self, key: str, value: Any, generation: Any):
+        pass
+
+    async def _delete(self, keys: tuple[str, ...]):
+        pass
+
+    async def _delete_prefix(self, prefix: str):
+        pass
+
+    async def close(self):
+        pass
+
+    def metrics(self) -> dict:
+        return {
+            "backend": self.backend,
+            "hits": self.hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+        }
+
+
+class MemoryCache(Cache):
+    """
+    In-process LRU cache; entries expire after the TTL and the least recently
+    used entry is evicted once max_entries is reached
+    """
+
+    backend = "memory"
+
+    def __init__(
+        self,
+        ttl_seconds: float = CACHE_TTL_SECONDS,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        clock=time.monotonic,
+    ):
+        super().__init__(ttl_seconds)
+        self.max_entries = max_entries
+        self.clock = clock
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._invalidation_count = 0
+
+    async def _get(self, key: str) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any):
+        self._entries[key] = (self.clock() + self.ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _generation(self) -> int:
+        return self._invalidation_count
+
+    async def _set_if_generation(self, key: str, value: Any, generation: Any):
+        if generation == self._invalidation_count:
+            await self.set(key, value)
+
+    async def _delete(self, keys: tuple[str, ...]):
+        self._invalidation_count += 1
+        for key in keys:
+            self._entries.pop(key, None)
+
+    async def _delete_prefix(self, prefix: str):
+        self._invalidation_count += 1
+        for key in [key for key in self._entries if key.startswith(prefix)]:
+            del self._entries[key]
+
+    def metrics(self) -> dict:
+        return {**super().metrics(), "entries": len(self._entries)}
+
+
+class RedisCache(Cache):
+    """
+    Cache shared between processes, backed by any client speaking the
+    redis.asyncio API. Expiry is left to the server. Invalidations count up
+    a shared generation key, so a fill racing an invalidation from any
+    process is dropped
+    """
+
+    backend = "redis"
+
+    def __init__(
+        self,
+        client,
+        ttl_seconds: float = CACHE_TTL_SECONDS,
+        namespace: str = "cache:",
+        generation_key: str = "cache-generation",
+    ):
+        super().__init__(ttl_seconds)
+        self.client = client
+        self.namespace = namespace
+        self.generation_key = generation_key
+
+    async def _get(self, key: str) -> Any:
+        value = await self.client.get(self.namespace + key)
+        return orjson.loads(value) if value is not None else None
+
+    async def set(self, key: str, value: Any):
+        await self.client.set(
+            self.namespace + key, orjson.dumps(value), px=int(self.ttl_seconds * 1000)
+        )
+
+    async def _generation(self) -> Any:
+        return await self.client.get(self.generation_key)
+
+    async def _set_if_generation(self, key: str, value: Any, generation: Any):
+        from redis.exceptions import WatchError
+
+        async with self.client.pipeline() as pipe:
+            try:
+                # the write is dropped if the generation moves before EXEC
+                await pipe.watch(self.generation_key)
+                if await pipe.get(self.generation_key) != generation:
+                    return
+                pipe.multi()
+                pipe.set(
+                    self.namespace + key,
+                    orjson.dumps(value),
+                    px=int(self.ttl_seconds * 1000),
+                )
+                await pipe.execute()
+            except WatchError:
+                pass
+
+    async def _delete(self, keys: tuple[str, ...]):
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.incr(self.generation_key)
+            if keys:
+                pipe.delete(*(self.namespace + key for key in keys))
+            await pipe.execute()
+
+    async def _delete_prefix(self, prefix: str):
+        # counted before the scan, so a fill that still passed the check
+        # landed before the scan and is deleted by it
+        await self.client.incr(self.generation_key)
+        keys = [
+            key
+            async for key in self.client.scan_iter(match=f"{self.namespace}{prefix}*")
+        ]
+        if keys:
+            await self.client.delete(*keys)
+
+    async def close(self):
+        await self.client.aclose()
+
+
+def create_cache(redis_url: str | None = None) -> Cache:
+    if not redis_url:
+        return MemoryCache()
+    import redis.asyncio
+
+    return RedisCache(redis.asyncio.from_url(redis_url))
+
+
+def get_cache(request: Request) -> Cache:
+    return request.app.state.cache
@@ -1,5 +1,57 @@
+from functools import lru_cache
+from typing import Literal
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
+
+class Settings(BaseSettings):
+    """
+    Application settings, read from the environment (or a .env file) by
+    their upper-cased field name, e.g. DATABASE_URL or DB_POOL_SIZE
+    """
+
+    model_config = SettingsConfigDict(env_file=".env", extra="ignore")
+
+    database_url: str = "sqlite+aiosqlite:///./users.db"
+    # JSON list of replica URLs reads are spread over, e.g. '["sqlite+..."]'
+    database_replica_urls: list[str] = []
+    database_replica_strategy: Literal["round_robin", "least_connections"] = (
+        "round_robin"
+    )
+    db_echo: bool = False
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int = 30000
+
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    sqlite_cache_size: int = -64000
+    sqlite_busy_timeout_ms: int = 30000
+
+    # 7 generates time-ordered primary keys, 4 fully random ones
+    uuid_version: Literal[4, 7] = 7
+
+    url_template_cache_path: str | None = None
+    # 0 when the enrichment workers run as a separate process
+    enrichment_workers: int = 1
+    # the in-process cache is used when no Redis URL is set
+    cache_redis_url: str | None = None
+
+
+@lru_cache
+def get_settings() -> Settings:
+    """
+    Returns the settings of the running application
+    """
+    return Settings()
+
+
 def get_sqlalchemy_db_url():
     """
     Returns the database URL for the application
     """
-    return "sqlite:///./users.db"
+    return get_settings().database_url
@@ -4,3 +4,54 @@ from enum import Enum
 class GroupType(str, Enum):
     REGULAR = "regular"
     ADMIN = "admin"
+
+
+class JobStatus(str, Enum):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class LoadStrategy(str, Enum):
+    # a separate SELECT ... IN for the collection, one row per user
+    SELECTIN = "selectin"
+    # a LEFT OUTER JOIN in the same statement, one row per membership
+    JOINED = "joined"
+    # accessing the relationship raises instead of lazily selecting it
+    RAISE = "raise"
+
+
+EXPORT_BATCH_SIZE = 1000
+BULK_CREATE_MAX_USERS = 10000
+# inserts of a bulk create, each planned against the names taken by then
+BULK_CREATE_ATTEMPTS = 3
+BULK_DELETE_MAX_USERS = 100000
+SQL_IN_CHUNK_SIZE = 500
+GROUP_MEMBERS_MAX_USERS = 100000
+
+HTTP_TIMEOUT_SECONDS = 10.0
+HTTP_CONNECT_TIMEOUT_SECONDS = 5.0
+HTTP_MAX_CONNECTIONS = 20
+HTTP_MAX_KEEPALIVE_CONNECTIONS = 10
+HTTP_KEEPALIVE_EXPIRY_SECONDS = 30.0
+HTTP_MAX_CONCURRENCY = 10
+HTTP_MAX_RETRIES = 3
+HTTP_RETRY_BACKOFF_SECONDS = 0.5
+
+URL_TEMPLATE_TTL_SECONDS = 3600.0
+URL_TEMPLATE_CACHE_SIZE = 128
+
+CACHE_TTL_SECONDS = 30.0
+CACHE_MAX_ENTRIES = 10000
+GROUP_REGISTRY_POLL_SECONDS = 1.0
+# clients may keep responses but must revalidate them with their ETag
+HTTP_CACHE_CONTROL = "private, no-cache"
+
+ENRICHMENT_URL = "https://api.github.com/"
+JOB_BATCH_SIZE = 100
+JOB_LEASE_SECONDS = 60.0
+JOB_POLL_INTERVAL_SECONDS = 1.0
+JOB_MAX_ATTEMPTS = 5
+JOB_RETRY_BACKOFF_SECONDS = 5.0
+JOB_THROUGHPUT_WINDOW_SECONDS = 60.0
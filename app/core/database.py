@@ -1,19 +1,210 @@
-from sqlalchemy import create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+import traceback
+from functools import partial
+from itertools import cycle
 
-from app.core.config import get_sqlalchemy_db_url
+import orjson
+from sqlalchemy import Select, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import (AsyncEngine, async_sessionmaker,
+                                    create_async_engine)
+from sqlalchemy.orm import Session, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
-SQLALCHEMY_DB_URL = get_sqlalchemy_db_url()
+from app.core.config import Settings, get_settings
+from app.core.instrumentation import instrument_engine
 
-engine = create_engine(SQLALCHEMY_DB_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def json_serializer(value) -> str:
+    return orjson.dumps(value).decode()
+
+
+# JSON columns are encoded and decoded with orjson instead of the json module
+JSON_ENGINE_OPTIONS = {
+    "json_serializer": json_serializer,
+    "json_deserializer": orjson.loads,
+}
+
+
+def set_sqlite_pragmas(settings: Settings, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA mmap_size={settings.sqlite_mmap_size}")
+    cursor.execute(f"PRAGMA cache_size={settings.sqlite_cache_size}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.sqlite_busy_timeout_ms}")
+    # SQLite only enforces foreign keys, and cascades deletes along them,
+    # when asked to on every connection
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+def release_failed_cursor(context):
+    """
+    Frees the driver cursor of a failed statement while its connection is
+    still checked out. The frames of the error's traceback hold the cursor,
+    in a reference cycle with the error, so it would otherwise be freed by a
+    later GC pass on the event loop. By then the pool may have handed the
+    connection to a request waiting for the write lock, and finalizing the
+    cursor blocks the loop on that connection for up to the busy timeout
+    """
+    pending: list[BaseException | None] = [context.original_exception]
+    seen = set()
+    while pending:
+        error = pending.pop()
+        if error is None or id(error) in seen:
+            continue
+        seen.add(id(error))
+        traceback.clear_frames(error.__traceback__)
+        pending += [error.__cause__, error.__context__]
+
+
+def is_foreign_key_violation(error: IntegrityError) -> bool:
+    """
+    Returns whether an integrity error was raised by a foreign key rather
+    than by a unique constraint
+    """
+    # PostgreSQL reports SQLSTATE 23503; SQLite only says so in the message
+    if getattr(error.orig, "sqlstate", None) == "23503":
+        return True
+    return "FOREIGN KEY constraint failed" in str(error.orig)
+
+
+def create_database_engine(settings: Settings, **options) -> AsyncEngine:
+    """
+    Creates the async engine described by settings. Extra options are passed
+    to create_async_engine and take precedence
+    """
+    url = make_url(settings.database_url)
+    engine_options = {
+        "echo": settings.db_echo,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+        **JSON_ENGINE_OPTIONS,
+    }
+    # in-memory SQLite runs on a single shared connection, not a sized pool;
+    # file SQLite would default to NullPool and reconnect on every checkout
+    if url.database not in (None, "", ":memory:"):
+        engine_options.update(
+            poolclass=AsyncAdaptedQueuePool,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+        )
+    if url.get_driver_name() == "asyncpg":
+        engine_options["connect_args"] = {
+            "server_settings": {
+                "statement_timeout": str(settings.db_statement_timeout_ms)
+            }
+        }
+    elif url.get_backend_name() == "postgresql":
+        engine_options["connect_args"] = {
+            "options": f"-c statement_timeout={settings.db_statement_timeout_ms}"
+        }
+    engine_options.update(options)
+    engine = create_async_engine(url, **engine_options)
+    if url.get_backend_name() == "sqlite":
+        event.listen(
+            engine.sync_engine, "connect", partial(set_sqlite_pragmas, settings)
+        )
+        event.listen(engine.sync_engine, "handle_error", release_failed_cursor)
+    instrument_engine(engine)
+    return engine
+
+
+class ReplicaRouter:
+    """
+    Picks the replica engine a read is sent to, either in turn or the one
+    with the fewest checked out connections
+    """
+
+    def __init__(
+        self,
+        primary: AsyncEngine,
+        replicas: list[AsyncEngine],
+        strategy: str = "round_robin",
+    ):
+        self.primary = primary
+        self.replicas = replicas
+        self.strategy = strategy
+        self._replica_cycle = cycle(replicas)
+
+    def choose_replica(self) -> AsyncEngine:
+        if self.strategy == "least_connections":
+            checked_out = []
+            for replica in self.replicas:
+                pool = replica.pool
+                # only a queue pool counts its connections; replicas on a
+                # null or static pool, as SQLite ones can be, take turns
+                if not isinstance(pool, QueuePool):
+                    return next(self._replica_cycle)
+                checked_out.append(pool.checkedout())
+            return self.replicas[checked_out.index(min(checked_out))]
+        return next(self._replica_cycle)
+
+
+class RoutingSession(Session):
+    """
+    Sends plain SELECTs to a replica and everything else to the primary. Once
+    a session has written, or read with the primary execution option, it
+    stays on the primary, so it reads its own writes and what it is about to
+    write is not read from a replica that lags behind
+    """
+
+    def __init__(self, router: ReplicaRouter, **kwargs):
+        super().__init__(**kwargs)
+        self.router = router
+        self.use_primary = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        is_read = (
+            isinstance(clause, Select)
+            and clause._for_update_arg is None
+            and not clause.get_execution_options().get("primary", False)
+        )
+        if self._flushing or self.use_primary or not is_read:
+            self.use_primary = True
+            return self.router.primary.sync_engine
+        return self.router.choose_replica().sync_engine
+
+
+def create_session_factory(
+    primary: AsyncEngine,
+    replicas: list[AsyncEngine] | None = None,
+    strategy: str = "round_robin",
+) -> async_sessionmaker:
+    if not replicas:
+        return async_sessionmaker(bind=primary, autoflush=False, expire_on_commit=False)
+    return async_sessionmaker(
+        sync_session_class=RoutingSession,
+        router=ReplicaRouter(primary, replicas, strategy),
+        autoflush=False,
+        expire_on_commit=False,
+    )
+
+
+settings = get_settings()
+engine = create_database_engine(settings)
+replica_engines = [
+    create_database_engine(settings.model_copy(update={"database_url": url}))
+    for url in settings.database_replica_urls
+]
+SessionLocal = create_session_factory(
+    engine, replica_engines, settings.database_replica_strategy
+)
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def dispose_engines():
+    """
+    Closes the pooled connections of the primary and every replica engine;
+    aiosqlite connections left open keep their threads, and the process,
+    alive at exit
+    """
+    for database_engine in [engine, *replica_engines]:
+        await database_engine.dispose()
+
+
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,4 @@
+class PreconditionFailed(Exception):
+    """
+    Raised when a conditional write expects a version the row no longer has
+    """
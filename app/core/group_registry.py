@@ -0,0 +1,63 @@
+import asyncio
+from types import MappingProxyType
+from typing import Mapping, NamedTuple
+
+from fastapi import Request
+
+
+class RegisteredGroup(NamedTuple):
+    uuid: str
+    name: str
+    version: int
+
+
+class GroupRegistry:
+    """
+    Every group of the database held in memory, by id. A load swaps in a
+    new read-only map at once, so readers never see a half-built registry.
+    The registry is stale once the group registry version in the database
+    moved past the one it was loaded at
+    """
+
+    def __init__(self):
+        self.version: int | None = None
+        self.by_id: Mapping[str, RegisteredGroup] = MappingProxyType({})
+        self.loads = 0
+        self._lock = asyncio.Lock()
+
+    async def load(self, group_repository):
+        # the version is read first, so a write landing in between makes the
+        # registry look stale rather than current
+        version = await group_repository.get_registry_version()
+        groups = [
+            RegisteredGroup(group.uuid, group.name, group.version)
+            for group in await group_repository.get_every_group()
+        ]
+        if self.version is not None and version < self.version:
+            return
+        # no await between the assignments, so no reader sees them half done
+        self.by_id = MappingProxyType({group.uuid: group for group in groups})
+        self.version = version
+        self.loads += 1
+
+    async def refresh(self, group_repository) -> bool:
+        """
+        Reloads the registry if the database moved past its version and
+        returns whether it did
+        """
+        loads = self.loads
+        async with self._lock:
+            # another task reloaded while this one waited for the lock
+            if self.loads != loads:
+                return True
+            if await group_repository.get_registry_version() == self.version:
+                return False
+            await self.load(group_repository)
+            return True
+
+    def metrics(self) -> dict:
+        return {"version": self.version, "groups": len(self.by_id), "loads": self.loads}
+
+
+def get_group_registry(request: Request) -> GroupRegistry:
+    return request.app.state.group_registry
@@ -0,0 +1,68 @@
+import hashlib
+
+import orjson
+from fastapi import Request, Response
+
+from app.core.constants import HTTP_CACHE_CONTROL
+
+
+def make_etag(body: bytes) -> str:
+    return f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+
+
+def version_etag(version: int) -> str:
+    return f'"{version}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Returns whether the If-None-Match header of the request lists the ETag;
+    weak and strong forms of the same tag compare equal
+    """
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def not_modified(etag: str) -> Response:
+    return Response(
+        status_code=304, headers={"ETag": etag, "Cache-Control": HTTP_CACHE_CONTROL}
+    )
+
+
+def if_match_versions(request: Request) -> set[int] | None:
+    """
+    Returns the row versions listed in the If-Match header, or None when any
+    version is acceptable. Weak tags never match a write
+    """
+    header = request.headers.get("if-match")
+    if header is None or header.strip() == "*":
+        return None
+    versions = set()
+    for tag in header.split(","):
+        value = tag.strip().removeprefix('"').removesuffix('"')
+        if value.isdigit():
+            versions.add(int(value))
+    return versions
+
+
+def conditional_response(request: Request, content, etag: str | None = None):
+    """
+    Returns the content as JSON with an ETag and Cache-Control header, or an
+    empty 304 when the client already holds the same representation. Without
+    a row version ETag the tag is a hash of the encoded body
+    """
+    if etag is not None and etag_matches(request, etag):
+        return not_modified(etag)
+    body = orjson.dumps(content)
+    if etag is None:
+        etag = make_etag(body)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+    return Response(
+        body,
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": HTTP_CACHE_CONTROL},
+    )
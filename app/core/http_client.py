@@ -0,0 +1,103 @@
+import asyncio
+
+import httpx
+from fastapi import Request
+
+from app.core.constants import (HTTP_CONNECT_TIMEOUT_SECONDS,
+                                HTTP_KEEPALIVE_EXPIRY_SECONDS,
+                                HTTP_MAX_CONCURRENCY, HTTP_MAX_CONNECTIONS,
+                                HTTP_MAX_KEEPALIVE_CONNECTIONS,
+                                HTTP_MAX_RETRIES, HTTP_RETRY_BACKOFF_SECONDS,
+                                HTTP_TIMEOUT_SECONDS)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def create_http_client(**kwargs) -> httpx.AsyncClient:
+    """
+    Returns the application-wide HTTP client with pooled keep-alive connections
+    """
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(
+            HTTP_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS
+        ),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY_SECONDS,
+        ),
+        **kwargs,
+    )
+
+
+class UrlFetcher:
+    """
+    Fetches upstream URLs through a shared client, with at most max_concurrency
+    requests in flight and exponential backoff on transient failures
+    """
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        max_concurrency: int = HTTP_MAX_CONCURRENCY,
+        max_retries: int = HTTP_MAX_RETRIES,
+        backoff_seconds: float = HTTP_RETRY_BACKOFF_SECONDS,
+    ):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.waiting = 0
+        self.in_flight = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retried = 0
+
+    async def get(self, url: str, headers: dict | None = None) -> httpx.Response:
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        try:
+            response = await self._get_with_retry(url, headers)
+        except httpx.HTTPError:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+        self.succeeded += 1
+        return response
+
+    async def _get_with_retry(self, url: str, headers: dict | None):
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = await self.client.get(url, headers=headers)
+            except httpx.TransportError:
+                if last_attempt:
+                    raise
+            else:
+                if response.status_code == httpx.codes.NOT_MODIFIED:
+                    return response
+                if response.status_code not in RETRYABLE_STATUS_CODES or last_attempt:
+                    return response.raise_for_status()
+            self.retried += 1
+            await asyncio.sleep(self.backoff_seconds * 2**attempt)
+
+    def metrics(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": self.waiting,
+            "in_flight": self.in_flight,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retried": self.retried,
+        }
+
+
+def get_url_fetcher(request: Request) -> UrlFetcher:
+    return request.app.state.url_fetcher
@@ -0,0 +1,76 @@
+import os
+import time
+import uuid
+
+from sqlalchemy import LargeBinary
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.types import TypeDecorator
+
+from app.core.config import get_settings
+
+
+def uuid7() -> uuid.UUID:
+    """
+    Returns a time-ordered UUID (RFC 9562 version 7): a millisecond Unix
+    timestamp followed by random bits
+    """
+    timestamp_ms = time.time_ns() // 1_000_000
+    value = (timestamp_ms & 0xFFFFFFFFFFFF) << 80
+    value |= int.from_bytes(os.urandom(10), "big")
+    value = value & ~(0xF << 76) | 0x7 << 76
+    value = value & ~(0x3 << 62) | 0x2 << 62
+    return uuid.UUID(int=value)
+
+
+def new_uuid() -> str:
+    """
+    Returns a new primary key; version 7 keeps inserts at the end of the
+    index, version 4 scatters them over it
+    """
+    if get_settings().uuid_version == 7:
+        return str(uuid7())
+    return str(uuid.uuid4())
+
+
+def canonical_uuid(value: str) -> str | None:
+    """
+    Returns the lower-case, hyphenated spelling of a UUID, the one keys are
+    read back in, or None when the string is not a UUID
+    """
+    try:
+        return str(uuid.UUID(value))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+class GUID(TypeDecorator):
+    """
+    UUID stored as 16 bytes on SQLite and as the native uuid type on
+    PostgreSQL, handled as its canonical string in Python. A string that is
+    not a UUID binds as NULL, so looking it up matches nothing
+    """
+
+    impl = LargeBinary(16)
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect):
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(postgresql.UUID(as_uuid=True))
+        return dialect.type_descriptor(LargeBinary(16))
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if not isinstance(value, uuid.UUID):
+            try:
+                value = uuid.UUID(value)
+            except (AttributeError, TypeError, ValueError):
+                return None
+        return value if dialect.name == "postgresql" else value.bytes
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        return str(uuid.UUID(bytes=value))
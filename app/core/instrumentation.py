@@ -0,0 +1,146 @@
+import logging
+import time
+from contextvars import ContextVar
+
+import orjson
+from prometheus_client import Histogram
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time spent handling a request",
+    ["method", "route", "status"],
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries",
+    "SQL statements executed while handling a request",
+    ["method", "route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+REQUEST_DB_SECONDS = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent in the database while handling a request",
+    ["method", "route"],
+)
+
+
+class QueryStats:
+    """
+    SQL statements executed on behalf of one request: how many, how long they
+    took in total and which one was the slowest
+    """
+
+    __slots__ = ("count", "seconds", "slowest_seconds", "slowest_statement")
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.slowest_seconds = 0.0
+        self.slowest_statement: str | None = None
+
+    def record(self, statement: str, seconds: float):
+        self.count += 1
+        self.seconds += seconds
+        if seconds >= self.slowest_seconds:
+            self.slowest_seconds = seconds
+            self.slowest_statement = statement
+
+
+current_query_stats: ContextVar[QueryStats | None] = ContextVar(
+    "current_query_stats", default=None
+)
+
+
+def before_cursor_execute(connection, cursor, statement, parameters, context, many):
+    if current_query_stats.get() is not None:
+        context.instrumentation_started = time.perf_counter()
+
+
+def after_cursor_execute(connection, cursor, statement, parameters, context, many):
+    stats = current_query_stats.get()
+    started = getattr(context, "instrumentation_started", None)
+    if stats is not None and started is not None:
+        stats.record(statement, time.perf_counter() - started)
+
+
+def instrument_engine(engine: AsyncEngine):
+    """
+    Counts and times the statements an engine executes into the QueryStats of
+    the request being handled, if any
+    """
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+
+def server_timing(stats: QueryStats, app_seconds: float) -> str:
+    return (
+        f'db;dur={stats.seconds * 1000:.2f};desc="{stats.count} queries", '
+        f"app;dur={app_seconds * 1000:.2f}"
+    )
+
+
+class InstrumentationMiddleware:
+    """
+    ASGI middleware reporting, for every HTTP request, the statement count and
+    database time in a Server-Timing header, a structured log line and the
+    Prometheus histograms labelled by route template
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                header = server_timing(stats, time.perf_counter() - started)
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (b"server-timing", header.encode()),
+                    ],
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_query_stats.reset(token)
+            self.observe(scope, status, stats, time.perf_counter() - started)
+
+    def observe(self, scope, status: int, stats: QueryStats, seconds: float):
+        route = scope.get("route")
+        # unmatched paths share one label so probes cannot grow the series
+        path = getattr(route, "path", "unmatched")
+        method = scope["method"]
+        REQUEST_LATENCY.labels(method, path, str(status)).observe(seconds)
+        REQUEST_QUERIES.labels(method, path).observe(stats.count)
+        REQUEST_DB_SECONDS.labels(method, path).observe(stats.seconds)
+        logger.info(
+            orjson.dumps(
+                {
+                    "method": method,
+                    "route": path,
+                    "status": status,
+                    "duration_ms": round(seconds * 1000, 2),
+                    "db_queries": stats.count,
+                    "db_ms": round(stats.seconds * 1000, 2),
+                    "slowest_query_ms": round(stats.slowest_seconds * 1000, 2),
+                    "slowest_query": stats.slowest_statement,
+                }
+            ).decode()
+        )
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import os
+import time
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+
+import httpx
+from fastapi import Request
+
+from app.core.constants import (URL_TEMPLATE_CACHE_SIZE,
+                                URL_TEMPLATE_TTL_SECONDS)
+from app.core.http_client import UrlFetcher
+
+
+@dataclass
+class CachedTemplate:
+    body: str
+    etag: str | None
+    expires_at: float
+
+
+class UrlTemplateCache:
+    """
+    LRU cache of upstream URL templates. Entries are served from memory until
+    their TTL expires, then revalidated with a conditional GET on their ETag
+    """
+
+    def __init__(
+        self,
+        url_fetcher: UrlFetcher,
+        ttl_seconds: float = URL_TEMPLATE_TTL_SECONDS,
+        max_entries: int = URL_TEMPLATE_CACHE_SIZE,
+        persist_path: str | None = None,
+        clock=time.time,
+    ):
+        self.url_fetcher = url_fetcher
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.clock = clock
+        self._entries: OrderedDict[str, CachedTemplate] = OrderedDict()
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._save_lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        if persist_path and os.path.exists(persist_path):
+            self._load()
+
+    async def get(self, url: str) -> str:
+        entry = self._fresh_entry(url)
+        if entry is None:
+            async with self._locks.setdefault(url, asyncio.Lock()):
+                entry = self._fresh_entry(url) or await self._fetch(url)
+        return entry.body
+
+    def _fresh_entry(self, url: str) -> CachedTemplate | None:
+        entry = self._entries.get(url)
+        if entry is None or entry.expires_at <= self.clock():
+            return None
+        self._entries.move_to_end(url)
+        self.hits += 1
+        return entry
+
+    async def _fetch(self, url: str) -> CachedTemplate:
+        stale = self._entries.get(url)
+        headers = {"If-None-Match": stale.etag} if stale and stale.etag else None
+        response = await self.url_fetcher.get(url, headers=headers)
+        expires_at = self.clock() + self.ttl_seconds
+        if stale is not None and response.status_code == httpx.codes.NOT_MODIFIED:
+            self.revalidations += 1
+            entry = CachedTemplate(stale.body, stale.etag, expires_at)
+        else:
+            self.misses += 1
+            entry = CachedTemplate(
+                response.text, response.headers.get("ETag"), expires_at
+            )
+        self._entries[url] = entry
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        if self.persist_path:
+            # the snapshot is taken on the event loop, where the entries are
+            # mutated, and only the file write runs on a worker thread
+            snapshot = {url: asdict(entry) for url, entry in self._entries.items()}
+            async with self._save_lock:
+                await asyncio.to_thread(self._save, self.persist_path, snapshot)
+        return entry
+
+    def _load(self):
+        with open(self.persist_path) as file:
+            stored = json.load(file)
+        for url, entry in list(stored.items())[-self.max_entries :]:
+            self._entries[url] = CachedTemplate(**entry)
+
+    def _save(self, path: str, snapshot: dict):
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w") as file:
+            json.dump(snapshot, file)
+        os.replace(temporary_path, path)
+
+    def metrics(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidations": self.revalidations,
+        }
+
+
+def get_url_template_cache(request: Request) -> UrlTemplateCache:
+    return request.app.state.url_template_cache
@@ -1,8 +1,78 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.api import group, stats, user
+from app.core.cache import create_cache
+from app.core.config import get_settings
+from app.core.constants import GROUP_REGISTRY_POLL_SECONDS
+from app.core.database import SessionLocal, dispose_engines
+from app.core.group_registry import GroupRegistry
+from app.core.http_client import UrlFetcher, create_http_client
+from app.core.instrumentation import InstrumentationMiddleware
+from app.core.url_template_cache import UrlTemplateCache
+from app.repository.group_repository import GroupRepository
+from app.worker.enrichment_worker import run_workers
+
+logger = logging.getLogger(__name__)
+
+
+async def watch_group_registry(
+    registry: GroupRegistry, interval: float = GROUP_REGISTRY_POLL_SECONDS
+):
+    """
+    Reloads the group registry whenever another process wrote a group
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with SessionLocal() as db:
+                await registry.refresh(GroupRepository(db))
+        except SQLAlchemyError:
+            logger.exception("Refreshing the group registry failed")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    async with create_http_client() as client:
+        app.state.url_fetcher = UrlFetcher(client)
+        app.state.url_template_cache = UrlTemplateCache(
+            app.state.url_fetcher, persist_path=settings.url_template_cache_path
+        )
+        app.state.cache = create_cache(settings.cache_redis_url)
+        app.state.group_registry = GroupRegistry()
+        async with SessionLocal() as db:
+            await app.state.group_registry.load(GroupRepository(db))
+        registry_watcher = asyncio.create_task(
+            watch_group_registry(app.state.group_registry)
+        )
+        workers = asyncio.create_task(
+            run_workers(
+                settings.enrichment_workers,
+                SessionLocal,
+                app.state.url_template_cache,
+                app.state.cache,
+            )
+        )
+        yield
+        workers.cancel()
+        registry_watcher.cancel()
+        with suppress(asyncio.CancelledError):
+            await workers
+        with suppress(asyncio.CancelledError):
+            await registry_watcher
+        await app.state.cache.close()
+        await dispose_engines()
 
-from app.api import group, user
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
+app.add_middleware(InstrumentationMiddleware)
 
 app.include_router(user.router)
 app.include_router(group.router)
+app.include_router(stats.router)
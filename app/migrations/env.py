@@ -2,11 +2,15 @@ from logging.config import fileConfig
 
 from alembic import context
 from sqlalchemy import engine_from_config, pool
+from sqlalchemy.engine import make_url
 
+from app.core.config import get_settings
 from app.core.database import Base
 from app.model.group_model import Group
 from app.model.user_group import UserGroup
 from app.model.user_model import User
+from app.model.enrichment_job import EnrichmentJob
+from app.model.group_registry_version import GroupRegistryVersion
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -17,6 +21,23 @@ config = context.config
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+# Migrations run on the database the application is configured for, with the
+# synchronous driver matching the application's async one.
+SYNC_DRIVERS = {
+    "sqlite+aiosqlite": "sqlite",
+    "postgresql+asyncpg": "postgresql",
+}
+
+
+def get_sync_database_url() -> str:
+    url = make_url(get_settings().database_url)
+    url = url.set(drivername=SYNC_DRIVERS.get(url.drivername, url.drivername))
+    return url.render_as_string(hide_password=False)
+
+
+# "%" is escaped for the config parser, e.g. in URL-encoded passwords
+config.set_main_option("sqlalchemy.url", get_sync_database_url().replace("%", "%%"))
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 # from myapp import mymodel
@@ -0,0 +1,30 @@
+"""row versions
+
+Revision ID: 2f6a9c1d8e47
+Revises: 7b3f0c9e4d21
+Create Date: 2026-10-18 16:02:11.482913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = '2f6a9c1d8e47'
+down_revision: Union[str, None] = '7b3f0c9e4d21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # existing rows start at version 1, like rows inserted from now on
+    op.add_column('user', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('group', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('group') as batch_op:
+        batch_op.drop_column('version')
+    with op.batch_alter_table('user') as batch_op:
+        batch_op.drop_column('version')
@@ -0,0 +1,51 @@
+"""cascade memberships
+
+Revision ID: 3a7d5c2b9f64
+Revises: b4e9d27c6f15
+Create Date: 2026-10-18 19:12:36.408215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '3a7d5c2b9f64'
+down_revision: Union[str, None] = 'b4e9d27c6f15'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FOREIGN_KEYS = [
+    ('user_group_user_uuid_fkey', 'user_uuid', 'user'),
+    ('user_group_group_uuid_fkey', 'group_uuid', 'group'),
+]
+# SQLite keeps the foreign keys unnamed; the convention names them as
+# PostgreSQL does, so the batch can drop them
+NAMING_CONVENTION = {'fk': '%(table_name)s_%(column_0_name)s_fkey'}
+
+
+def _replace_foreign_keys(ondelete) -> None:
+    with op.batch_alter_table(
+        'user_group', naming_convention=NAMING_CONVENTION
+    ) as batch_op:
+        for name, _, _ in FOREIGN_KEYS:
+            batch_op.drop_constraint(name, type_='foreignkey')
+        for name, column_name, referred_table in FOREIGN_KEYS:
+            batch_op.create_foreign_key(
+                name, referred_table, [column_name], ['uuid'], ondelete=ondelete
+            )
+
+
+def upgrade() -> None:
+    # memberships left behind by rows deleted while SQLite did not enforce
+    # the foreign keys would fail them from now on
+    op.execute(
+        'DELETE FROM user_group'
+        ' WHERE user_uuid NOT IN (SELECT uuid FROM "user")'
+        ' OR group_uuid NOT IN (SELECT uuid FROM "group")'
+    )
+    _replace_foreign_keys('CASCADE')
+
+
+def downgrade() -> None:
+    _replace_foreign_keys(None)
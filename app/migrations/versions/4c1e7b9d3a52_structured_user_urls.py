@@ -0,0 +1,48 @@
+"""structured user urls
+
+Revision ID: 4c1e7b9d3a52
+Revises: 9a70de2f2ef8
+Create Date: 2026-10-18 11:02:17.530114
+
+"""
+import json
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4c1e7b9d3a52'
+down_revision: Union[str, None] = '9a70de2f2ef8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+user = sa.table('user', sa.column('uuid', sa.String()), sa.column('urls', sa.JSON()))
+
+
+def _convert_urls(convert) -> None:
+    connection = op.get_bind()
+    rows = connection.execute(
+        sa.select(user.c.uuid, user.c.urls).where(user.c.urls.is_not(None))
+    ).all()
+    updates = [
+        {'user_uuid': uuid, 'new_urls': convert(urls)} for uuid, urls in rows
+    ]
+    if updates:
+        connection.execute(
+            user.update()
+            .where(user.c.uuid == sa.bindparam('user_uuid'))
+            .values(urls=sa.bindparam('new_urls')),
+            updates,
+        )
+
+
+def upgrade() -> None:
+    # urls used to hold the upstream response text inside a JSON string;
+    # store the parsed document instead so reads need no second decode.
+    _convert_urls(lambda urls: json.loads(urls) if isinstance(urls, str) else urls)
+
+
+def downgrade() -> None:
+    _convert_urls(lambda urls: urls if isinstance(urls, str) else json.dumps(urls))
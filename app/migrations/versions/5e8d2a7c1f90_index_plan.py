@@ -0,0 +1,37 @@
+"""index plan
+
+Revision ID: 5e8d2a7c1f90
+Revises: 4c1e7b9d3a52
+Create Date: 2026-10-18 13:20:45.209817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '5e8d2a7c1f90'
+down_revision: Union[str, None] = '4c1e7b9d3a52'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # uuid columns are primary keys and already indexed by them; the JSON
+    # urls blob is never searched and only made every enrichment write slower
+    op.drop_index(op.f('ix_user_urls'), table_name='user')
+    op.drop_index(op.f('ix_user_uuid'), table_name='user')
+    op.drop_index(op.f('ix_group_uuid'), table_name='group')
+    # user names are looked up to keep them unique, so the index enforces it
+    op.drop_index(op.f('ix_user_name'), table_name='user')
+    op.create_index(op.f('ix_user_name'), 'user', ['name'], unique=True)
+    op.create_index(op.f('ix_user_group_group_uuid'), 'user_group', ['group_uuid'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_user_group_group_uuid'), table_name='user_group')
+    op.drop_index(op.f('ix_user_name'), table_name='user')
+    op.create_index(op.f('ix_user_name'), 'user', ['name'], unique=False)
+    op.create_index(op.f('ix_group_uuid'), 'group', ['uuid'], unique=False)
+    op.create_index(op.f('ix_user_uuid'), 'user', ['uuid'], unique=False)
+    op.create_index(op.f('ix_user_urls'), 'user', ['urls'], unique=False)
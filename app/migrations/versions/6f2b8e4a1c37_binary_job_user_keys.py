@@ -0,0 +1,66 @@
+"""binary job user keys
+
+Revision ID: 6f2b8e4a1c37
+Revises: 3a7d5c2b9f64
+Create Date: 2026-10-18 21:04:52.317604
+
+"""
+import uuid
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '6f2b8e4a1c37'
+down_revision: Union[str, None] = '3a7d5c2b9f64'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _convert_keys(read_type, write_type, convert) -> None:
+    # SQLite does not type its columns, so the keys are rewritten in place
+    # before the declared type changes
+    connection = op.get_bind()
+    read = sa.table('enrichment_job', sa.column('user_uuid', read_type))
+    write = sa.table('enrichment_job', sa.column('user_uuid', write_type))
+    keys = connection.execute(sa.select(read.c.user_uuid).distinct()).scalars()
+    updates = [{'old_key': key, 'new_key': convert(key)} for key in keys]
+    if updates:
+        connection.execute(
+            write.update()
+            .where(write.c.user_uuid == sa.bindparam('old_key', type_=read_type))
+            .values(user_uuid=sa.bindparam('new_key')),
+            updates,
+        )
+
+
+def upgrade() -> None:
+    # job user keys were 36-character strings compared as written, so a
+    # user deleted by another spelling of its id kept its jobs
+    if op.get_bind().dialect.name == 'postgresql':
+        op.alter_column(
+            'enrichment_job',
+            'user_uuid',
+            type_=postgresql.UUID(),
+            postgresql_using='user_uuid::uuid',
+        )
+        return
+    _convert_keys(sa.String(), sa.LargeBinary(), lambda key: uuid.UUID(key).bytes)
+    with op.batch_alter_table('enrichment_job') as batch_op:
+        batch_op.alter_column('user_uuid', type_=sa.LargeBinary(length=16))
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.alter_column(
+            'enrichment_job',
+            'user_uuid',
+            type_=sa.String(),
+            postgresql_using='user_uuid::text',
+        )
+        return
+    _convert_keys(sa.LargeBinary(), sa.String(), lambda key: str(uuid.UUID(bytes=key)))
+    with op.batch_alter_table('enrichment_job') as batch_op:
+        batch_op.alter_column('user_uuid', type_=sa.String())
@@ -0,0 +1,91 @@
+"""binary uuid keys
+
+Revision ID: 7b3f0c9e4d21
+Revises: 5e8d2a7c1f90
+Create Date: 2026-10-18 15:41:08.662310
+
+"""
+import uuid
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '7b3f0c9e4d21'
+down_revision: Union[str, None] = '5e8d2a7c1f90'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+KEY_COLUMNS = [
+    ('user', 'uuid'),
+    ('group', 'uuid'),
+    ('user_group', 'user_uuid'),
+    ('user_group', 'group_uuid'),
+]
+FOREIGN_KEYS = [
+    ('user_group_user_uuid_fkey', 'user_uuid', 'user'),
+    ('user_group_group_uuid_fkey', 'group_uuid', 'group'),
+]
+
+
+def _convert_keys(read_type, write_type, convert) -> None:
+    # SQLite does not type its columns, so the keys are rewritten in place
+    # before the declared types change
+    connection = op.get_bind()
+    for table_name, column_name in KEY_COLUMNS:
+        read = sa.table(table_name, sa.column(column_name, read_type))
+        write = sa.table(table_name, sa.column(column_name, write_type))
+        column = write.c[column_name]
+        keys = connection.execute(sa.select(read.c[column_name]).distinct()).scalars()
+        updates = [{'old_key': key, 'new_key': convert(key)} for key in keys]
+        if updates:
+            connection.execute(
+                write.update()
+                .where(column == sa.bindparam('old_key', type_=read_type))
+                .values({column_name: sa.bindparam('new_key')}),
+                updates,
+            )
+
+
+def _alter_sqlite(type_) -> None:
+    for table_name in ('user', 'group', 'user_group'):
+        with op.batch_alter_table(table_name) as batch_op:
+            for key_table, column_name in KEY_COLUMNS:
+                if key_table == table_name:
+                    batch_op.alter_column(column_name, type_=type_)
+
+
+def _alter_postgresql(type_, using) -> None:
+    for name, _, _ in FOREIGN_KEYS:
+        op.drop_constraint(name, 'user_group', type_='foreignkey')
+    for table_name, column_name in KEY_COLUMNS:
+        op.alter_column(
+            table_name,
+            column_name,
+            type_=type_,
+            postgresql_using=using.format(column=column_name),
+        )
+    for name, column_name, referred_table in FOREIGN_KEYS:
+        op.create_foreign_key(
+            name, 'user_group', referred_table, [column_name], ['uuid']
+        )
+
+
+def upgrade() -> None:
+    # keys were 36-character strings; SQLite now stores the 16 bytes of the
+    # UUID and PostgreSQL its native uuid type
+    if op.get_bind().dialect.name == 'postgresql':
+        _alter_postgresql(postgresql.UUID(), '{column}::uuid')
+        return
+    _convert_keys(sa.String(), sa.LargeBinary(), lambda key: uuid.UUID(key).bytes)
+    _alter_sqlite(sa.LargeBinary(length=16))
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        _alter_postgresql(sa.String(), '{column}::text')
+        return
+    _convert_keys(sa.LargeBinary(), sa.String(), lambda key: str(uuid.UUID(bytes=key)))
+    _alter_sqlite(sa.String())
@@ -0,0 +1,28 @@
+"""group members index
+
+Revision ID: 8d1e4b6f2a93
+Revises: 2f6a9c1d8e47
+Create Date: 2026-10-18 17:11:36.905214
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '8d1e4b6f2a93'
+down_revision: Union[str, None] = '2f6a9c1d8e47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # members are paged in user order, which the group_uuid index alone
+    # could only give by sorting every member of the group
+    op.create_index('ix_user_group_group_uuid_user_uuid', 'user_group', ['group_uuid', 'user_uuid'], unique=False)
+    op.drop_index(op.f('ix_user_group_group_uuid'), table_name='user_group')
+
+
+def downgrade() -> None:
+    op.create_index(op.f('ix_user_group_group_uuid'), 'user_group', ['group_uuid'], unique=False)
+    op.drop_index('ix_user_group_group_uuid_user_uuid', table_name='user_group')
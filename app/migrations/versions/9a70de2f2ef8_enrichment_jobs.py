@@ -0,0 +1,51 @@
+"""enrichment jobs
+
+Revision ID: 9a70de2f2ef8
+Revises: c28dd1cbceb5
+Create Date: 2026-10-18 09:12:40.118342
+
+"""
+import time
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a70de2f2ef8'
+down_revision: Union[str, None] = 'c28dd1cbceb5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('enrichment_job',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('user_uuid', sa.String(), nullable=False),
+    sa.Column('url', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('run_after', sa.Float(), nullable=False),
+    sa.Column('locked_until', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.Float(), nullable=False),
+    sa.Column('finished_at', sa.Float(), nullable=True),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_enrichment_job_status'), 'enrichment_job', ['status'], unique=False)
+    op.create_index(op.f('ix_enrichment_job_user_uuid'), 'enrichment_job', ['user_uuid'], unique=False)
+    # Users created before the queue existed and never enriched get a job,
+    # queued at migration time so the queue age reported for it is real.
+    op.execute(
+        sa.text(
+            "INSERT INTO enrichment_job (user_uuid, url, status, attempts, run_after, created_at) "
+            "SELECT uuid, 'https://api.github.com/', 'pending', 0, :now, :now FROM \"user\" WHERE urls IS NULL"
+        ).bindparams(now=time.time())
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_enrichment_job_user_uuid'), table_name='enrichment_job')
+    op.drop_index(op.f('ix_enrichment_job_status'), table_name='enrichment_job')
+    op.drop_table('enrichment_job')
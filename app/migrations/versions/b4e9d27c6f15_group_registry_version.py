@@ -0,0 +1,31 @@
+"""group registry version
+
+Revision ID: b4e9d27c6f15
+Revises: 8d1e4b6f2a93
+Create Date: 2026-10-18 18:04:52.117350
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e9d27c6f15'
+down_revision: Union[str, None] = '8d1e4b6f2a93'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('group_registry_version',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    # the single row every group write increments and every process polls
+    op.execute("INSERT INTO group_registry_version (id, version) VALUES (1, 0)")
+
+
+def downgrade() -> None:
+    op.drop_table('group_registry_version')
@@ -1,5 +1,7 @@
+from app.model.enrichment_job import EnrichmentJob
 from app.model.group_model import Group
+from app.model.group_registry_version import GroupRegistryVersion
 from app.model.user_group import UserGroup
 from app.model.user_model import User
 
-__all__ = ["User", "Group", "UserGroup"]
+__all__ = ["User", "Group", "UserGroup", "EnrichmentJob", "GroupRegistryVersion"]
@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Float, Integer, String
+
+from app.core.constants import JobStatus
+from app.core.database import Base
+from app.core.ids import GUID
+
+
+class EnrichmentJob(Base):
+    __tablename__ = "enrichment_job"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_uuid = Column(GUID, nullable=False, index=True)
+    url = Column(String, nullable=False)
+    status = Column(String, nullable=False, default=JobStatus.PENDING.value, index=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    run_after = Column(Float, nullable=False)
+    locked_until = Column(Float, nullable=True)
+    created_at = Column(Float, nullable=False)
+    finished_at = Column(Float, nullable=True)
+    last_error = Column(String, nullable=True)
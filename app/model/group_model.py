@@ -1,14 +1,21 @@
-from sqlalchemy import Column, String
+from sqlalchemy import Column, Integer, String
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
+from app.core.ids import GUID
 
 
 class Group(Base):
     __tablename__ = "group"
 
-    uuid = Column(String, primary_key=True, index=True)
+    uuid = Column(GUID, primary_key=True)
     name = Column(String, nullable=False, unique=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # the foreign keys cascade, so deleting a group never loads its users
     user = relationship(
-        "User", secondary="user_group", back_populates="group", overlaps="group"
+        "User",
+        secondary="user_group",
+        back_populates="group",
+        overlaps="group",
+        passive_deletes=True,
     )
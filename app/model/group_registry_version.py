@@ -0,0 +1,22 @@
+from sqlalchemy import DDL, Column, Integer, event
+
+from app.core.database import Base
+
+
+class GroupRegistryVersion(Base):
+    """
+    Single row counting the writes to the group table; every process polls
+    it to know when its group registry is stale
+    """
+
+    __tablename__ = "group_registry_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+
+
+event.listen(
+    GroupRegistryVersion.__table__,
+    "after_create",
+    DDL("INSERT INTO group_registry_version (id, version) VALUES (1, 0)"),
+)
@@ -1,10 +1,22 @@
-from sqlalchemy import Column, ForeignKey, String
+from sqlalchemy import Column, ForeignKey, Index
 
 from app.core.database import Base
+from app.core.ids import GUID
 
 
 class UserGroup(Base):
     __tablename__ = "user_group"
+    # the primary key serves user to groups, this index group to users in
+    # user order, so a page of members is a range of it
+    __table_args__ = (
+        Index("ix_user_group_group_uuid_user_uuid", "group_uuid", "user_uuid"),
+    )
 
-    user_uuid = Column(String, ForeignKey("user.uuid"), primary_key=True)
-    group_uuid = Column(String, ForeignKey("group.uuid"), primary_key=True)
+    # deleting a user or a group takes its memberships with it in the same
+    # statement, so neither has to be loaded or cleared first
+    user_uuid = Column(
+        GUID, ForeignKey("user.uuid", ondelete="CASCADE"), primary_key=True
+    )
+    group_uuid = Column(
+        GUID, ForeignKey("group.uuid", ondelete="CASCADE"), primary_key=True
+    )
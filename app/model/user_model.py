@@ -1,15 +1,22 @@
-from sqlalchemy import JSON, Column, String
+from sqlalchemy import JSON, Column, Integer, String
 from sqlalchemy.orm import relationship
 
 from app.core.database import Base
+from app.core.ids import GUID
 
 
 class User(Base):
     __tablename__ = "user"
 
-    uuid = Column(String, primary_key=True, index=True)
-    name = Column(String, index=True)
-    urls = Column(JSON, index=True, nullable=True)
+    uuid = Column(GUID, primary_key=True)
+    name = Column(String, unique=True, index=True)
+    urls = Column(JSON, nullable=True)
+    # bumped by every change to the user's representation, groups included
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     group = relationship(
-        "Group", secondary="user_group", back_populates="user", overlaps="user"
+        "Group",
+        secondary="user_group",
+        back_populates="user",
+        overlaps="user",
+        passive_deletes=True,
     )
@@ -1,44 +1,189 @@
-import uuid
-from typing import Annotated
+from typing import Annotated, Callable
 
 from fastapi import Depends
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, func, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.constants import SQL_IN_CHUNK_SIZE
 from app.core.database import get_db
+from app.core.ids import GUID, new_uuid
 from app.model.group_model import Group
+from app.model.group_registry_version import GroupRegistryVersion
+from app.model.user_group import UserGroup
+from app.model.user_model import User
+
+# INSERT ... ON CONFLICT DO NOTHING is spelled the same by both, but each
+# dialect ships its own construct for it
+CONFLICT_INSERTS: dict[str, Callable[..., postgresql.Insert | sqlite.Insert]] = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
 
 
 class GroupRepository:
 
-    def __init__(self, db: Annotated[Session, Depends(get_db)]):
+    def __init__(self, db: Annotated[AsyncSession, Depends(get_db)]):
         self.db = db
 
-    def get_group_by_id(self, group_id: str):
-        return self.db.query(Group).filter(Group.uuid == group_id).first()
+    async def get_group_by_id(self, group_id: str):
+        return await self.db.scalar(select(Group).where(Group.uuid == group_id))
+
+    async def get_every_group(self):
+        # read whole, in key order so the scan goes through the primary key
+        result = await self.db.scalars(select(Group).order_by(Group.uuid))
+        return result.all()
+
+    async def get_registry_version(self) -> int:
+        version = await self.db.scalar(
+            select(GroupRegistryVersion.version).where(GroupRegistryVersion.id == 1)
+        )
+        # the row is created with its table; without it no write was counted
+        return version or 0
+
+    async def get_all_groups(self, limit: int, after: str | None = None):
+        statement = select(Group).order_by(Group.uuid).limit(limit)
+        if after is not None:
+            statement = statement.where(Group.uuid > after)
+        result = await self.db.scalars(statement)
+        return result.all()
 
-    def get_all_groups(self):
-        return self.db.query(Group).all()
+    async def get_members(self, group_id: str, limit: int, after: str | None = None):
+        # a range of ix_user_group_group_uuid_user_uuid, joined to user by key
+        statement = (
+            select(User.uuid, User.name)
+            .join(UserGroup, UserGroup.user_uuid == User.uuid)
+            .where(UserGroup.group_uuid == group_id)
+            .order_by(UserGroup.user_uuid)
+            .limit(limit)
+        )
+        if after is not None:
+            statement = statement.where(UserGroup.user_uuid > after)
+        result = await self.db.execute(statement)
+        return result.all()
 
-    def check_exist_group_name(self, group_name):
-        return self.db.query(Group).filter(Group.name == group_name).first()
+    async def count_members(self):
+        # one GROUP BY over the covering group index instead of a count per
+        # group; groups without members are counted as 0
+        result = await self.db.execute(
+            select(Group.uuid, Group.name, func.count(UserGroup.user_uuid))
+            .outerjoin(UserGroup, UserGroup.group_uuid == Group.uuid)
+            .group_by(Group.uuid)
+            .order_by(Group.uuid)
+        )
+        return result.all()
 
-    def create_group(self, name: str):
-        new_id = str(uuid.uuid4())
+    async def create_group(self, name: str):
+        new_id = new_uuid()
         db_group = Group(uuid=new_id, name=name)
         self.db.add(db_group)
-        self.db.commit()
-        self.db.refresh(db_group)
+        try:
+            await self._bump_registry_version()
+            await self.db.commit()
+        except IntegrityError:
+            # the name is taken; roll back so the session stays usable
+            await self.db.rollback()
+            raise
         return db_group
 
-    def update_group(self, group_id: str, group_name: str):
-        self.db.query(Group).filter(Group.uuid == group_id).update(
-            {Group.name: group_name}
-        )
-        self.db.commit()
-        db_group_update = self.db.query(Group).filter(Group.uuid == group_id).first()
+    async def update_group(
+        self, group_id: str, group_name: str, versions: set[int] | None = None
+    ):
+        statement = update(Group).where(Group.uuid == group_id)
+        if versions is not None:
+            statement = statement.where(Group.version.in_(versions))
+        try:
+            db_group_update = await self.db.scalar(
+                statement.values(name=group_name, version=Group.version + 1)
+                .returning(Group)
+                .execution_options(synchronize_session=False)
+            )
+            if db_group_update is not None:
+                # members list the group's name, so their versions move too
+                await self._bump_member_versions(group_id)
+                await self._bump_registry_version()
+            await self.db.commit()
+        except IntegrityError:
+            await self.db.rollback()
+            raise
         return db_group_update
 
-    def delete_group_by_id(self, group_id: str):
-        group = self.db.query(Group).filter(Group.uuid == group_id).first()
-        self.db.delete(group)
-        self.db.commit()
+    async def delete_group_by_id(self, group_id: str):
+        # members stop listing the group, so their versions move before the
+        # memberships cascade away with it
+        await self._bump_member_versions(group_id)
+        deleted_id = await self.db.scalar(
+            delete(Group).where(Group.uuid == group_id).returning(Group.uuid)
+        )
+        if deleted_id is not None:
+            await self._bump_registry_version()
+        await self.db.commit()
+        return deleted_id
+
+    async def _bump_member_versions(self, group_id: str):
+        await self.db.execute(
+            update(User)
+            .where(
+                User.uuid.in_(
+                    select(UserGroup.user_uuid).where(UserGroup.group_uuid == group_id)
+                )
+            )
+            .values(version=User.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def _bump_registry_version(self):
+        # committed with the group write, so a process seeing the new version
+        # also sees the write
+        await self.db.execute(
+            update(GroupRegistryVersion)
+            .where(GroupRegistryVersion.id == 1)
+            .values(version=GroupRegistryVersion.version + 1)
+        )
+
+    async def add_members(self, group_id: str, user_ids: list[str]) -> list[str]:
+        insert = CONFLICT_INSERTS[self.db.get_bind().dialect.name]
+        added = []
+        for start in range(0, len(user_ids), SQL_IN_CHUNK_SIZE):
+            chunk = user_ids[start : start + SQL_IN_CHUNK_SIZE]
+            # the SELECT leaves out users that do not exist and the conflict
+            # clause the ones already in the group
+            result = await self.db.scalars(
+                insert(UserGroup)
+                .from_select(
+                    ["user_uuid", "group_uuid"],
+                    select(User.uuid, literal(group_id, GUID)).where(
+                        User.uuid.in_(chunk)
+                    ),
+                )
+                .on_conflict_do_nothing()
+                .returning(UserGroup.user_uuid)
+            )
+            added.extend(await self._bump_user_versions(list(result.all())))
+        await self.db.commit()
+        return added
+
+    async def remove_members(self, group_id: str, user_ids: list[str]) -> list[str]:
+        removed = []
+        for start in range(0, len(user_ids), SQL_IN_CHUNK_SIZE):
+            chunk = user_ids[start : start + SQL_IN_CHUNK_SIZE]
+            result = await self.db.scalars(
+                delete(UserGroup)
+                .where(UserGroup.group_uuid == group_id, UserGroup.user_uuid.in_(chunk))
+                .returning(UserGroup.user_uuid)
+            )
+            removed.extend(await self._bump_user_versions(list(result.all())))
+        await self.db.commit()
+        return removed
+
+    async def _bump_user_versions(self, user_ids: list[str]) -> list[str]:
+        # users list their group names, so a membership change is a new version
+        if user_ids:
+            await self.db.execute(
+                update(User)
+                .where(User.uuid.in_(user_ids))
+                .values(version=User.version + 1)
+                .execution_options(synchronize_session=False)
+            )
+        return user_ids
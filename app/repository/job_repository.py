@@ -0,0 +1,143 @@
+import time
+from collections import defaultdict
+from typing import Annotated
+
+from fastapi import Depends
+from sqlalchemy import and_, func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.constants import (JOB_MAX_ATTEMPTS, JOB_RETRY_BACKOFF_SECONDS,
+                                JOB_THROUGHPUT_WINDOW_SECONDS, JobStatus)
+from app.core.database import get_db
+from app.model.enrichment_job import EnrichmentJob
+
+
+def new_enrichment_job(user_uuid: str, url: str, now: float | None = None) -> dict:
+    now = time.time() if now is None else now
+    return {
+        "user_uuid": user_uuid,
+        "url": url,
+        "status": JobStatus.PENDING.value,
+        "attempts": 0,
+        "run_after": now,
+        "created_at": now,
+    }
+
+
+class JobRepository:
+    def __init__(self, db: Annotated[AsyncSession, Depends(get_db)]):
+        self.db = db
+
+    async def claim_jobs(
+        self,
+        limit: int,
+        lease_seconds: float,
+        now: float,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+    ):
+        # a lease that expired on its last attempt means the batch kept
+        # failing outside fail_jobs, so the job is given up instead of retried
+        await self.db.execute(
+            update(EnrichmentJob)
+            .where(
+                EnrichmentJob.status == JobStatus.RUNNING.value,
+                EnrichmentJob.locked_until < now,
+                EnrichmentJob.attempts >= max_attempts,
+            )
+            .values(
+                status=JobStatus.FAILED.value,
+                locked_until=None,
+                finished_at=now,
+                last_error="lease expired",
+            )
+            .execution_options(synchronize_session=False)
+        )
+        claimable = (
+            select(EnrichmentJob.id)
+            .where(
+                or_(
+                    and_(
+                        EnrichmentJob.status == JobStatus.PENDING.value,
+                        EnrichmentJob.run_after <= now,
+                    ),
+                    and_(
+                        EnrichmentJob.status == JobStatus.RUNNING.value,
+                        EnrichmentJob.locked_until < now,
+                    ),
+                )
+            )
+            .order_by(EnrichmentJob.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        result = await self.db.execute(
+            update(EnrichmentJob)
+            .where(EnrichmentJob.id.in_(claimable.scalar_subquery()))
+            .values(
+                status=JobStatus.RUNNING.value,
+                locked_until=now + lease_seconds,
+                attempts=EnrichmentJob.attempts + 1,
+            )
+            .returning(
+                EnrichmentJob.id,
+                EnrichmentJob.user_uuid,
+                EnrichmentJob.url,
+                EnrichmentJob.attempts,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        jobs = result.all()
+        await self.db.commit()
+        return jobs
+
+    async def complete_jobs(self, job_ids: list[int], now: float):
+        await self.db.execute(
+            update(EnrichmentJob)
+            .where(EnrichmentJob.id.in_(job_ids))
+            .values(
+                status=JobStatus.DONE.value,
+                locked_until=None,
+                finished_at=now,
+                last_error=None,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+
+    async def fail_jobs(self, jobs: list, error: str, max_attempts: int, now: float):
+        job_ids_by_attempts = defaultdict(list)
+        for job in jobs:
+            job_ids_by_attempts[job.attempts].append(job.id)
+        for attempts, job_ids in job_ids_by_attempts.items():
+            if attempts >= max_attempts:
+                values = {"status": JobStatus.FAILED.value, "finished_at": now}
+            else:
+                values = {
+                    "status": JobStatus.PENDING.value,
+                    "run_after": now + JOB_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1),
+                }
+            await self.db.execute(
+                update(EnrichmentJob)
+                .where(EnrichmentJob.id.in_(job_ids))
+                .values(locked_until=None, last_error=error, **values)
+                .execution_options(synchronize_session=False)
+            )
+        await self.db.commit()
+
+    async def get_job_metrics(self, now: float):
+        result = await self.db.execute(
+            select(EnrichmentJob.status, func.count()).group_by(EnrichmentJob.status)
+        )
+        counts = {status: count for status, count in result.tuples()}
+        oldest_pending = await self.db.scalar(
+            select(func.min(EnrichmentJob.created_at)).where(
+                EnrichmentJob.status == JobStatus.PENDING.value
+            )
+        )
+        recently_done = await self.db.scalar(
+            select(func.count()).where(
+                EnrichmentJob.status == JobStatus.DONE.value,
+                EnrichmentJob.finished_at >= now - JOB_THROUGHPUT_WINDOW_SECONDS,
+            )
+        )
+        return counts, oldest_pending, recently_done
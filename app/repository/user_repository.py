@@ -1,51 +1,267 @@
-import json
-import uuid
-from typing import Annotated
+import sys
+import time
+from typing import Annotated, Callable
 
 from fastapi import Depends
-from sqlalchemy.orm import Session, joinedload
+from sqlalchemy import and_, bindparam, delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, raiseload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from sqlalchemy.orm.strategy_options import _AbstractLoad
 
+from app.core.constants import SQL_IN_CHUNK_SIZE, LoadStrategy
 from app.core.database import get_db
-from app.model.group_model import Group
+from app.core.ids import new_uuid
+from app.model.enrichment_job import EnrichmentJob
+from app.model.user_group import UserGroup
 from app.model.user_model import User
+from app.repository.job_repository import new_enrichment_job
+
+GROUP_LOADERS: dict[LoadStrategy, Callable[..., _AbstractLoad]] = {
+    LoadStrategy.SELECTIN: selectinload,
+    LoadStrategy.JOINED: joinedload,
+    LoadStrategy.RAISE: raiseload,
+}
+
+
+def load_groups(strategy: LoadStrategy):
+    """
+    Returns the loader option fetching User.group with the given strategy
+    """
+    return GROUP_LOADERS[strategy](User.group)
+
+
+def name_starts_with(prefix: str):
+    """
+    Returns the condition matching user names starting with prefix, as a
+    range of ix_user_name, where SQLite cannot serve a LIKE from an index
+    """
+    # the upper bound is the prefix with its last character that can still
+    # grow moved one code point up, skipping the surrogates UTF-8 cannot hold
+    stem = prefix.rstrip(chr(sys.maxunicode))
+    if not stem:
+        return User.name >= prefix
+    following = ord(stem[-1]) + 1
+    if 0xD800 <= following <= 0xDFFF:
+        following = 0xE000
+    return and_(User.name >= prefix, User.name < stem[:-1] + chr(following))
 
 
 class UserRepository:
-    def __init__(self, db: Annotated[Session, Depends(get_db)]):
+    def __init__(self, db: Annotated[AsyncSession, Depends(get_db)]):
         self.db = db
 
-    def get_user_by_id(self, user_id: str):
-        return self.db.query(User).filter(User.uuid == user_id).first()
+    async def get_user_by_id(
+        self,
+        user_id: str,
+        load: LoadStrategy = LoadStrategy.SELECTIN,
+        primary: bool = False,
+    ):
+        # SQLite materializes the nested user_group JOIN group of a joined
+        # load before filtering, scanning every membership for one user; a
+        # user read to be written is read from the primary, not a replica
+        result = await self.db.scalars(
+            select(User)
+            .options(load_groups(load))
+            .where(User.uuid == user_id)
+            .execution_options(primary=primary)
+        )
+        return result.unique().one_or_none()
 
-    def get_user_by_name(self, user_name: str):
-        return self.db.query(User).filter(User.name == user_name).first()
+    async def get_existing_user_names(self, user_names: list[str]):
+        existing: set[str] = set()
+        for start in range(0, len(user_names), SQL_IN_CHUNK_SIZE):
+            result = await self.db.scalars(
+                select(User.name).where(
+                    User.name.in_(user_names[start : start + SQL_IN_CHUNK_SIZE])
+                )
+            )
+            existing.update(result.all())
+        return existing
 
-    def get_all_users(self):
-        return self.db.query(User).options(joinedload(User.group)).all()
+    async def get_all_users(
+        self,
+        limit: int,
+        after: str | None = None,
+        name_prefix: str | None = None,
+        group_id: str | None = None,
+        load: LoadStrategy = LoadStrategy.SELECTIN,
+    ):
+        # a joined load repeats every user once per group, so pages default
+        # to one extra SELECT ... IN for the whole page instead
+        if group_id is None:
+            key = User.uuid
+            statement = select(User)
+        else:
+            # a range of ix_user_group_group_uuid_user_uuid joined to user by
+            # key, as get_members pages, instead of probing every user's
+            # memberships in uuid order
+            key = UserGroup.user_uuid
+            statement = (
+                select(User)
+                .join(UserGroup, UserGroup.user_uuid == User.uuid)
+                .where(UserGroup.group_uuid == group_id)
+            )
+        statement = statement.options(load_groups(load)).order_by(key).limit(limit)
+        if after is not None:
+            statement = statement.where(key > after)
+        if name_prefix:
+            statement = statement.where(name_starts_with(name_prefix))
+        result = await self.db.scalars(statement)
+        return result.unique().all()
 
-    def create_user(self, user_name: str, user_group: str):
-        group_for_user = self.db.query(Group).filter(Group.uuid == user_group).first()
-        new_id = str(uuid.uuid4())
+    async def stream_all_users(self, batch_size: int):
+        # The body of a streaming response is sent after the request's
+        # dependencies have exited, so the stream releases the session itself.
+        try:
+            result = await self.db.stream_scalars(
+                select(User)
+                .options(selectinload(User.group))
+                .order_by(User.uuid)
+                .execution_options(yield_per=batch_size)
+            )
+            async for user in result:
+                yield user
+        finally:
+            await self.db.close()
+
+    async def create_user(self, user_name: str, user_group: str, enrichment_url: str):
+        new_id = new_uuid()
         db_user = User(uuid=new_id, name=user_name)
-        db_user.group.append(group_for_user)
         self.db.add(db_user)
-        self.db.commit()
-        self.db.refresh(db_user)
+        try:
+            # the membership references the user, and the unit of work does
+            # not order inserts by foreign keys it has no relationship for
+            await self.db.flush()
+            self.db.add(UserGroup(user_uuid=new_id, group_uuid=user_group))
+            self.db.add(EnrichmentJob(**new_enrichment_job(new_id, enrichment_url)))
+            await self.db.commit()
+        except IntegrityError:
+            # the name is taken or the group is gone; roll back so the
+            # session stays usable
+            await self.db.rollback()
+            raise
         return db_user
 
-    def update_user_url(self, user_id: str, updated_content: json):
-        user = self.db.query(User).filter(User.uuid == user_id).first()
-        user.urls = updated_content
-        self.db.commit()
-        self.db.refresh(user)
-
-    def update_user(self, user_id: str, user_name: str):
-        self.db.query(User).filter(User.uuid == user_id).update({User.name: user_name})
-        self.db.commit()
-        user_updated = self.db.query(User).filter(User.uuid == user_id).first()
-        return user_updated
-
-    def delete_user(self, user_id: str):
-        user = self.db.query(User).filter(User.uuid == user_id).first()
-        self.db.delete(user)
-        self.db.commit()
+    async def create_users(self, new_users: list[dict], enrichment_url: str):
+        now = time.time()
+        try:
+            await self.db.execute(
+                insert(User),
+                [{"uuid": user["uuid"], "name": user["name"]} for user in new_users],
+            )
+            await self.db.execute(
+                insert(UserGroup),
+                [
+                    {"user_uuid": user["uuid"], "group_uuid": user["group_uuid"]}
+                    for user in new_users
+                ],
+            )
+            await self.db.execute(
+                insert(EnrichmentJob),
+                [
+                    new_enrichment_job(user["uuid"], enrichment_url, now)
+                    for user in new_users
+                ],
+            )
+            await self.db.commit()
+        except IntegrityError:
+            await self.db.rollback()
+            raise
+
+    async def update_users_urls(self, urls_by_user: dict[str, dict]):
+        # A plain executemany: users deleted since their job was queued are
+        # skipped, where an ORM bulk update would raise StaleDataError
+        user_table = User.__table__
+        await self.db.execute(
+            update(user_table)
+            .where(user_table.c.uuid == bindparam("user_uuid"))
+            .values(urls=bindparam("user_urls"), version=user_table.c.version + 1),
+            [
+                {"user_uuid": user_id, "user_urls": urls}
+                for user_id, urls in urls_by_user.items()
+            ],
+        )
+        await self.db.commit()
+
+    async def update_user(
+        self, user: User, user_name: str, versions: set[int] | None = None
+    ):
+        # a single UPDATE ... RETURNING refreshes the loaded user, whose
+        # groups are reused for the response; with versions it only applies
+        # while the row still has one of them
+        statement = update(User).where(User.uuid == user.uuid)
+        if versions is not None:
+            statement = statement.where(User.version.in_(versions))
+        try:
+            row = (
+                await self.db.execute(
+                    statement.values(name=user_name, version=User.version + 1)
+                    .returning(User.name, User.urls, User.version)
+                    .execution_options(synchronize_session=False)
+                )
+            ).one_or_none()
+            await self.db.commit()
+        except IntegrityError:
+            await self.db.rollback()
+            raise
+        if row is None:
+            return None
+        for key, value in row._mapping.items():
+            set_committed_value(user, key, value)
+        return user
+
+    async def delete_user(self, user_id: str):
+        # the memberships cascade; jobs keep no foreign key to the user
+        await self.db.execute(
+            delete(EnrichmentJob).where(EnrichmentJob.user_uuid == user_id)
+        )
+        deleted_id = await self.db.scalar(
+            delete(User).where(User.uuid == user_id).returning(User.uuid)
+        )
+        await self.db.commit()
+        return deleted_id
+
+    async def delete_users(
+        self,
+        user_ids: list[str] | None = None,
+        name_prefix: str | None = None,
+        group_id: str | None = None,
+    ) -> list[str]:
+        """
+        Deletes the listed users, or every user the filters match, and
+        returns the ids of those deleted
+        """
+        statement = delete(User).returning(User.uuid)
+        if name_prefix:
+            statement = statement.where(name_starts_with(name_prefix))
+        if group_id is not None:
+            # driven by the group's members index, where the EXISTS that
+            # pages use would probe the memberships of every user
+            statement = statement.where(
+                User.uuid.in_(
+                    select(UserGroup.user_uuid).where(UserGroup.group_uuid == group_id)
+                )
+            )
+        if user_ids is None:
+            deleted = list((await self.db.scalars(statement)).all())
+        else:
+            deleted = []
+            for start in range(0, len(user_ids), SQL_IN_CHUNK_SIZE):
+                result = await self.db.scalars(
+                    statement.where(
+                        User.uuid.in_(user_ids[start : start + SQL_IN_CHUNK_SIZE])
+                    )
+                )
+                deleted.extend(result.all())
+        for start in range(0, len(deleted), SQL_IN_CHUNK_SIZE):
+            await self.db.execute(
+                delete(EnrichmentJob).where(
+                    EnrichmentJob.user_uuid.in_(
+                        deleted[start : start + SQL_IN_CHUNK_SIZE]
+                    )
+                )
+            )
+        await self.db.commit()
+        return deleted
@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from app.core.constants import GROUP_MEMBERS_MAX_USERS
 
 
 class GroupCreate(BaseModel):
@@ -15,6 +17,42 @@ class GroupResponseForCreate(BaseModel):
 class GroupResponseForGet(BaseModel):
     uuid: str
     name: str
+    version: int
 
     class Config:
         from_attributes = True
+
+
+class GroupResponsePage(BaseModel):
+    items: list[GroupResponseForGet]
+    next_cursor: str | None = None
+
+
+class GroupMembers(BaseModel):
+    user_ids: list[str] = Field(min_length=1, max_length=GROUP_MEMBERS_MAX_USERS)
+
+
+class GroupMembersAdded(BaseModel):
+    added: int
+    skipped: int
+
+
+class GroupMembersRemoved(BaseModel):
+    removed: int
+    skipped: int
+
+
+class GroupMember(BaseModel):
+    uuid: str
+    name: str
+
+
+class GroupMembersPage(BaseModel):
+    items: list[GroupMember]
+    next_cursor: str | None = None
+
+
+class GroupMemberCount(BaseModel):
+    uuid: str
+    name: str
+    member_count: int
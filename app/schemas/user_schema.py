@@ -1,4 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+from app.core.constants import BULK_CREATE_MAX_USERS, BULK_DELETE_MAX_USERS
 
 
 class UserCreate(BaseModel):
@@ -6,6 +8,18 @@ class UserCreate(BaseModel):
     user_group: str
 
 
+class UserBulkCreate(BaseModel):
+    users: list[UserCreate] = Field(min_length=1, max_length=BULK_CREATE_MAX_USERS)
+
+
+class UserBulkDelete(BaseModel):
+    user_ids: list[str] | None = Field(
+        None, min_length=1, max_length=BULK_DELETE_MAX_USERS
+    )
+    name_prefix: str | None = None
+    group_id: str | None = None
+
+
 class UserUpdate(BaseModel):
     user_name: str
     group_name: str
@@ -22,7 +36,30 @@ class UserResponseForGet(BaseModel):
     uuid: str
     name: str
     group_name: list[str]
-    url: dict
+    url: dict | None = None
+    version: int
 
     class Config:
         from_attributes = True
+
+
+class UserResponsePage(BaseModel):
+    items: list[UserResponseForGet]
+    next_cursor: str | None = None
+
+
+class UserBulkResult(BaseModel):
+    index: int
+    uuid: str | None = None
+    detail: str | None = None
+
+
+class UserBulkResponse(BaseModel):
+    created: int
+    failed: int
+    results: list[UserBulkResult]
+
+
+class UserBulkDeleteResponse(BaseModel):
+    deleted: int
+    skipped: int
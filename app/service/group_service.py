@@ -1,44 +1,145 @@
 from typing import Annotated, Any
 
 from fastapi import Depends
+from sqlalchemy.exc import IntegrityError
 
+from app.core.cache import Cache, get_cache
 from app.core.constants import GroupType
+from app.core.exceptions import PreconditionFailed
+from app.core.group_registry import GroupRegistry, get_group_registry
+from app.core.ids import canonical_uuid
+from app.core.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
 from app.repository.group_repository import GroupRepository
 
 
 class GroupService:
-    def __init__(self, r: Annotated[GroupRepository, Depends(GroupRepository)]):
+    def __init__(
+        self,
+        r: Annotated[GroupRepository, Depends(GroupRepository)],
+        cache: Annotated[Cache, Depends(get_cache)],
+        registry: Annotated[GroupRegistry, Depends(get_group_registry)],
+    ):
         self.group_repository = r
+        self.cache = cache
+        self.registry = registry
 
-    def add_new_group(self, name: str) -> Any:
+    async def add_new_group(self, name: str) -> Any:
         if name not in {group.value for group in GroupType}:
             raise ValueError(
                 f"Group name must be {GroupType.REGULAR.value} or {GroupType.ADMIN.value}"
             )
-        return self.group_repository.create_group(name)
-
-    def check_existing_group_name(self, group_name: str):
-        if self.group_repository.check_exist_group_name(group_name):
-            raise KeyError(f"Group with the name: {group_name} already exist")
+        try:
+            group = await self.group_repository.create_group(name)
+        except IntegrityError:
+            raise KeyError(f"Group with the name: {name} already exist")
+        await self.registry.load(self.group_repository)
+        return group
 
-    def get_all_groups(self):
-        all_groups = self.group_repository.get_all_groups()
-        if not all_groups:
+    async def get_all_groups(
+        self, limit: int = DEFAULT_PAGE_SIZE, cursor: str | None = None
+    ):
+        after = decode_cursor(cursor) if cursor else None
+        all_groups = await self.group_repository.get_all_groups(limit + 1, after)
+        if not all_groups and after is None:
             raise ValueError(f"No group in the database")
-        return all_groups
+        next_cursor = (
+            encode_cursor(all_groups[limit - 1].uuid)
+            if len(all_groups) > limit
+            else None
+        )
+        return {"items": all_groups[:limit], "next_cursor": next_cursor}
+
+    async def get_group_members(
+        self,
+        group_id: str,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+    ):
+        after = decode_cursor(cursor) if cursor else None
+        await self.get_group_by_id(group_id)
+        members = await self.group_repository.get_members(group_id, limit + 1, after)
+        next_cursor = (
+            encode_cursor(members[limit - 1].uuid) if len(members) > limit else None
+        )
+        return {
+            "items": [
+                {"uuid": member.uuid, "name": member.name} for member in members[:limit]
+            ],
+            "next_cursor": next_cursor,
+        }
 
-    def get_group_by_id(self, group_id: str):
-        group = self.group_repository.get_group_by_id(group_id)
-        if not group:
+    async def get_member_counts(self):
+        return [
+            {"uuid": uuid, "name": name, "member_count": count}
+            for uuid, name, count in await self.group_repository.count_members()
+        ]
+
+    async def get_group_by_id(self, group_id: str):
+        # served from the registry, keyed by the canonical spelling; only an
+        # unknown id checks whether another process created the group since
+        # the registry was loaded, and one that is no UUID cannot name any
+        key = canonical_uuid(group_id)
+        group = self.registry.by_id.get(key) if key else None
+        if group is None and key:
+            await self.registry.refresh(self.group_repository)
+            group = self.registry.by_id.get(key)
+        if group is None:
             raise KeyError(f"Group with id {group_id} does not exist")
-        return group
+        return group._asdict()
+
+    async def _invalidate_group(self, group_id: str):
+        await self.registry.load(self.group_repository)
+        # cached users carry their group names, so they go stale as well
+        await self.cache.delete_prefix("user:")
 
-    def update_group(self, id: str, name: str):
+    async def get_existing_group_ids(self, group_ids: set[str]):
+        """
+        Returns the ids, as given, of the groups that exist
+        """
+        keys = {group_id: canonical_uuid(group_id) for group_id in group_ids}
+        if not {key for key in keys.values() if key} <= self.registry.by_id.keys():
+            await self.registry.refresh(self.group_repository)
+        return {
+            group_id for group_id, key in keys.items() if key in self.registry.by_id
+        }
+
+    async def update_group(self, id: str, name: str, versions: set[int] | None = None):
         if name not in {group.value for group in GroupType}:
             raise ValueError(
                 f"Group with name: {name} must be {GroupType.REGULAR.value} or {GroupType.ADMIN.value}"
             )
-        return self.group_repository.update_group(id, name)
+        try:
+            group = await self.group_repository.update_group(id, name, versions)
+        except IntegrityError:
+            raise KeyError(f"Group with the name: {name} already exist")
+        if group is None:
+            # only a failed update pays for telling a stale version from a
+            # missing group
+            if versions is not None and await self.group_repository.get_group_by_id(id):
+                raise PreconditionFailed(f"Group with id {id} has changed")
+            raise KeyError(f"Group with id {id} does not exist")
+        await self._invalidate_group(id)
+        return group
+
+    async def delete_group_by_id(self, group_id: str):
+        if not await self.group_repository.delete_group_by_id(group_id):
+            raise KeyError(f"Group with id {group_id} does not exist")
+        await self._invalidate_group(group_id)
+
+    async def add_members(self, group_id: str, user_ids: list[str]):
+        await self.get_group_by_id(group_id)
+        user_ids = list(dict.fromkeys(user_ids))
+        added = await self.group_repository.add_members(group_id, user_ids)
+        await self._invalidate_users(added)
+        return {"added": len(added), "skipped": len(user_ids) - len(added)}
+
+    async def remove_members(self, group_id: str, user_ids: list[str]):
+        await self.get_group_by_id(group_id)
+        user_ids = list(dict.fromkeys(user_ids))
+        removed = await self.group_repository.remove_members(group_id, user_ids)
+        await self._invalidate_users(removed)
+        return {"removed": len(removed), "skipped": len(user_ids) - len(removed)}
 
-    def delete_group_by_id(self, group_id: str):
-        return self.group_repository.delete_group_by_id(group_id)
+    async def _invalidate_users(self, user_ids: list[str]):
+        if user_ids:
+            await self.cache.delete(*(f"user:{user_id}" for user_id in user_ids))
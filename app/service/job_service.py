@@ -0,0 +1,26 @@
+import time
+from typing import Annotated
+
+from fastapi import Depends
+
+from app.core.constants import JOB_THROUGHPUT_WINDOW_SECONDS, JobStatus
+from app.repository.job_repository import JobRepository
+
+
+class JobService:
+    def __init__(self, r: Annotated[JobRepository, Depends(JobRepository)]):
+        self.job_repository = r
+
+    async def get_job_metrics(self):
+        now = time.time()
+        counts, oldest_pending, recently_done = (
+            await self.job_repository.get_job_metrics(now)
+        )
+        response = {status.value: counts.get(status.value, 0) for status in JobStatus}
+        response["oldest_pending_age_seconds"] = (
+            round(now - oldest_pending, 3) if oldest_pending is not None else None
+        )
+        response["completed_per_minute"] = (
+            recently_done * 60 / JOB_THROUGHPUT_WINDOW_SECONDS
+        )
+        return response
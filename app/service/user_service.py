@@ -1,75 +1,184 @@
-import json
 from typing import Annotated
 
-import httpx
-from fastapi import BackgroundTasks, Depends
+import orjson
+from fastapi import Depends
+from sqlalchemy.exc import IntegrityError
 
+from app.core.cache import Cache, get_cache
+from app.core.constants import (BULK_CREATE_ATTEMPTS, ENRICHMENT_URL,
+                                EXPORT_BATCH_SIZE)
+from app.core.database import is_foreign_key_violation
+from app.core.exceptions import PreconditionFailed
+from app.core.ids import canonical_uuid, new_uuid
+from app.core.pagination import DEFAULT_PAGE_SIZE, decode_cursor, encode_cursor
 from app.model.user_model import User
 from app.repository.user_repository import UserRepository
+from app.schemas.user_schema import UserCreate
 
 
 class UserService:
-    def __init__(self, r: Annotated[UserRepository, Depends(UserRepository)]):
-        self.user_repository = r
-
-    def add_new_user(
+    def __init__(
         self,
-        user_name: str,
-        user_group: str,
-        background_task: BackgroundTasks,
+        r: Annotated[UserRepository, Depends(UserRepository)],
+        cache: Annotated[Cache, Depends(get_cache)],
     ):
-        exist_user = self.user_repository.get_user_by_name(user_name)
-        if exist_user:
+        self.user_repository = r
+        self.cache = cache
+
+    async def add_new_user(self, user_name: str, user_group: str):
+        # the unique index on user.name decides, so concurrent signups for
+        # the same name cannot both get through a check made beforehand
+        try:
+            return await self.user_repository.create_user(
+                user_name, user_group, ENRICHMENT_URL
+            )
+        except IntegrityError as e:
+            # the group was deleted after it was looked up
+            if is_foreign_key_violation(e):
+                raise KeyError(f"Group with id {user_group} does not exist")
             raise ValueError(
                 f"User with name: {user_name} already exist in the database"
             )
-        new_user = self.user_repository.create_user(user_name, user_group)
-        background_task.add_task(
-            self.process_content,
-            user_id=new_user.uuid,
-            url="https://api.github.com/",
+
+    async def add_new_users(
+        self, users: list[UserCreate], existing_group_ids: set[str]
+    ):
+        for _ in range(BULK_CREATE_ATTEMPTS):
+            results, new_users = await self._plan_new_users(users, existing_group_ids)
+            if not new_users:
+                break
+            try:
+                await self.user_repository.create_users(new_users, ENRICHMENT_URL)
+                break
+            except IntegrityError as e:
+                # planning again cannot bring back a group deleted since the
+                # groups were checked
+                if is_foreign_key_violation(e):
+                    raise KeyError("A group of the users was deleted meanwhile")
+                # a name was taken by a concurrent request since it was
+                # checked, so plan again against the names taken now
+                continue
+        else:
+            # every attempt failed, so none of the planned users was created
+            for result in results:
+                if result.pop("uuid", None) is not None:
+                    name = users[result["index"]].user_name
+                    result["detail"] = (
+                        f"User with name: {name} could not be created, "
+                        "the insert kept failing"
+                    )
+            new_users = []
+        return {
+            "created": len(new_users),
+            "failed": len(users) - len(new_users),
+            "results": results,
+        }
+
+    async def _plan_new_users(
+        self, users: list[UserCreate], existing_group_ids: set[str]
+    ):
+        taken_names = await self.user_repository.get_existing_user_names(
+            list({user.user_name for user in users})
         )
-        return new_user
-
-    async def process_content(self, user_id: str, url: str):
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            file_content = response.text
-        replaced_placeholder = file_content.replace("{user}", user_id)
-        self.user_repository.update_user_url(user_id, replaced_placeholder)
-
-    def get_all_users(self):
-        users = self.user_repository.get_all_users()
-        if not users:
-            raise ValueError(f"No user in the database")
-        response = []
-        for user in users:
-            response.append(
-                (
+        results = []
+        new_users = []
+        for index, user in enumerate(users):
+            if user.user_group not in existing_group_ids:
+                detail = f"Group with id {user.user_group} does not exist"
+                results.append({"index": index, "detail": detail})
+            elif user.user_name in taken_names:
+                detail = (
+                    f"User with name: {user.user_name} already exist in the database"
+                )
+                results.append({"index": index, "detail": detail})
+            else:
+                new_id = new_uuid()
+                taken_names.add(user.user_name)
+                new_users.append(
                     {
-                        "uuid": user.uuid,
-                        "name": user.name,
-                        "group_name": [group.name for group in user.group],
-                        "url": json.loads(user.urls),
+                        "uuid": new_id,
+                        "name": user.user_name,
+                        "group_uuid": user.user_group,
                     }
                 )
-            )
-        return response
+                results.append({"index": index, "uuid": new_id})
+        return results, new_users
 
-    def get_user_by_id(self, user_id: str):
-        user = self.user_repository.get_user_by_id(user_id)
-        if not user:
-            raise KeyError(f"User with id: {user_id} does not exist in the database")
-        response = {
+    async def get_all_users(
+        self,
+        limit: int = DEFAULT_PAGE_SIZE,
+        cursor: str | None = None,
+        name_prefix: str | None = None,
+        group_id: str | None = None,
+    ):
+        after = decode_cursor(cursor) if cursor else None
+        users = await self.user_repository.get_all_users(
+            limit + 1, after, name_prefix, group_id
+        )
+        if not users and after is None and not name_prefix and group_id is None:
+            raise ValueError(f"No user in the database")
+        response = [self._user_to_response(user) for user in users[:limit]]
+        next_cursor = (
+            encode_cursor(users[limit - 1].uuid) if len(users) > limit else None
+        )
+        return {"items": response, "next_cursor": next_cursor}
+
+    async def export_users(
+        self, export_format: str = "ndjson", batch_size: int = EXPORT_BATCH_SIZE
+    ):
+        as_array = export_format == "json"
+        if as_array:
+            yield b"["
+        chunk = []
+        exported = 0
+        async for user in self.user_repository.stream_all_users(batch_size):
+            line = orjson.dumps(self._user_to_response(user))
+            if not as_array:
+                line += b"\n"
+            elif exported:
+                line = b"," + line
+            chunk.append(line)
+            exported += 1
+            if len(chunk) == batch_size:
+                yield b"".join(chunk)
+                chunk = []
+        if chunk:
+            yield b"".join(chunk)
+        if as_array:
+            yield b"]"
+
+    @staticmethod
+    def _user_to_response(user: User):
+        return {
             "uuid": user.uuid,
             "name": user.name,
             "group_name": [group.name for group in user.group],
-            "url": json.loads(user.urls),
+            "url": user.urls,
+            "version": user.version,
         }
-        return response
 
-    def check_user_validation(self, user_id: str):
-        user = self.user_repository.get_user_by_id(user_id)
+    async def get_user_by_id(self, user_id: str):
+        # cached under the canonical spelling, the one writes invalidate, so
+        # no spelling of the id outlives them; one that is no UUID names no
+        # user
+        key = canonical_uuid(user_id)
+        user = (
+            await self.cache.get_or_load(f"user:{key}", lambda: self._load_user(key))
+            if key
+            else None
+        )
+        if not user:
+            raise KeyError(f"User with id: {user_id} does not exist in the database")
+        return user
+
+    async def _load_user(self, user_id: str):
+        user = await self.user_repository.get_user_by_id(user_id)
+        return self._user_to_response(user) if user else None
+
+    async def check_user_validation(self, user_id: str):
+        # the user is about to be updated, so its version and groups must
+        # not come from a replica that has not caught up
+        user = await self.user_repository.get_user_by_id(user_id, primary=True)
         if not user:
             raise KeyError(f"User with id {user_id} does not exist")
         return user
@@ -81,15 +190,51 @@ class UserService:
                 f"Group {group_name} does not part of the user id {user.uuid}"
             )
 
-    def update_user(self, user_id: str, user_name: str):
-        user = self.user_repository.update_user(user_id, user_name)
-        response = {
-            "uuid": user.uuid,
-            "name": user.name,
-            "group_name": [group.name for group in user.group],
-            "url": json.loads(user.urls),
-        }
-        return response
+    async def update_user(
+        self, user: User, user_name: str, versions: set[int] | None = None
+    ):
+        if versions is not None and user.version not in versions:
+            raise PreconditionFailed(
+                f"User with id {user.uuid} is at version {user.version}"
+            )
+        try:
+            updated = await self.user_repository.update_user(user, user_name, versions)
+        except IntegrityError:
+            raise ValueError(
+                f"User with name: {user_name} already exist in the database"
+            )
+        if updated is None:
+            raise PreconditionFailed(
+                f"User with id {user.uuid} was changed by another request"
+            )
+        await self.cache.delete(f"user:{user.uuid}")
+        return self._user_to_response(user)
 
-    def delete_user_by_id(self, user_id: str):
-        return self.user_repository.delete_user(user_id)
+    async def delete_user_by_id(self, user_id: str):
+        key = canonical_uuid(user_id)
+        if not key or not await self.user_repository.delete_user(key):
+            raise KeyError(f"User with id: {user_id} does not exist in the database")
+        await self.cache.delete(f"user:{key}")
+
+    async def delete_users(
+        self,
+        user_ids: list[str] | None = None,
+        name_prefix: str | None = None,
+        group_id: str | None = None,
+    ):
+        if user_ids is None and not name_prefix and group_id is None:
+            raise ValueError("Pass user_ids, name_prefix or group_id to delete users")
+        requested = 0
+        if user_ids is not None:
+            # deduped on the canonical spelling, the one keys are stored and
+            # cached in; an id that is no UUID names no user and is skipped
+            keys = [canonical_uuid(user_id) for user_id in dict.fromkeys(user_ids)]
+            user_ids = list(dict.fromkeys(key for key in keys if key))
+            requested = len(user_ids) + keys.count(None)
+        deleted = await self.user_repository.delete_users(
+            user_ids, name_prefix, group_id
+        )
+        if deleted:
+            await self.cache.delete(*(f"user:{user_id}" for user_id in deleted))
+        skipped = requested - len(deleted) if user_ids is not None else 0
+        return {"deleted": len(deleted), "skipped": skipped}
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import tempfile
+from unittest import IsolatedAsyncioTestCase
+
+import httpx
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.cache import MemoryCache, get_cache
+from app.core.config import Settings
+from app.core.database import Base, create_database_engine, get_db
+from app.core.group_registry import GroupRegistry, get_group_registry
+from app.main import app
+from app.model import Group, User
+from app.repository.group_repository import GroupRepository
+
+PARALLEL_REQUESTS = 500
+GROUP_ID = "be2a91c4-df99-490d-9061-bc12f50a80b7"
+
+
+class TestConcurrentCreates(IsolatedAsyncioTestCase):
+    """
+    Sends many creates for the same name at once against a SQLite file, so
+    the requests really race for the write lock, and checks exactly one wins
+    """
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        url = f"sqlite+aiosqlite:///{os.path.join(self.directory.name, 'test.db')}"
+        self.engine = create_database_engine(
+            Settings.model_validate({"database_url": url})
+        )
+        async with self.engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        self.session_factory = async_sessionmaker(
+            bind=self.engine, autoflush=False, expire_on_commit=False
+        )
+
+        async def get_test_db():
+            async with self.session_factory() as db:
+                yield db
+
+        cache = MemoryCache()
+        self.registry = GroupRegistry()
+        app.dependency_overrides[get_db] = get_test_db
+        app.dependency_overrides[get_cache] = lambda: cache
+        app.dependency_overrides[get_group_registry] = lambda: self.registry
+        self.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        )
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_cache, None)
+        app.dependency_overrides.pop(get_group_registry, None)
+        await self.engine.dispose()
+        self.directory.cleanup()
+
+    async def count(self, model):
+        async with self.session_factory() as db:
+            return await db.scalar(select(func.count()).select_from(model))
+
+    async def test_parallel_user_creates_keep_names_unique(self):
+        async with self.session_factory() as db:
+            db.add(Group(uuid=GROUP_ID, name="regular"))
+            await db.commit()
+            # loaded before the requests, as the app does on startup
+            await self.registry.load(GroupRepository(db))
+
+        responses = await asyncio.gather(
+            *(
+                self.client.post(
+                    "/user", json={"user_name": "catalin", "user_group": GROUP_ID}
+                )
+                for _ in range(PARALLEL_REQUESTS)
+            )
+        )
+
+        statuses = [response.status_code for response in responses]
+        self.assertEqual(statuses.count(200), 1)
+        self.assertEqual(statuses.count(400), PARALLEL_REQUESTS - 1)
+        self.assertEqual(await self.count(User), 1)
+
+    async def test_parallel_group_creates_keep_names_unique(self):
+        responses = await asyncio.gather(
+            *(
+                self.client.post("/group", json={"name": "admin"})
+                for _ in range(PARALLEL_REQUESTS)
+            )
+        )
+
+        statuses = [response.status_code for response in responses]
+        self.assertEqual(statuses.count(200), 1)
+        self.assertEqual(statuses.count(404), PARALLEL_REQUESTS - 1)
+        self.assertEqual(await self.count(Group), 1)
@@ -0,0 +1,109 @@
+from unittest import IsolatedAsyncioTestCase
+
+import httpx
+
+from app.core.cache import MemoryCache, get_cache
+from app.core.database import get_db
+from app.core.group_registry import GroupRegistry, get_group_registry
+from app.main import app
+from app.model import Group
+from app.repository.group_repository import GroupRepository
+from app.repository.user_repository import UserRepository
+from app.tests.database import create_test_database
+
+GROUP_IDS = [
+    "be2a91c4-df99-490d-9061-bc12f50a80b7",
+    "0b6c3f2e-5d14-4a7e-9c1b-3e8f2a6d9b40",
+]
+
+
+class TestConditionalRequests(IsolatedAsyncioTestCase):
+    """
+    Runs the endpoints against a real database and checks that a group write
+    moves the ETag of its members, so a client's cached copy is not confirmed
+    """
+
+    async def asyncSetUp(self):
+        self.engine, session_factory = await create_test_database()
+
+        async def get_test_db():
+            async with session_factory() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = get_test_db
+        app.dependency_overrides[get_cache] = lambda: self.cache
+        app.dependency_overrides[get_group_registry] = lambda: self.registry
+        self.cache = MemoryCache()
+        self.registry = GroupRegistry()
+        async with session_factory() as db:
+            db.add(Group(uuid=GROUP_IDS[0], name="regular"))
+            db.add(Group(uuid=GROUP_IDS[1], name="admin"))
+            await db.commit()
+            user = await UserRepository(db).create_user(
+                "catalin", GROUP_IDS[0], "https://api.github.com/"
+            )
+            await GroupRepository(db).add_members(GROUP_IDS[1], [user.uuid])
+            self.user_id = user.uuid
+            await self.registry.load(GroupRepository(db))
+        self.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        )
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_cache, None)
+        app.dependency_overrides.pop(get_group_registry, None)
+        await self.engine.dispose()
+
+    async def assert_user_changed(self, method: str, url: str, **kwargs):
+        response = await self.client.get(f"/user/{self.user_id}")
+        etag = response.headers["etag"]
+
+        response = await self.client.request(method, url, **kwargs)
+        response.raise_for_status()
+        response = await self.client.get(
+            f"/user/{self.user_id}", headers={"If-None-Match": etag}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["etag"], etag)
+        return response.json()
+
+    async def test_update_group_changes_member_etag(self):
+        user = await self.assert_user_changed(
+            "PUT", f"/group/{GROUP_IDS[1]}", json={"name": "admin"}
+        )
+
+        self.assertEqual(sorted(user["group_name"]), ["admin", "regular"])
+
+    async def test_delete_group_changes_member_etag(self):
+        user = await self.assert_user_changed("DELETE", f"/group/{GROUP_IDS[1]}")
+
+        self.assertEqual(user["group_name"], ["regular"])
+
+    async def test_delete_by_another_spelling_evicts_cached_user(self):
+        response = await self.client.get(f"/user/{self.user_id}")
+        self.assertEqual(response.status_code, 200)
+
+        response = await self.client.delete(f"/user/{self.user_id.upper()}")
+        response.raise_for_status()
+        response = await self.client.get(f"/user/{self.user_id}")
+
+        self.assertEqual(response.status_code, 404)
+
+    async def test_update_evicts_user_cached_under_another_spelling(self):
+        response = await self.client.get(f"/user/{self.user_id.upper()}")
+        etag = response.headers["etag"]
+
+        response = await self.client.put(
+            f"/user/{self.user_id}",
+            json={"user_name": "iulia", "group_name": "regular"},
+        )
+        response.raise_for_status()
+        response = await self.client.get(f"/user/{self.user_id.upper()}")
+
+        self.assertNotEqual(response.headers["etag"], etag)
+        self.assertEqual(
+            (response.json()["name"], response.json()["version"]), ("iulia", 3)
+        )
@@ -3,7 +3,11 @@ from unittest.mock import patch
 
 from fastapi.testclient import TestClient
 
+from app.core.cache import MemoryCache, get_cache
+from app.core.group_registry import GroupRegistry, get_group_registry
+from app.core.exceptions import PreconditionFailed
 from app.main import app
+from app.model.group_model import Group
 from app.service.group_service import GroupService
 
 client = TestClient(app)
@@ -13,21 +17,28 @@ class TestGroupAPI(TestCase):
 
     def setUp(self):
 
+        app.dependency_overrides[get_cache] = lambda: MemoryCache()
+        app.dependency_overrides[get_group_registry] = lambda: GroupRegistry()
+
         self.group1 = {
             "uuid": "be2a91c4-df99-490d-9061-bc12f50a80b7",
             "name": "regular",
+            "version": 1,
         }
 
         self.group2 = {
             "uuid": "b34d63a3-12fd-456e-b6d7-27c8ab69a6e3",
             "name": "admin",
+            "version": 1,
         }
 
-    @patch.object(GroupService, "check_existing_group_name")
+    def tearDown(self):
+        app.dependency_overrides.pop(get_cache, None)
+        app.dependency_overrides.pop(get_group_registry, None)
+
     @patch.object(GroupService, "add_new_group")
-    def test_create_group(self, mock_add_new_group, mock_check_existing_group_name):
+    def test_create_group(self, mock_add_new_group):
 
-        mock_check_existing_group_name.return_value = None
         mock_add_new_group.return_value = self.group1
 
         response = client.post("/group", json={"name": "regular"})
@@ -36,18 +47,12 @@ class TestGroupAPI(TestCase):
 
         self.assertEqual(response.json(), {"uuid": self.group1["uuid"]})
 
-        mock_check_existing_group_name.assert_called_once_with("regular")
         mock_add_new_group.assert_called_once_with("regular")
 
-    @patch.object(GroupService, "check_existing_group_name")
     @patch.object(GroupService, "add_new_group")
-    def test_create_group_already_exist(
-        self, mock_add_new_group, mock_check_existing_group_name
-    ):
+    def test_create_group_already_exist(self, mock_add_new_group):
 
-        mock_check_existing_group_name.side_effect = KeyError(
-            "Group name already exist"
-        )
+        mock_add_new_group.side_effect = KeyError("Group name already exist")
 
         response = client.post("/group", json={"name": "duplicate-group"})
 
@@ -55,13 +60,11 @@ class TestGroupAPI(TestCase):
 
         self.assertEqual(response.json(), {"detail": "Group name already exist"})
 
-        mock_check_existing_group_name.assert_called_once_with("duplicate-group")
-        mock_add_new_group.assert_not_called()
+        mock_add_new_group.assert_called_once_with("duplicate-group")
 
-    @patch.object(GroupService, "check_existing_group_name")
     @patch.object(GroupService, "add_new_group")
     def test_create_group_value_error_when_add_wrong_group_name(
-        self, mock_add_new_group, mock_check_existing_group_name
+        self, mock_add_new_group
     ):
 
         mock_add_new_group.side_effect = ValueError(
@@ -77,23 +80,74 @@ class TestGroupAPI(TestCase):
         )
 
         mock_add_new_group.assert_called_once_with("test")
-        mock_check_existing_group_name.assert_called_once_with("test")
 
     @patch.object(GroupService, "get_all_groups")
     def test_get_all_groups_success(self, mock_get_all_groups):
 
-        mock_get_all_groups.return_value = [
-            {"uuid": "be2a91c4-df99-490d-9061-bc12f50a80b7", "name": "regular"},
-            {"uuid": "b34d63a3-12fd-456e-b6d7-27c8ab69a6e3", "name": "admin"},
-        ]
+        mock_get_all_groups.return_value = {
+            "items": [
+                Group(
+                    uuid="be2a91c4-df99-490d-9061-bc12f50a80b7",
+                    name="regular",
+                    version=1,
+                ),
+                Group(
+                    uuid="b34d63a3-12fd-456e-b6d7-27c8ab69a6e3",
+                    name="admin",
+                    version=1,
+                ),
+            ],
+            "next_cursor": None,
+        }
 
         response = client.get("/group")
 
         self.assertEqual(response.status_code, 200)
 
-        self.assertEqual(response.json(), [self.group1, self.group2])
+        self.assertEqual(
+            response.json(),
+            {"items": [self.group1, self.group2], "next_cursor": None},
+        )
 
-        mock_get_all_groups.assert_called_once()
+        mock_get_all_groups.assert_called_once_with(100, None)
+
+    @patch.object(GroupService, "get_all_groups")
+    def test_get_all_groups_with_cursor(self, mock_get_all_groups):
+
+        mock_get_all_groups.return_value = {
+            "items": [self.group2],
+            "next_cursor": "next-page",
+        }
+
+        response = client.get("/group", params={"limit": 1, "cursor": "page"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(), {"items": [self.group2], "next_cursor": "next-page"}
+        )
+        mock_get_all_groups.assert_called_once_with(1, "page")
+
+    @patch.object(GroupService, "get_all_groups")
+    def test_get_all_groups_not_modified(self, mock_get_all_groups):
+
+        mock_get_all_groups.return_value = {
+            "items": [self.group1, self.group2],
+            "next_cursor": None,
+        }
+
+        etag = client.get("/group").headers["etag"]
+        response = client.get("/group", headers={"If-None-Match": f"W/{etag}"})
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    @patch.object(GroupService, "get_all_groups")
+    def test_get_all_groups_limit_out_of_range(self, mock_get_all_groups):
+
+        response = client.get("/group", params={"limit": 0})
+
+        self.assertEqual(response.status_code, 422)
+        mock_get_all_groups.assert_not_called()
 
     @patch.object(
         GroupService,
@@ -122,6 +176,20 @@ class TestGroupAPI(TestCase):
         self.assertEqual(response.json(), self.group1)
         mock_get_group_by_id.assert_called_once_with(self.group1["uuid"])
 
+    @patch.object(GroupService, "get_group_by_id")
+    def test_get_group_by_id_not_modified(self, mock_get_group_by_id):
+
+        mock_get_group_by_id.return_value = self.group1
+
+        etag = client.get(f"/group/{self.group1['uuid']}").headers["etag"]
+        response = client.get(
+            f"/group/{self.group1['uuid']}",
+            headers={"If-None-Match": f'"other", {etag}'},
+        )
+
+        self.assertEqual(etag, '"1"')
+        self.assertEqual(response.status_code, 304)
+
     @patch.object(GroupService, "get_group_by_id")
     def test_get_group_by_id_not_found(self, mock_get_group_by_id):
 
@@ -135,59 +203,67 @@ class TestGroupAPI(TestCase):
         mock_get_group_by_id.assert_called_once_with("non-existing-id")
 
     @patch.object(GroupService, "update_group")
-    @patch.object(GroupService, "get_group_by_id")
-    @patch.object(GroupService, "check_existing_group_name")
-    def test_update_group(
-        self, mock_check_existing_group_name, mock_get_group_by_id, mock_update_group
-    ):
+    def test_update_group(self, mock_update_group):
 
-        updated_group = {"uuid": self.group1["uuid"], "name": "updated-regular"}
-        mock_get_group_by_id.return_value = self.group1
+        updated_group = Group(uuid=self.group1["uuid"], name="admin", version=2)
         mock_update_group.return_value = updated_group
-        mock_check_existing_group_name.return_value = None
+        response = client.put(f"/group/{self.group1['uuid']}", json={"name": "admin"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"uuid": updated_group.uuid})
+        self.assertEqual(response.headers["etag"], '"2"')
+        mock_update_group.assert_called_once_with(self.group1["uuid"], "admin", None)
+
+    @patch.object(GroupService, "update_group")
+    def test_update_group_if_match(self, mock_update_group):
+
+        mock_update_group.return_value = Group(
+            uuid=self.group1["uuid"], name="admin", version=4
+        )
         response = client.put(
-            f"/group/{self.group1['uuid']}", json={"name": "updated-regular"}
+            f"/group/{self.group1['uuid']}",
+            json={"name": "admin"},
+            headers={"If-Match": '"3"'},
         )
 
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json(), {"uuid": updated_group["uuid"]})
-        mock_get_group_by_id.assert_called_once_with(self.group1["uuid"])
-        mock_check_existing_group_name.assert_called_once_with(updated_group["name"])
-        mock_update_group.assert_called_once_with(
-            self.group1["uuid"], "updated-regular"
+        mock_update_group.assert_called_once_with(self.group1["uuid"], "admin", {3})
+
+    @patch.object(GroupService, "update_group")
+    def test_update_group_precondition_failed(self, mock_update_group):
+
+        mock_update_group.side_effect = PreconditionFailed("Group has changed")
+
+        response = client.put(
+            f"/group/{self.group1['uuid']}",
+            json={"name": "admin"},
+            headers={"If-Match": '"3"'},
         )
 
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(response.json(), {"detail": "Group has changed"})
+
     @patch.object(GroupService, "update_group")
-    @patch.object(GroupService, "get_group_by_id")
-    @patch.object(GroupService, "check_existing_group_name")
     def test_update_group_raises_value_error_when_group_name_already_exists(
-        self, mock_check_existing_group_name, mock_get_group_by_id, mock_update_group
+        self, mock_update_group
     ):
 
-        updated_group = {"uuid": self.group1["uuid"], "name": "updated-regular"}
-        mock_get_group_by_id.return_value = updated_group
-        mock_check_existing_group_name.side_effect = KeyError(
-            "Group name already exist"
-        )
+        mock_update_group.side_effect = KeyError("Group name already exist")
 
         response = client.put(
-            f"/group/{updated_group['uuid']}", json={"name": "updated-regular"}
+            f"/group/{self.group1['uuid']}", json={"name": "updated-regular"}
         )
 
         self.assertEqual(response.status_code, 404)
         self.assertEqual(response.json(), {"detail": "Group name already exist"})
-        mock_get_group_by_id.assert_called_once_with(self.group1["uuid"])
-        mock_check_existing_group_name.assert_called_once_with(updated_group["name"])
-        mock_update_group.assert_not_called()
+        mock_update_group.assert_called_once_with(
+            self.group1["uuid"], "updated-regular", None
+        )
 
     @patch.object(GroupService, "update_group")
-    @patch.object(GroupService, "get_group_by_id")
-    @patch.object(GroupService, "check_existing_group_name")
-    def test_update_group_not_found(
-        self, mock_check_existing_group_name, mock_get_group_by_id, mock_update_group
-    ):
+    def test_update_group_not_found(self, mock_update_group):
 
-        mock_get_group_by_id.side_effect = KeyError("group with id not found")
+        mock_update_group.side_effect = KeyError("group with id not found")
 
         response = client.put(
             f"/group/{self.group1['uuid']}", json={"name": "updated-regular"}
@@ -195,19 +271,13 @@ class TestGroupAPI(TestCase):
 
         self.assertEqual(response.status_code, 404)
         self.assertEqual(response.json(), {"detail": "group with id not found"})
-        mock_get_group_by_id.assert_called_once_with(self.group1["uuid"])
-        mock_update_group.assert_not_called()
-        mock_check_existing_group_name.assert_not_called()
+        mock_update_group.assert_called_once_with(
+            self.group1["uuid"], "updated-regular", None
+        )
 
     @patch.object(GroupService, "update_group")
-    @patch.object(GroupService, "get_group_by_id")
-    @patch.object(GroupService, "check_existing_group_name")
-    def test_update_group_when_wring_group_name(
-        self, mock_check_existing_group_name, mock_get_group_by_id, mock_update_group
-    ):
+    def test_update_group_when_wring_group_name(self, mock_update_group):
 
-        mock_check_existing_group_name.return_value = None
-        mock_get_group_by_id.return_value = None
         mock_update_group.side_effect = ValueError(
             "Group name must be regular or admin"
         )
@@ -221,35 +291,120 @@ class TestGroupAPI(TestCase):
             response.json(), {"detail": "Group name must be regular or admin"}
         )
 
-        mock_check_existing_group_name.assert_called_once()
-        mock_get_group_by_id.assert_called_once()
         mock_update_group.assert_called_once()
 
-    @patch.object(GroupService, "get_group_by_id")
     @patch.object(GroupService, "delete_group_by_id")
-    def test_delete_group_by_id(self, mock_delete_group_by_id, mock_get_group_by_id):
+    def test_delete_group_by_id(self, mock_delete_group_by_id):
 
-        mock_get_group_by_id.return_value = self.group1
         mock_delete_group_by_id.return_value = None
 
         response = client.delete(f"/group/{self.group1['uuid']}")
 
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), None)
-        mock_get_group_by_id.assert_called_once_with(self.group1["uuid"])
         mock_delete_group_by_id.assert_called_once_with(self.group1["uuid"])
 
-    @patch.object(GroupService, "get_group_by_id")
     @patch.object(GroupService, "delete_group_by_id")
-    def test_delete_group_by_id_not_found(
-        self, mock_delete_group_by_id, mock_get_group_by_id
-    ):
+    def test_delete_group_by_id_not_found(self, mock_delete_group_by_id):
 
-        mock_get_group_by_id.side_effect = KeyError("Group not found")
+        mock_delete_group_by_id.side_effect = KeyError("Group not found")
 
         response = client.delete(f"/group/{self.group1['uuid']}")
 
         self.assertEqual(response.status_code, 404)
         self.assertEqual(response.json(), {"detail": "Group not found"})
-        mock_get_group_by_id.assert_called_once_with(self.group1["uuid"])
-        mock_delete_group_by_id.assert_not_called()
+        mock_delete_group_by_id.assert_called_once_with(self.group1["uuid"])
+
+    @patch.object(GroupService, "add_members")
+    def test_add_group_members(self, mock_add_members):
+
+        mock_add_members.return_value = {"added": 2, "skipped": 1}
+
+        response = client.post(
+            f"/group/{self.group1['uuid']}/members",
+            json={"user_ids": ["user-1", "user-2", "user-3"]},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"added": 2, "skipped": 1})
+        mock_add_members.assert_called_once_with(
+            self.group1["uuid"], ["user-1", "user-2", "user-3"]
+        )
+
+    @patch.object(GroupService, "add_members")
+    def test_add_group_members_empty(self, mock_add_members):
+
+        response = client.post(
+            f"/group/{self.group1['uuid']}/members", json={"user_ids": []}
+        )
+
+        self.assertEqual(response.status_code, 422)
+        mock_add_members.assert_not_called()
+
+    @patch.object(GroupService, "remove_members")
+    def test_remove_group_members(self, mock_remove_members):
+
+        mock_remove_members.return_value = {"removed": 1, "skipped": 0}
+
+        response = client.request(
+            "DELETE",
+            f"/group/{self.group1['uuid']}/members",
+            json={"user_ids": ["user-1"]},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"removed": 1, "skipped": 0})
+        mock_remove_members.assert_called_once_with(self.group1["uuid"], ["user-1"])
+
+    @patch.object(GroupService, "remove_members")
+    def test_remove_group_members_group_not_found(self, mock_remove_members):
+
+        mock_remove_members.side_effect = KeyError("Group not found")
+
+        response = client.request(
+            "DELETE", "/group/non-existing-id/members", json={"user_ids": ["user-1"]}
+        )
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {"detail": "Group not found"})
+
+    @patch.object(GroupService, "get_group_members")
+    def test_get_group_members(self, mock_get_group_members):
+
+        mock_get_group_members.return_value = {
+            "items": [{"uuid": "user-1", "name": "catalin"}],
+            "next_cursor": "next-page",
+        }
+
+        response = client.get(
+            f"/group/{self.group1['uuid']}/members",
+            params={"limit": 1, "cursor": "page"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), mock_get_group_members.return_value)
+        mock_get_group_members.assert_called_once_with(self.group1["uuid"], 1, "page")
+
+    @patch.object(GroupService, "get_group_members")
+    def test_get_group_members_invalid_cursor(self, mock_get_group_members):
+
+        mock_get_group_members.side_effect = ValueError("Invalid cursor: page")
+
+        response = client.get(
+            f"/group/{self.group1['uuid']}/members", params={"cursor": "page"}
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    @patch.object(GroupService, "get_member_counts")
+    def test_get_member_counts(self, mock_get_member_counts):
+
+        mock_get_member_counts.return_value = [{**self.group1, "member_count": 2}]
+
+        response = client.get("/group/member-counts")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            [{"uuid": self.group1["uuid"], "name": "regular", "member_count": 2}],
+        )
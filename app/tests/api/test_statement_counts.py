@@ -0,0 +1,128 @@
+from unittest import IsolatedAsyncioTestCase
+
+import httpx
+
+from app.core.cache import MemoryCache, get_cache
+from app.core.database import get_db
+from app.core.group_registry import GroupRegistry, get_group_registry
+from app.main import app
+from app.model import Group
+from app.repository.group_repository import GroupRepository
+from app.repository.user_repository import UserRepository
+from app.tests.database import count_statements, create_test_database
+
+GROUP_ID = "be2a91c4-df99-490d-9061-bc12f50a80b7"
+
+
+class TestStatementCounts(IsolatedAsyncioTestCase):
+    """
+    Runs the endpoints against a real database and pins how many SQL
+    statements each request sends, so extra lookups show up as failures
+    """
+
+    async def asyncSetUp(self):
+        self.engine, session_factory = await create_test_database()
+
+        async def get_test_db():
+            async with session_factory() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = get_test_db
+        app.dependency_overrides[get_cache] = lambda: self.cache
+        app.dependency_overrides[get_group_registry] = lambda: self.registry
+        self.cache = MemoryCache()
+        self.registry = GroupRegistry()
+        async with session_factory() as db:
+            db.add(Group(uuid=GROUP_ID, name="regular"))
+            await db.commit()
+            user = await UserRepository(db).create_user(
+                "catalin", GROUP_ID, "https://api.github.com/"
+            )
+            self.user_id = user.uuid
+            await self.registry.load(GroupRepository(db))
+        self.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://test"
+        )
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        app.dependency_overrides.pop(get_db, None)
+        app.dependency_overrides.pop(get_cache, None)
+        app.dependency_overrides.pop(get_group_registry, None)
+        await self.engine.dispose()
+
+    async def request(self, method: str, url: str, **kwargs):
+        with count_statements(self.engine) as statements:
+            response = await self.client.request(method, url, **kwargs)
+        response.raise_for_status()
+        return response, statements
+
+    async def test_create_user(self):
+        _, statements = await self.request(
+            "POST", "/user", json={"user_name": "iulia", "user_group": GROUP_ID}
+        )
+
+        # the group comes from the registry: user, membership and job inserts
+        self.assertEqual(len(statements), 3)
+
+    async def test_create_users_bulk(self):
+        _, statements = await self.request(
+            "POST",
+            "/user/bulk",
+            json={"users": [{"user_name": "iulia", "user_group": GROUP_ID}]},
+        )
+
+        # the taken names, then user, membership and job inserts
+        self.assertEqual(len(statements), 4)
+
+    async def test_get_user_by_id(self):
+        _, statements = await self.request("GET", f"/user/{self.user_id}")
+
+        # the user, then its groups
+        self.assertEqual(len(statements), 2)
+
+        _, statements = await self.request("GET", f"/user/{self.user_id}")
+
+        self.assertEqual(len(statements), 0)
+
+    async def test_update_user(self):
+        response, statements = await self.request(
+            "PUT",
+            f"/user/{self.user_id}",
+            json={"group_name": "regular", "user_name": "andreea"},
+        )
+
+        self.assertEqual(response.json()["name"], "andreea")
+        self.assertEqual(response.json()["group_name"], ["regular"])
+        self.assertEqual(len(statements), 3)
+
+    async def test_delete_user(self):
+        _, statements = await self.request("DELETE", f"/user/{self.user_id}")
+
+        # jobs, then the user itself; its memberships cascade
+        self.assertEqual(len(statements), 2)
+
+    async def test_delete_users_by_filter(self):
+        _, statements = await self.request(
+            "DELETE", "/user", json={"group_id": GROUP_ID}
+        )
+
+        # the users, then their jobs
+        self.assertEqual(len(statements), 2)
+
+    async def test_update_group(self):
+        _, statements = await self.request(
+            "PUT", f"/group/{GROUP_ID}", json={"name": "admin"}
+        )
+
+        # the unique constraint checks the name within the UPDATE itself, then
+        # the members' and the registry versions are bumped and the registry
+        # reloads its version and groups
+        self.assertEqual(len(statements), 5)
+
+    async def test_delete_group(self):
+        _, statements = await self.request("DELETE", f"/group/{GROUP_ID}")
+
+        # the members' versions, the group, whose memberships cascade, the
+        # registry version, then the reload
+        self.assertEqual(len(statements), 5)
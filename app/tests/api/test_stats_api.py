@@ -0,0 +1,122 @@
+from unittest import TestCase
+from unittest.mock import patch
+
+import httpx
+from fastapi.testclient import TestClient
+
+from app.core.cache import MemoryCache, get_cache
+from app.core.group_registry import GroupRegistry, get_group_registry
+from app.core.http_client import UrlFetcher, get_url_fetcher
+from app.core.url_template_cache import (UrlTemplateCache,
+                                         get_url_template_cache)
+from app.main import app
+from app.service.job_service import JobService
+
+client = TestClient(app)
+
+
+class TestStatsApi(TestCase):
+
+    def setUp(self):
+        self.url_fetcher = UrlFetcher(httpx.AsyncClient(), max_concurrency=4)
+        self.url_fetcher.succeeded = 7
+        self.url_fetcher.retried = 2
+        self.url_template_cache = UrlTemplateCache(self.url_fetcher)
+        self.url_template_cache.hits = 41
+        self.cache = MemoryCache()
+        self.cache.misses = 3
+        self.registry = GroupRegistry()
+        self.registry.loads = 2
+        app.dependency_overrides[get_url_fetcher] = lambda: self.url_fetcher
+        app.dependency_overrides[get_cache] = lambda: self.cache
+        app.dependency_overrides[get_group_registry] = lambda: self.registry
+        app.dependency_overrides[get_url_template_cache] = (
+            lambda: self.url_template_cache
+        )
+
+    def tearDown(self):
+        app.dependency_overrides.pop(get_url_fetcher, None)
+        app.dependency_overrides.pop(get_url_template_cache, None)
+        app.dependency_overrides.pop(get_cache, None)
+        app.dependency_overrides.pop(get_group_registry, None)
+
+    def test_get_fetcher_stats(self):
+
+        response = client.get("/stats/fetcher")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {
+                "max_concurrency": 4,
+                "queue_depth": 0,
+                "in_flight": 0,
+                "succeeded": 7,
+                "failed": 0,
+                "retried": 2,
+            },
+        )
+
+    def test_get_url_template_stats(self):
+
+        response = client.get("/stats/url-templates")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {"entries": 0, "hits": 41, "misses": 0, "revalidations": 0},
+        )
+
+    def test_get_cache_stats(self):
+
+        response = client.get("/stats/cache")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {
+                "backend": "memory",
+                "hits": 0,
+                "misses": 3,
+                "invalidations": 0,
+                "entries": 0,
+            },
+        )
+
+    def test_get_group_registry_stats(self):
+
+        response = client.get("/stats/group-registry")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"version": None, "groups": 0, "loads": 2})
+
+    @patch.object(JobService, "get_job_metrics")
+    def test_get_job_stats(self, mock_get_job_metrics):
+
+        mock_get_job_metrics.return_value = {
+            "pending": 3,
+            "running": 1,
+            "done": 10,
+            "failed": 0,
+            "oldest_pending_age_seconds": 1.5,
+            "completed_per_minute": 10.0,
+        }
+
+        response = client.get("/stats/jobs")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), mock_get_job_metrics.return_value)
+        mock_get_job_metrics.assert_called_once_with()
+
+    def test_get_metrics(self):
+        client.get("/stats/cache")
+
+        response = client.get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        self.assertIn(
+            'http_request_duration_seconds_count{method="GET",'
+            'route="/stats/cache",status="200"}',
+            response.text,
+        )
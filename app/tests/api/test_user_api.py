@@ -4,6 +4,9 @@ from unittest.mock import patch
 from fastapi.testclient import TestClient
 from pydantic import ValidationError
 
+from app.core.cache import MemoryCache, get_cache
+from app.core.group_registry import GroupRegistry, get_group_registry
+from app.core.exceptions import PreconditionFailed
 from app.main import app
 from app.schemas.user_schema import UserResponseForGet
 from app.service.group_service import GroupService
@@ -16,13 +19,21 @@ class TestUserApi(TestCase):
 
     def setUp(self):
 
+        app.dependency_overrides[get_cache] = lambda: MemoryCache()
+        app.dependency_overrides[get_group_registry] = lambda: GroupRegistry()
+
         self.user1 = {
             "uuid": "e1e2e3e4-5678-1234-abcd-5678e1234567",
             "name": "catalin",
             "group_name": ["regular"],
             "url": {"current_user_url": "https://api.github.com/user"},
+            "version": 1,
         }
 
+    def tearDown(self):
+        app.dependency_overrides.pop(get_cache, None)
+        app.dependency_overrides.pop(get_group_registry, None)
+
     @patch.object(GroupService, "get_group_by_id")
     @patch.object(UserService, "add_new_user")
     def test_create_user_success(self, mock_add_new_user, mock_get_group_by_id):
@@ -101,17 +112,107 @@ class TestUserApi(TestCase):
         )
         mock_add_new_group.assert_called_once()
 
+    @patch.object(GroupService, "get_existing_group_ids")
+    @patch.object(UserService, "add_new_users")
+    def test_create_users_bulk(self, mock_add_new_users, mock_get_existing_group_ids):
+
+        mock_get_existing_group_ids.return_value = {
+            "d9bc8265-8abc-406c-aee2-2a3584431d5e"
+        }
+        mock_add_new_users.return_value = {
+            "created": 1,
+            "failed": 1,
+            "results": [
+                {"index": 0, "uuid": self.user1["uuid"]},
+                {"index": 1, "detail": "Group with id missing does not exist"},
+            ],
+        }
+
+        response = client.post(
+            "/user/bulk",
+            json={
+                "users": [
+                    {
+                        "user_name": "catalin",
+                        "user_group": "d9bc8265-8abc-406c-aee2-2a3584431d5e",
+                    },
+                    {"user_name": "iulia", "user_group": "missing"},
+                ]
+            },
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json(),
+            {
+                "created": 1,
+                "failed": 1,
+                "results": [
+                    {"index": 0, "uuid": self.user1["uuid"], "detail": None},
+                    {
+                        "index": 1,
+                        "uuid": None,
+                        "detail": "Group with id missing does not exist",
+                    },
+                ],
+            },
+        )
+        mock_get_existing_group_ids.assert_called_once_with(
+            {"d9bc8265-8abc-406c-aee2-2a3584431d5e", "missing"}
+        )
+        mock_add_new_users.assert_called_once()
+
+    @patch.object(UserService, "add_new_users")
+    def test_create_users_bulk_empty(self, mock_add_new_users):
+
+        response = client.post("/user/bulk", json={"users": []})
+
+        self.assertEqual(response.status_code, 422)
+        mock_add_new_users.assert_not_called()
+
     @patch.object(UserService, "get_all_users")
     def test_get_all_users_success(self, mock_get_all_users):
 
-        mock_get_all_users.return_value = [self.user1]
+        mock_get_all_users.return_value = {"items": [self.user1], "next_cursor": None}
 
         response = client.get("/user")
 
         self.assertEqual(response.status_code, 200)
-        self.assertEqual(response.json(), [self.user1])
+        self.assertEqual(response.json(), {"items": [self.user1], "next_cursor": None})
+
+        mock_get_all_users.assert_called_once_with(100, None, None, None)
+
+    @patch.object(UserService, "get_all_users")
+    def test_get_all_users_with_filters(self, mock_get_all_users):
+
+        mock_get_all_users.return_value = {
+            "items": [self.user1],
+            "next_cursor": "next-page",
+        }
+
+        response = client.get(
+            "/user",
+            params={
+                "limit": 1,
+                "cursor": "page",
+                "name_prefix": "cat",
+                "group_id": "d9bc8265-8abc-406c-aee2-2a3584431d5e",
+            },
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["next_cursor"], "next-page")
+        mock_get_all_users.assert_called_once_with(
+            1, "page", "cat", "d9bc8265-8abc-406c-aee2-2a3584431d5e"
+        )
 
-        mock_get_all_users.assert_called_once_with()
+    @patch.object(UserService, "get_all_users")
+    def test_get_all_users_limit_out_of_range(self, mock_get_all_users):
+
+        response = client.get("/user", params={"limit": 5000})
+
+        self.assertEqual(response.status_code, 422)
+        mock_get_all_users.assert_not_called()
 
     @patch.object(UserService, "get_all_users")
     def test_get_all_users_value_error(self, mock_get_all_users):
@@ -123,7 +224,7 @@ class TestUserApi(TestCase):
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.json(), {"detail": "No users found"})
 
-        mock_get_all_users.assert_called_once_with()
+        mock_get_all_users.assert_called_once_with(100, None, None, None)
 
     @patch.object(UserService, "get_all_users")
     def test_get_all_users_validation_error(self, mock_get_all_users):
@@ -141,7 +242,44 @@ class TestUserApi(TestCase):
         error_details = response.json()["detail"]
 
         self.assertIn("group_name", str(error_details))
-        mock_get_all_users.assert_called_once_with()
+        mock_get_all_users.assert_called_once_with(100, None, None, None)
+
+    @patch.object(UserService, "export_users")
+    def test_export_users_ndjson(self, mock_export_users):
+
+        async def chunks():
+            yield b'{"uuid": "1"}\n'
+            yield b'{"uuid": "2"}\n'
+
+        mock_export_users.return_value = chunks()
+
+        response = client.get("/user/export")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        self.assertEqual(response.text, '{"uuid": "1"}\n{"uuid": "2"}\n')
+        mock_export_users.assert_called_once_with("ndjson")
+
+    @patch.object(UserService, "export_users")
+    def test_export_users_json_array(self, mock_export_users):
+
+        async def chunks():
+            yield b"[]"
+
+        mock_export_users.return_value = chunks()
+
+        response = client.get("/user/export", params={"format": "json"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["content-type"], "application/json")
+        self.assertEqual(response.json(), [])
+        mock_export_users.assert_called_once_with("json")
+
+    def test_export_users_unknown_format(self):
+
+        response = client.get("/user/export", params={"format": "csv"})
+
+        self.assertEqual(response.status_code, 422)
 
     @patch.object(UserService, "get_user_by_id")
     def test_get_user_by_id_success(self, mock_get_user_by_id):
@@ -155,6 +293,52 @@ class TestUserApi(TestCase):
 
         mock_get_user_by_id.assert_called_once_with(self.user1["uuid"])
 
+    @patch.object(UserService, "get_user_by_id")
+    def test_get_user_by_id_not_modified(self, mock_get_user_by_id):
+
+        mock_get_user_by_id.return_value = self.user1
+
+        first = client.get(f"/user/{self.user1['uuid']}")
+        etag = first.headers["etag"]
+        response = client.get(
+            f"/user/{self.user1['uuid']}", headers={"If-None-Match": etag}
+        )
+
+        self.assertEqual(etag, '"1"')
+        self.assertEqual(first.headers["cache-control"], "private, no-cache")
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        self.assertEqual(response.headers["etag"], etag)
+
+    @patch.object(UserService, "get_user_by_id")
+    def test_get_user_by_id_changed_since_etag(self, mock_get_user_by_id):
+
+        mock_get_user_by_id.return_value = self.user1
+        etag = client.get(f"/user/{self.user1['uuid']}").headers["etag"]
+        mock_get_user_by_id.return_value = {
+            **self.user1,
+            "name": "renamed",
+            "version": 2,
+        }
+
+        response = client.get(
+            f"/user/{self.user1['uuid']}", headers={"If-None-Match": etag}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["name"], "renamed")
+        self.assertNotEqual(response.headers["etag"], etag)
+
+    @patch.object(UserService, "get_user_by_id")
+    def test_get_user_by_id_not_enriched_yet(self, mock_get_user_by_id):
+
+        mock_get_user_by_id.return_value = {**self.user1, "url": None}
+
+        response = client.get(f"/user/{self.user1['uuid']}")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.json()["url"])
+
     @patch.object(UserService, "get_user_by_id")
     def test_get_user_by_id_not_found(self, mock_get_user_by_id):
 
@@ -187,11 +371,50 @@ class TestUserApi(TestCase):
         self.assertEqual(response.status_code, 200)
 
         self.assertEqual(response.json(), self.user1)
+        self.assertEqual(response.headers["etag"], '"1"')
 
-        mock_update_user.assert_called_once()
+        mock_update_user.assert_called_once_with(None, "updated_name", None)
         mock_check_group_in_user.assert_called_once()
         mock_check_user_validation.assert_called_once()
 
+    @patch.object(UserService, "check_user_validation")
+    @patch.object(UserService, "check_group_in_user")
+    @patch.object(UserService, "update_user")
+    def test_update_user_if_match(
+        self, mock_update_user, mock_check_group_in_user, mock_check_user_validation
+    ):
+
+        mock_check_user_validation.return_value = None
+        mock_update_user.return_value = {**self.user1, "version": 3}
+
+        response = client.put(
+            f"/user/{self.user1['uuid']}",
+            json={"group_name": "regular", "user_name": "updated_name"},
+            headers={"If-Match": '"2", W/"4"'},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["etag"], '"3"')
+        mock_update_user.assert_called_once_with(None, "updated_name", {2})
+
+    @patch.object(UserService, "check_user_validation")
+    @patch.object(UserService, "check_group_in_user")
+    @patch.object(UserService, "update_user")
+    def test_update_user_precondition_failed(
+        self, mock_update_user, mock_check_group_in_user, mock_check_user_validation
+    ):
+
+        mock_update_user.side_effect = PreconditionFailed("User has changed")
+
+        response = client.put(
+            f"/user/{self.user1['uuid']}",
+            json={"group_name": "regular", "user_name": "updated_name"},
+            headers={"If-Match": '"2"'},
+        )
+
+        self.assertEqual(response.status_code, 412)
+        self.assertEqual(response.json(), {"detail": "User has changed"})
+
     @patch.object(UserService, "check_user_validation")
     def test_update_user_not_found(self, mock_check_user_validation):
 
@@ -230,12 +453,8 @@ class TestUserApi(TestCase):
         mock_check_group_in_user.assert_called_once_with(self.user1, "admin")
 
     @patch.object(UserService, "delete_user_by_id")
-    @patch.object(UserService, "get_user_by_id")
-    def test_delete_user_by_id_success(
-        self, mock_get_user_by_id, mock_delete_user_by_id
-    ):
+    def test_delete_user_by_id_success(self, mock_delete_user_by_id):
 
-        mock_get_user_by_id.return_value = self.user1
         mock_delete_user_by_id.return_value = None
 
         response = client.delete(f"/user/{self.user1['uuid']}")
@@ -243,19 +462,62 @@ class TestUserApi(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json(), None)
 
-        mock_get_user_by_id.assert_called_once_with(self.user1["uuid"])
-        mock_delete_user_by_id.assert_called_once()
+        mock_delete_user_by_id.assert_called_once_with(self.user1["uuid"])
 
     @patch.object(UserService, "delete_user_by_id")
-    @patch.object(UserService, "get_user_by_id")
-    def test_delete_user_not_found(self, mock_get_user_by_id, mock_delete_user_by_id):
+    def test_delete_user_not_found(self, mock_delete_user_by_id):
 
-        mock_get_user_by_id.side_effect = KeyError("User with id does not exist")
+        mock_delete_user_by_id.side_effect = KeyError("User with id does not exist")
 
         response = client.delete(f"/user/{self.user1['uuid']}")
 
         self.assertEqual(response.status_code, 404)
         self.assertEqual(response.json(), {"detail": "User with id does not exist"})
 
-        mock_get_user_by_id.assert_called_once()
-        mock_delete_user_by_id.assert_not_called()
+        mock_delete_user_by_id.assert_called_once()
+
+    @patch.object(UserService, "delete_users")
+    def test_delete_users_by_id(self, mock_delete_users):
+
+        mock_delete_users.return_value = {"deleted": 1, "skipped": 1}
+
+        response = client.request(
+            "DELETE", "/user", json={"user_ids": [self.user1["uuid"], "missing"]}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"deleted": 1, "skipped": 1})
+        mock_delete_users.assert_called_once_with(
+            [self.user1["uuid"], "missing"], None, None
+        )
+
+    @patch.object(UserService, "delete_users")
+    def test_delete_users_by_filter(self, mock_delete_users):
+
+        mock_delete_users.return_value = {"deleted": 2, "skipped": 0}
+
+        response = client.request(
+            "DELETE", "/user", json={"name_prefix": "cat", "group_id": "group-1"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        mock_delete_users.assert_called_once_with(None, "cat", "group-1")
+
+    @patch.object(UserService, "delete_users")
+    def test_delete_users_without_selection(self, mock_delete_users):
+
+        mock_delete_users.side_effect = ValueError(
+            "Pass user_ids, name_prefix or group_id to delete users"
+        )
+
+        response = client.request("DELETE", "/user", json={})
+
+        self.assertEqual(response.status_code, 400)
+
+    @patch.object(UserService, "delete_users")
+    def test_delete_users_empty_id_list(self, mock_delete_users):
+
+        response = client.request("DELETE", "/user", json={"user_ids": []})
+
+        self.assertEqual(response.status_code, 422)
+        mock_delete_users.assert_not_called()
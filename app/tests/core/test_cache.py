@@ -0,0 +1,123 @@
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock
+
+from fakeredis import FakeAsyncRedis
+
+from app.core.cache import MemoryCache, RedisCache
+
+
+class TestMemoryCache(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.cache = MemoryCache(
+            ttl_seconds=10.0, max_entries=2, clock=lambda: self.now
+        )
+
+    async def test_get_or_load_reads_through_once(self):
+        load = AsyncMock(return_value={"uuid": "1"})
+
+        first = await self.cache.get_or_load("user:1", load)
+        second = await self.cache.get_or_load("user:1", load)
+
+        self.assertEqual(first, {"uuid": "1"})
+        self.assertEqual(second, {"uuid": "1"})
+        load.assert_called_once()
+        self.assertEqual(self.cache.metrics()["hits"], 1)
+        self.assertEqual(self.cache.metrics()["misses"], 1)
+
+    async def test_get_or_load_drops_value_loaded_across_invalidation(self):
+        async def load():
+            # the write and its invalidation land while the old row loads
+            await self.cache.delete("user:1")
+            return {"uuid": "1", "version": 1}
+
+        value = await self.cache.get_or_load("user:1", load)
+
+        self.assertEqual(value, {"uuid": "1", "version": 1})
+        self.assertIsNone(await self.cache.get("user:1"))
+
+    async def test_get_or_load_does_not_cache_missing_values(self):
+        load = AsyncMock(return_value=None)
+
+        await self.cache.get_or_load("user:1", load)
+        await self.cache.get_or_load("user:1", load)
+
+        self.assertEqual(load.call_count, 2)
+
+    async def test_entries_expire_after_ttl(self):
+        await self.cache.set("user:1", {"uuid": "1"})
+
+        self.now = 10.0
+
+        self.assertIsNone(await self.cache.get("user:1"))
+        self.assertEqual(self.cache.metrics()["entries"], 0)
+
+    async def test_evicts_least_recently_used(self):
+        await self.cache.set("user:1", 1)
+        await self.cache.set("user:2", 2)
+        await self.cache.get("user:1")
+
+        await self.cache.set("user:3", 3)
+
+        self.assertEqual(await self.cache.get("user:1"), 1)
+        self.assertIsNone(await self.cache.get("user:2"))
+        self.assertEqual(await self.cache.get("user:3"), 3)
+
+    async def test_delete_and_delete_prefix(self):
+        await self.cache.set("user:1", 1)
+        await self.cache.set("group:1", 1)
+
+        await self.cache.delete("group:1")
+        self.assertIsNone(await self.cache.get("group:1"))
+
+        await self.cache.delete_prefix("user:")
+        self.assertIsNone(await self.cache.get("user:1"))
+        self.assertEqual(self.cache.metrics()["invalidations"], 2)
+
+
+class TestRedisCache(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.client = FakeAsyncRedis()
+        self.cache = RedisCache(self.client, ttl_seconds=10.0)
+
+    async def asyncTearDown(self):
+        await self.cache.close()
+
+    async def test_set_and_get_round_trip_with_ttl(self):
+        await self.cache.set("user:1", {"uuid": "1", "url": None})
+
+        self.assertEqual(await self.cache.get("user:1"), {"uuid": "1", "url": None})
+        self.assertEqual(await self.cache.get("user:2"), None)
+        self.assertLessEqual(await self.client.pttl("cache:user:1"), 10000)
+        self.assertEqual(
+            self.cache.metrics(),
+            {"backend": "redis", "hits": 1, "misses": 1, "invalidations": 0},
+        )
+
+    async def test_delete_and_delete_prefix(self):
+        await self.cache.set("user:1", 1)
+        await self.cache.set("user:2", 2)
+        await self.cache.set("group:1", 1)
+
+        await self.cache.delete("group:1")
+        await self.cache.delete_prefix("user:")
+
+        self.assertEqual(await self.client.keys("cache:*"), [])
+        self.assertEqual(await self.client.get("cache-generation"), b"2")
+
+    async def test_get_or_load_caches_when_not_invalidated(self):
+        await self.cache.delete("user:1")
+
+        await self.cache.get_or_load("user:1", AsyncMock(return_value=1))
+
+        self.assertEqual(await self.cache.get("user:1"), 1)
+
+    async def test_get_or_load_drops_value_loaded_across_invalidation(self):
+        async def load():
+            await self.cache.delete_prefix("user:")
+            return 1
+
+        self.assertEqual(await self.cache.get_or_load("user:1", load), 1)
+        self.assertIsNone(await self.client.get("cache:user:1"))
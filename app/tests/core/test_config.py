@@ -1,10 +1,27 @@
 import unittest
+from unittest.mock import patch
 
-from app.core.config import get_sqlalchemy_db_url
+from app.core.config import Settings, get_sqlalchemy_db_url
 
 
 class TestDatabaseConfig(unittest.TestCase):
 
     def test_get_sqlalchemy_db_url_default(self):
-        expected_url = "sqlite:///./users.db"
+        expected_url = "sqlite+aiosqlite:///./users.db"
         self.assertEqual(get_sqlalchemy_db_url(), expected_url)
+
+    def test_settings_read_from_environment(self):
+        environment = {
+            "DATABASE_URL": "postgresql+asyncpg://app@db/users",
+            "DB_POOL_SIZE": "20",
+            "DB_ECHO": "true",
+            "ENRICHMENT_WORKERS": "0",
+        }
+        with patch.dict("os.environ", environment):
+            settings = Settings(_env_file=None)
+
+        self.assertEqual(settings.database_url, "postgresql+asyncpg://app@db/users")
+        self.assertEqual(settings.db_pool_size, 20)
+        self.assertTrue(settings.db_echo)
+        self.assertEqual(settings.enrichment_workers, 0)
+        self.assertEqual(settings.sqlite_journal_mode, "WAL")
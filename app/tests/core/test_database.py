@@ -0,0 +1,295 @@
+import asyncio
+import gc
+import os
+import sqlite3
+import tempfile
+import time
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy import insert, select, text, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.pool import (AsyncAdaptedQueuePool, NullPool, QueuePool,
+                             StaticPool)
+
+from app.core.cache import MemoryCache
+from app.core.config import Settings
+from app.core.database import (Base, ReplicaRouter, create_database_engine,
+                               create_session_factory, dispose_engines,
+                               is_foreign_key_violation)
+from app.core.group_registry import GroupRegistry
+from app.model import Group, User, UserGroup
+from app.repository.group_repository import GroupRepository
+from app.repository.user_repository import UserRepository
+from app.service.group_service import GroupService
+
+GROUP_ID = "be2a91c4-df99-490d-9061-bc12f50a80b7"
+OTHER_GROUP_ID = "b34d63a3-12fd-456e-b6d7-27c8ab69a6e3"
+USER_ID = "510a0b32-d4e5-40bb-bc6e-a7ddbd2cacb3"
+
+
+class TestCreateDatabaseEngine(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        url = f"sqlite+aiosqlite:///{os.path.join(self.directory.name, 'test.db')}"
+        self.settings = Settings.model_validate(
+            {"database_url": url, "db_pool_size": 3, "db_max_overflow": 2}
+        )
+        self.engine = create_database_engine(self.settings)
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+        self.directory.cleanup()
+
+    async def pragma(self, name: str):
+        async with self.engine.connect() as connection:
+            return await connection.scalar(text(f"PRAGMA {name}"))
+
+    async def test_sqlite_file_uses_sized_pool(self):
+        pool = self.engine.pool
+
+        self.assertIsInstance(pool, AsyncAdaptedQueuePool)
+        self.assertEqual(pool.size(), 3)
+        self.assertEqual(pool._max_overflow, 2)
+
+    async def test_sqlite_pragmas_applied_on_connect(self):
+        self.assertEqual(await self.pragma("journal_mode"), "wal")
+        self.assertEqual(await self.pragma("synchronous"), 1)
+        self.assertEqual(await self.pragma("cache_size"), -64000)
+        self.assertEqual(await self.pragma("busy_timeout"), 30000)
+        self.assertEqual(await self.pragma("mmap_size"), 256 * 1024 * 1024)
+        self.assertEqual(await self.pragma("foreign_keys"), 1)
+
+    async def test_options_override_settings(self):
+        engine = create_database_engine(self.settings, pool_size=7)
+        try:
+            self.assertEqual(engine.pool.size(), 7)
+        finally:
+            await engine.dispose()
+
+
+class TestFailedStatements(IsolatedAsyncioTestCase):
+    """
+    Runs a failed write on a single pooled connection to a SQLite file, then
+    hands that connection to a write waiting for a lock held elsewhere, and
+    checks the failure left nothing a GC pass would block the loop on
+    """
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "test.db")
+        self.engine = create_database_engine(
+            Settings.model_validate(
+                {
+                    "database_url": f"sqlite+aiosqlite:///{self.path}",
+                    "db_pool_size": 1,
+                    "db_max_overflow": 0,
+                    "sqlite_busy_timeout_ms": 2000,
+                }
+            )
+        )
+        async with self.engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        self.session_factory = create_session_factory(self.engine)
+        async with self.session_factory() as db:
+            await GroupRepository(db).create_group("admin")
+
+    async def asyncTearDown(self):
+        await self.engine.dispose()
+        self.directory.cleanup()
+
+    async def test_duplicate_group_missing_from_registry_does_not_stall_loop(self):
+        # collected only below, once the connection waits for the lock
+        gc.disable()
+        self.addCleanup(gc.enable)
+        # the group was created by another process, so the registry of this
+        # one does not know it and the insert fails on the unique index
+        async with self.session_factory() as db:
+            service = GroupService(GroupRepository(db), MemoryCache(), GroupRegistry())
+            with self.assertRaises(KeyError):
+                await service.add_new_group("admin")
+
+        blocker = sqlite3.connect(self.path, isolation_level=None)
+        blocker.execute("BEGIN IMMEDIATE")
+
+        async def wait_for_lock():
+            async with self.session_factory() as db:
+                await GroupRepository(db).create_group("regular")
+
+        waiting = asyncio.create_task(wait_for_lock())
+        await asyncio.sleep(0.2)
+        started = time.perf_counter()
+        gc.collect()
+        blocked = time.perf_counter() - started
+        blocker.rollback()
+        blocker.close()
+
+        self.assertLess(blocked, 1.0)
+        await waiting
+
+
+class TestRoutingSession(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.primary = await self.create_engine("primary")
+        self.replicas = [
+            await self.create_engine("replica-1"),
+            await self.create_engine("replica-2"),
+        ]
+        # the replicas have not caught up with the primary yet
+        async with self.primary.begin() as connection:
+            await connection.execute(
+                insert(Group).values(uuid=GROUP_ID, name="regular")
+            )
+        self.session_factory = create_session_factory(self.primary, self.replicas)
+
+    async def asyncTearDown(self):
+        for engine in [self.primary, *self.replicas]:
+            await engine.dispose()
+        self.directory.cleanup()
+
+    async def create_engine(self, name: str):
+        url = f"sqlite+aiosqlite:///{os.path.join(self.directory.name, name)}.db"
+        engine = create_database_engine(
+            Settings.model_validate({"database_url": url})
+        )
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        return engine
+
+    async def test_reads_go_to_replicas(self):
+        async with self.session_factory() as db:
+            group = await db.scalar(select(Group).where(Group.uuid == GROUP_ID))
+
+        self.assertIsNone(group)
+
+    async def test_locking_reads_go_to_primary(self):
+        async with self.session_factory() as db:
+            group = await db.scalar(
+                select(Group).where(Group.uuid == GROUP_ID).with_for_update()
+            )
+
+        self.assertEqual(group.name, "regular")
+
+    async def test_reads_marked_primary_go_to_primary(self):
+        async with self.session_factory() as db:
+            group = await db.scalar(
+                select(Group)
+                .where(Group.uuid == GROUP_ID)
+                .execution_options(primary=True)
+            )
+
+        self.assertEqual(group.name, "regular")
+
+    async def test_user_read_before_a_write_comes_from_primary(self):
+        async with self.primary.begin() as connection:
+            await connection.execute(insert(User).values(uuid=USER_ID, name="catalin"))
+            await connection.execute(
+                insert(UserGroup).values(user_uuid=USER_ID, group_uuid=GROUP_ID)
+            )
+
+        async with self.session_factory() as db:
+            user = await UserRepository(db).get_user_by_id(USER_ID, primary=True)
+            # the session stays on the primary, the groups' SELECT ... IN too
+            groups = [group.name for group in user.group]
+        async with self.session_factory() as db:
+            lagging = await UserRepository(db).get_user_by_id(USER_ID)
+
+        self.assertEqual((user.name, user.version, groups), ("catalin", 1, ["regular"]))
+        self.assertIsNone(lagging)
+
+    async def test_session_reads_its_own_writes_from_primary(self):
+        async with self.session_factory() as db:
+            await db.execute(
+                update(Group).where(Group.uuid == GROUP_ID).values(name="admin")
+            )
+            await db.commit()
+            group = await db.scalar(select(Group).where(Group.uuid == GROUP_ID))
+
+        self.assertEqual(group.name, "admin")
+
+    async def test_flushes_go_to_primary(self):
+        async with self.session_factory() as db:
+            db.add(Group(uuid=OTHER_GROUP_ID, name="admin"))
+            await db.commit()
+
+        async with self.primary.connect() as connection:
+            names = (await connection.scalars(select(Group.name))).all()
+        self.assertEqual(sorted(names), ["admin", "regular"])
+
+    async def test_without_replicas_everything_uses_primary(self):
+        session_factory = create_session_factory(self.primary)
+
+        async with session_factory() as db:
+            group = await db.scalar(select(Group).where(Group.uuid == GROUP_ID))
+
+        self.assertEqual(group.name, "regular")
+
+
+class TestReplicaRouter(TestCase):
+
+    def test_round_robin(self):
+        router = ReplicaRouter("primary", ["replica-1", "replica-2"])
+
+        chosen = [router.choose_replica() for _ in range(4)]
+
+        self.assertEqual(chosen, ["replica-1", "replica-2", "replica-1", "replica-2"])
+
+    def replica(self, pool_class, checked_out: int | None = None):
+        replica = MagicMock()
+        replica.pool = MagicMock(spec=pool_class)
+        if checked_out is not None:
+            replica.pool.checkedout.return_value = checked_out
+        return replica
+
+    def test_least_connections(self):
+        busy = self.replica(QueuePool, 3)
+        idle = self.replica(QueuePool, 1)
+        router = ReplicaRouter("primary", [busy, idle], "least_connections")
+
+        self.assertIs(router.choose_replica(), idle)
+
+    def test_least_connections_without_queue_pools_takes_turns(self):
+        replicas = [self.replica(NullPool), self.replica(StaticPool)]
+        router = ReplicaRouter("primary", replicas, "least_connections")
+
+        chosen = [router.choose_replica() for _ in range(3)]
+
+        self.assertEqual(chosen, [replicas[0], replicas[1], replicas[0]])
+
+
+class TestDisposeEngines(IsolatedAsyncioTestCase):
+
+    async def test_disposes_primary_and_replicas(self):
+        primary = AsyncMock()
+        replicas = [AsyncMock(), AsyncMock()]
+
+        with patch("app.core.database.engine", primary), patch(
+            "app.core.database.replica_engines", replicas
+        ):
+            await dispose_engines()
+
+        for database_engine in [primary, *replicas]:
+            database_engine.dispose.assert_awaited_once_with()
+
+
+class TestIsForeignKeyViolation(TestCase):
+
+    def test_sqlite_foreign_key_violation(self):
+        error = IntegrityError("INSERT", {}, Exception("FOREIGN KEY constraint failed"))
+
+        self.assertTrue(is_foreign_key_violation(error))
+
+    def test_postgresql_foreign_key_violation(self):
+        error = IntegrityError("INSERT", {}, MagicMock(sqlstate="23503"))
+
+        self.assertTrue(is_foreign_key_violation(error))
+
+    def test_unique_violation(self):
+        error = IntegrityError(
+            "INSERT", {}, Exception("UNIQUE constraint failed: user.name")
+        )
+
+        self.assertFalse(is_foreign_key_violation(error))
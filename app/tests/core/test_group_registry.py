@@ -0,0 +1,74 @@
+import asyncio
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import AsyncMock, MagicMock
+
+from app.core.group_registry import GroupRegistry, RegisteredGroup
+
+GROUP_ID = "be2a91c4-df99-490d-9061-bc12f50a80b7"
+OTHER_GROUP_ID = "b34d63a3-12fd-456e-b6d7-27c8ab69a6e3"
+
+
+def make_group(uuid: str, name: str):
+    group = MagicMock(uuid=uuid, version=1)
+    group.name = name
+    return group
+
+
+class TestGroupRegistry(IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.registry = GroupRegistry()
+        self.repository = AsyncMock()
+        self.repository.get_registry_version.return_value = 1
+        self.repository.get_every_group.return_value = [make_group(GROUP_ID, "admin")]
+
+    async def test_load_indexes_groups_by_id(self):
+        await self.registry.load(self.repository)
+
+        group = RegisteredGroup(GROUP_ID, "admin", 1)
+        self.assertEqual(self.registry.by_id, {GROUP_ID: group})
+        self.assertEqual(
+            self.registry.metrics(), {"version": 1, "groups": 1, "loads": 1}
+        )
+
+    async def test_maps_are_read_only(self):
+        await self.registry.load(self.repository)
+
+        with self.assertRaises(TypeError):
+            self.registry.by_id[OTHER_GROUP_ID] = None
+
+    async def test_refresh_skips_current_registry(self):
+        await self.registry.load(self.repository)
+
+        self.assertFalse(await self.registry.refresh(self.repository))
+        self.repository.get_every_group.assert_called_once_with()
+
+    async def test_refresh_reloads_once_version_moved(self):
+        await self.registry.load(self.repository)
+        self.repository.get_registry_version.return_value = 2
+        self.repository.get_every_group.return_value = [
+            make_group(GROUP_ID, "admin"),
+            make_group(OTHER_GROUP_ID, "regular"),
+        ]
+
+        self.assertTrue(await self.registry.refresh(self.repository))
+        self.assertEqual(self.registry.version, 2)
+        self.assertIn(OTHER_GROUP_ID, self.registry.by_id)
+
+    async def test_concurrent_refreshes_load_once(self):
+        await asyncio.gather(
+            *(self.registry.refresh(self.repository) for _ in range(10))
+        )
+
+        self.repository.get_every_group.assert_called_once_with()
+
+    async def test_load_keeps_newer_registry(self):
+        self.repository.get_registry_version.return_value = 3
+        await self.registry.load(self.repository)
+        self.repository.get_registry_version.return_value = 2
+        self.repository.get_every_group.return_value = []
+
+        await self.registry.load(self.repository)
+
+        self.assertEqual(self.registry.version, 3)
+        self.assertIn(GROUP_ID, self.registry.by_id)
@@ -0,0 +1,49 @@
+import unittest
+
+from starlette.requests import Request
+
+from app.core.http_cache import etag_matches, if_match_versions, make_etag
+
+
+def request_with(value: str | None, header: bytes = b"if-none-match") -> Request:
+    headers = []
+    if value is not None:
+        headers.append((header, value.encode()))
+    return Request({"type": "http", "headers": headers})
+
+
+class TestHttpCache(unittest.TestCase):
+
+    def test_etag_depends_on_body(self):
+        self.assertEqual(make_etag(b'{"a":1}'), make_etag(b'{"a":1}'))
+        self.assertNotEqual(make_etag(b'{"a":1}'), make_etag(b'{"a":2}'))
+        self.assertRegex(make_etag(b""), r'^"[0-9a-f]{32}"$')
+
+    def test_etag_matches(self):
+        etag = make_etag(b"body")
+        cases = [
+            (None, False),
+            ("", False),
+            (etag, True),
+            (f"W/{etag}", True),
+            (f'"other", {etag}', True),
+            ('"other"', False),
+            ("*", True),
+        ]
+        for header, expected in cases:
+            with self.subTest(header=header):
+                self.assertEqual(etag_matches(request_with(header), etag), expected)
+
+    def test_if_match_versions(self):
+        cases = [
+            (None, None),
+            ("*", None),
+            ('"3"', {3}),
+            ('"3", "5"', {3, 5}),
+            ('W/"3"', set()),
+            ('"abc"', set()),
+        ]
+        for header, expected in cases:
+            with self.subTest(header=header):
+                request = request_with(header, b"if-match")
+                self.assertEqual(if_match_versions(request), expected)
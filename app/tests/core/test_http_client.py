@@ -0,0 +1,114 @@
+import asyncio
+import unittest
+from unittest.mock import AsyncMock, patch
+
+import httpx
+
+from app.core.http_client import UrlFetcher, create_http_client
+
+
+class TestUrlFetcher(unittest.IsolatedAsyncioTestCase):
+
+    def fetcher(self, handler, **kwargs):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        self.addAsyncCleanup(client.aclose)
+        return UrlFetcher(client, backoff_seconds=0, **kwargs)
+
+    async def test_get_success(self):
+        fetcher = self.fetcher(lambda request: httpx.Response(200, text="ok"))
+
+        response = await fetcher.get("https://api.github.com/")
+
+        self.assertEqual(response.text, "ok")
+        self.assertEqual(fetcher.metrics()["succeeded"], 1)
+        self.assertEqual(fetcher.metrics()["retried"], 0)
+
+    async def test_get_retries_transient_errors(self):
+        responses = iter([httpx.Response(503), httpx.Response(200, text="ok")])
+        fetcher = self.fetcher(lambda request: next(responses))
+
+        response = await fetcher.get("https://api.github.com/")
+
+        self.assertEqual(response.text, "ok")
+        self.assertEqual(fetcher.metrics()["retried"], 1)
+
+    async def test_get_retries_transport_errors(self):
+        attempts = []
+
+        def handler(request):
+            attempts.append(request)
+            if len(attempts) < 3:
+                raise httpx.ConnectError("connection refused", request=request)
+            return httpx.Response(200, text="ok")
+
+        fetcher = self.fetcher(handler)
+
+        response = await fetcher.get("https://api.github.com/")
+
+        self.assertEqual(response.text, "ok")
+        self.assertEqual(len(attempts), 3)
+
+    async def test_get_gives_up_after_max_retries(self):
+        fetcher = self.fetcher(lambda request: httpx.Response(502), max_retries=2)
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            await fetcher.get("https://api.github.com/")
+
+        self.assertEqual(fetcher.metrics()["retried"], 2)
+        self.assertEqual(fetcher.metrics()["failed"], 1)
+
+    async def test_get_does_not_retry_client_errors(self):
+        fetcher = self.fetcher(lambda request: httpx.Response(404))
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            await fetcher.get("https://api.github.com/")
+
+        self.assertEqual(fetcher.metrics()["retried"], 0)
+
+    @patch("app.core.http_client.asyncio.sleep", new_callable=AsyncMock)
+    async def test_get_backs_off_exponentially(self, mock_sleep):
+        fetcher = self.fetcher(lambda request: httpx.Response(503), max_retries=3)
+        fetcher.backoff_seconds = 0.5
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            await fetcher.get("https://api.github.com/")
+
+        self.assertEqual(
+            [call.args[0] for call in mock_sleep.await_args_list], [0.5, 1.0, 2.0]
+        )
+
+    async def test_get_bounds_concurrency(self):
+        release = asyncio.Event()
+        peak = 0
+
+        async def handler(request):
+            nonlocal peak
+            peak = max(peak, fetcher.in_flight)
+            await release.wait()
+            return httpx.Response(200)
+
+        fetcher = self.fetcher(handler, max_concurrency=2)
+
+        tasks = [
+            asyncio.create_task(fetcher.get("https://api.github.com/"))
+            for _ in range(5)
+        ]
+        await asyncio.sleep(0.01)
+
+        self.assertEqual(fetcher.metrics()["in_flight"], 2)
+        self.assertEqual(fetcher.metrics()["queue_depth"], 3)
+
+        release.set()
+        await asyncio.gather(*tasks)
+
+        self.assertEqual(peak, 2)
+        self.assertEqual(fetcher.metrics()["queue_depth"], 0)
+        self.assertEqual(fetcher.metrics()["succeeded"], 5)
+
+
+class TestCreateHttpClient(unittest.IsolatedAsyncioTestCase):
+
+    async def test_client_has_timeouts_and_pool_limits(self):
+        async with create_http_client() as client:
+            self.assertEqual(client.timeout.connect, 5.0)
+            self.assertEqual(client.timeout.read, 10.0)
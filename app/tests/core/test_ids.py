@@ -0,0 +1,73 @@
+import uuid
+from unittest import IsolatedAsyncioTestCase, TestCase
+from unittest.mock import patch
+
+from sqlalchemy import select, text
+
+from app.core.config import get_settings
+from app.core.ids import canonical_uuid, new_uuid, uuid7
+from app.model import Group
+from app.tests.database import create_test_database
+
+GROUP_ID = "be2a91c4-df99-490d-9061-bc12f50a80b7"
+
+
+class TestUuid7(TestCase):
+
+    def test_version_and_variant(self):
+        value = uuid7()
+
+        self.assertEqual(value.version, 7)
+        self.assertEqual(value.variant, uuid.RFC_4122)
+
+    @patch("app.core.ids.time.time_ns")
+    def test_ordered_by_creation_time(self, mock_time_ns):
+        mock_time_ns.side_effect = [1_000_000_000_000_000, 1_000_000_001_000_000]
+
+        first, second = uuid7(), uuid7()
+
+        self.assertLess(first.bytes, second.bytes)
+        self.assertEqual(first.int >> 80, 1_000_000_000)
+
+    def test_new_uuid_follows_configured_version(self):
+        for version in (4, 7):
+            with self.subTest(version=version):
+                with patch.object(get_settings(), "uuid_version", version):
+                    self.assertEqual(uuid.UUID(new_uuid()).version, version)
+
+    def test_canonical_uuid(self):
+        self.assertEqual(canonical_uuid(GROUP_ID.upper().replace("-", "")), GROUP_ID)
+        self.assertIsNone(canonical_uuid("not-a-uuid"))
+
+
+class TestGuid(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine, session_factory = await create_test_database()
+        self.db = session_factory()
+        self.db.add(Group(uuid=GROUP_ID, name="regular"))
+        await self.db.commit()
+        self.db.expunge_all()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        await self.engine.dispose()
+
+    async def test_stored_as_16_bytes_and_read_as_string(self):
+        stored = await self.db.scalar(text('SELECT uuid FROM "group"'))
+        group = await self.db.scalar(select(Group))
+
+        self.assertEqual(stored, uuid.UUID(GROUP_ID).bytes)
+        self.assertEqual(group.uuid, GROUP_ID)
+
+    async def test_lookup_accepts_any_uuid_spelling(self):
+        group = await self.db.scalar(
+            select(Group).where(Group.uuid == GROUP_ID.upper().replace("-", ""))
+        )
+
+        self.assertEqual(group.name, "regular")
+
+    async def test_lookup_of_malformed_id_finds_nothing(self):
+        group = await self.db.scalar(select(Group).where(Group.uuid == "not-a-uuid"))
+
+        self.assertIsNone(group)
@@ -0,0 +1,97 @@
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import text
+
+from app.core.instrumentation import (REQUEST_QUERIES,
+                                      InstrumentationMiddleware, QueryStats,
+                                      current_query_stats)
+from app.tests.database import create_test_database
+
+
+class TestQueryStats(TestCase):
+
+    def test_record_keeps_slowest_statement(self):
+        stats = QueryStats()
+
+        stats.record("SELECT 1", 0.002)
+        stats.record("SELECT 2", 0.005)
+        stats.record("SELECT 3", 0.001)
+
+        self.assertEqual(stats.count, 3)
+        self.assertAlmostEqual(stats.seconds, 0.008)
+        self.assertEqual(stats.slowest_statement, "SELECT 2")
+        self.assertEqual(stats.slowest_seconds, 0.005)
+
+
+class TestInstrumentation(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine, _ = await create_test_database()
+        self.app = FastAPI()
+        self.app.add_middleware(InstrumentationMiddleware)
+
+        @self.app.get("/items/{item_id}")
+        async def get_item(item_id: int):
+            async with self.engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+                await connection.execute(text("SELECT 2"))
+            return {"item_id": item_id}
+
+        self.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=self.app), base_url="http://test"
+        )
+
+    async def asyncTearDown(self):
+        await self.client.aclose()
+        await self.engine.dispose()
+
+    async def test_engine_statements_recorded_into_current_stats(self):
+        stats = QueryStats()
+        token = current_query_stats.set(stats)
+        try:
+            async with self.engine.connect() as connection:
+                await connection.execute(text("SELECT 1"))
+        finally:
+            current_query_stats.reset(token)
+
+        self.assertEqual(stats.count, 1)
+        self.assertEqual(stats.slowest_statement, "SELECT 1")
+
+    async def test_statements_outside_a_request_not_recorded(self):
+        async with self.engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+        self.assertIsNone(current_query_stats.get())
+
+    async def test_server_timing_header_reports_queries(self):
+        with self.assertLogs("app.core.instrumentation") as logs:
+            response = await self.client.get("/items/1")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertRegex(
+            response.headers["server-timing"],
+            r'^db;dur=[\d.]+;desc="2 queries", app;dur=[\d.]+$',
+        )
+        self.assertIn('"route":"/items/{item_id}"', logs.output[0])
+        self.assertIn('"db_queries":2', logs.output[0])
+
+    async def test_query_histogram_labelled_by_route_template(self):
+        histogram = REQUEST_QUERIES.labels("GET", "/items/{item_id}")
+        before = histogram._sum.get()
+
+        await self.client.get("/items/1")
+        await self.client.get("/items/2")
+
+        self.assertEqual(histogram._sum.get() - before, 4)
+
+    async def test_unmatched_path_shares_one_label(self):
+        histogram = REQUEST_QUERIES.labels("GET", "unmatched")
+        before = sum(bucket.get() for bucket in histogram._buckets)
+
+        response = await self.client.get("/missing")
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(sum(bucket.get() for bucket in histogram._buckets), before + 1)
+        self.assertIn("server-timing", response.headers)
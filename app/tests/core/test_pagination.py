@@ -0,0 +1,20 @@
+import unittest
+
+from app.core.pagination import decode_cursor, encode_cursor
+
+
+class TestPagination(unittest.TestCase):
+
+    def test_cursor_round_trip(self):
+        key = "510a0b32-d4e5-40bb-bc6e-a7ddbd2cacb3"
+        cursor = encode_cursor(key)
+
+        self.assertNotIn(key, cursor)
+        self.assertNotIn("=", cursor)
+        self.assertEqual(decode_cursor(cursor), key)
+
+    def test_decode_invalid_cursor(self):
+        with self.assertRaises(ValueError) as context:
+            decode_cursor("not a cursor!")
+
+        self.assertEqual(context.exception.args[0], "Invalid cursor: not a cursor!")
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+
+import httpx
+
+from app.core.http_client import UrlFetcher
+from app.core.url_template_cache import UrlTemplateCache
+
+URL = "https://api.github.com/"
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestUrlTemplateCache(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.requests = []
+        self.upstream_etag = '"v1"'
+        self.upstream_body = '{"user_url": "https://api.github.com/{user}"}'
+
+    def handler(self, request):
+        self.requests.append(request)
+        if request.headers.get("If-None-Match") == self.upstream_etag:
+            return httpx.Response(304, headers={"ETag": self.upstream_etag})
+        return httpx.Response(
+            200, text=self.upstream_body, headers={"ETag": self.upstream_etag}
+        )
+
+    def cache(self, **kwargs):
+        client = httpx.AsyncClient(transport=httpx.MockTransport(self.handler))
+        self.addAsyncCleanup(client.aclose)
+        return UrlTemplateCache(
+            UrlFetcher(client), ttl_seconds=60, clock=self.clock, **kwargs
+        )
+
+    async def test_serves_fresh_entries_from_memory(self):
+        cache = self.cache()
+
+        first = await cache.get(URL)
+        second = await cache.get(URL)
+
+        self.assertEqual(first, self.upstream_body)
+        self.assertEqual(second, self.upstream_body)
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(cache.metrics()["hits"], 1)
+        self.assertEqual(cache.metrics()["misses"], 1)
+
+    async def test_revalidates_expired_entry_with_etag(self):
+        cache = self.cache()
+        await cache.get(URL)
+        self.clock.now += 61
+
+        body = await cache.get(URL)
+
+        self.assertEqual(body, self.upstream_body)
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual(self.requests[1].headers["If-None-Match"], '"v1"')
+        self.assertEqual(cache.metrics()["revalidations"], 1)
+
+        await cache.get(URL)
+        self.assertEqual(len(self.requests), 2)
+
+    async def test_refetches_changed_upstream(self):
+        cache = self.cache()
+        await cache.get(URL)
+        self.clock.now += 61
+        self.upstream_etag = '"v2"'
+        self.upstream_body = '{"user_url": "https://example.com/{user}"}'
+
+        body = await cache.get(URL)
+
+        self.assertEqual(body, self.upstream_body)
+        self.assertEqual(cache.metrics()["misses"], 2)
+
+    async def test_evicts_least_recently_used(self):
+        cache = self.cache(max_entries=2)
+
+        await cache.get("https://a.example/")
+        await cache.get("https://b.example/")
+        await cache.get("https://a.example/")
+        await cache.get("https://c.example/")
+        await cache.get("https://b.example/")
+
+        self.assertEqual(cache.metrics()["entries"], 2)
+        self.assertEqual(
+            [request.url.host for request in self.requests],
+            ["a.example", "b.example", "c.example", "b.example"],
+        )
+
+    async def test_concurrent_misses_fetch_once(self):
+        cache = self.cache()
+
+        bodies = await asyncio.gather(*(cache.get(URL) for _ in range(20)))
+
+        self.assertEqual(set(bodies), {self.upstream_body})
+        self.assertEqual(len(self.requests), 1)
+
+    async def test_persists_entries_across_instances(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "templates.json")
+            await self.cache(persist_path=path).get(URL)
+
+            with open(path) as file:
+                self.assertEqual(json.load(file)[URL]["etag"], '"v1"')
+
+            restarted = self.cache(persist_path=path)
+            body = await restarted.get(URL)
+
+        self.assertEqual(body, self.upstream_body)
+        self.assertEqual(len(self.requests), 1)
+        self.assertEqual(restarted.metrics()["hits"], 1)
+
+    async def test_concurrent_fetches_persist_every_entry(self):
+        urls = [f"{URL}{i}" for i in range(20)]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "templates.json")
+            cache = self.cache(persist_path=path)
+
+            await asyncio.gather(*(cache.get(url) for url in urls))
+
+            with open(path) as file:
+                self.assertEqual(set(json.load(file)), set(urls))
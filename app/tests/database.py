@@ -0,0 +1,71 @@
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.config import Settings
+from app.core.database import Base, create_database_engine
+
+
+async def create_test_database():
+    """
+    Returns an engine and session factory for an in-memory SQLite database
+    holding the application schema
+    """
+    engine = create_database_engine(
+        Settings(database_url="sqlite+aiosqlite://"), poolclass=StaticPool
+    )
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    session_factory = async_sessionmaker(
+        bind=engine, autoflush=False, expire_on_commit=False
+    )
+    return engine, session_factory
+
+
+@contextmanager
+def count_statements(engine: AsyncEngine):
+    """
+    Records the SQL statements sent to the database while the block runs; an
+    executemany counts once
+    """
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+@contextmanager
+def capture_statements(engine: AsyncEngine):
+    """
+    Records the SQL statements sent to the database while the block runs,
+    with the parameters of their first execution
+    """
+    statements = []
+
+    def record(connection, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters[0] if executemany else parameters))
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+async def explain_query_plan(engine: AsyncEngine, statement: str, parameters):
+    """
+    Returns the detail lines of SQLite's query plan for a recorded statement
+    """
+    async with engine.connect() as connection:
+        result = await connection.exec_driver_sql(
+            f"EXPLAIN QUERY PLAN {statement}", parameters
+        )
+        return [row.detail for row in result]
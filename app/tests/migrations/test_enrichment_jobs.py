@@ -0,0 +1,58 @@
+import os
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from unittest import TestCase
+from unittest.mock import patch
+
+from alembic import command
+from alembic.config import Config
+
+from app.core.config import Settings
+
+SCRIPT_LOCATION = Path(__file__).parents[2] / "migrations"
+
+
+class TestEnrichmentJobsMigration(TestCase):
+    """
+    Upgrades a SQLite file holding users from before the job queue and checks
+    the jobs queued for the users never enriched
+    """
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "test.db")
+        self.config = Config()
+        self.config.set_main_option("script_location", str(SCRIPT_LOCATION))
+        settings = Settings.model_validate(
+            {"database_url": f"sqlite+aiosqlite:///{self.path}"}
+        )
+        # env.py migrates the database the application is configured for
+        patcher = patch("app.core.config.get_settings", return_value=settings)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_backfilled_jobs_are_queued_at_migration_time(self):
+        command.upgrade(self.config, "c28dd1cbceb5")
+        with sqlite3.connect(self.path) as connection:
+            connection.executemany(
+                'INSERT INTO "user" (uuid, name, urls) VALUES (?, ?, ?)',
+                [("user-1", "catalin", None), ("user-2", "iulia", '{"url": "1"}')],
+            )
+        started = time.time()
+
+        command.upgrade(self.config, "9a70de2f2ef8")
+
+        with sqlite3.connect(self.path) as connection:
+            jobs = connection.execute(
+                "SELECT user_uuid, status, run_after, created_at FROM enrichment_job"
+            ).fetchall()
+        self.assertEqual([job[:2] for job in jobs], [("user-1", "pending")])
+        _, _, run_after, created_at = jobs[0]
+        self.assertEqual(run_after, created_at)
+        self.assertGreaterEqual(created_at, started)
+        self.assertLessEqual(created_at, time.time())
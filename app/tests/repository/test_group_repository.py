@@ -1,17 +1,22 @@
-from unittest import TestCase
+from unittest import IsolatedAsyncioTestCase
 from unittest.mock import MagicMock, create_autospec, patch
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.model.group_model import Group
+from app.model.group_registry_version import GroupRegistryVersion
+from app.model.user_group import UserGroup
+from app.model.user_model import User
 from app.repository.group_repository import GroupRepository
+from app.tests.database import create_test_database
 
 
-class TestGroupRepository(TestCase):
+class TestGroupRepository(IsolatedAsyncioTestCase):
 
     def setUp(self):
 
-        self.db = create_autospec(Session)
+        self.db = create_autospec(AsyncSession)
 
         self.group_repository = GroupRepository(self.db)
 
@@ -23,84 +28,235 @@ class TestGroupRepository(TestCase):
             uuid="b34d63a3-12fd-456e-b6d7-27c8ab69a6e3", name="admin"
         )
 
-    def test_get_group_by_id(self):
+    async def test_get_group_by_id(self):
 
-        mock_query = self.db.query.return_value
-        mock_query.filter.return_value.first.return_value = self.mock_group1
+        self.db.scalar.return_value = self.mock_group1
 
-        retrieved_group = self.group_repository.get_group_by_id(self.mock_group1.uuid)
+        retrieved_group = await self.group_repository.get_group_by_id(
+            self.mock_group1.uuid
+        )
 
-        self.db.query.assert_called_once_with(Group)
+        statement = self.db.scalar.call_args[0][0]
+        self.assertEqual(
+            str(statement),
+            str(select(Group).where(Group.uuid == self.mock_group1.uuid)),
+        )
         self.assertEqual(retrieved_group, self.mock_group1)
 
-    def test_get_all_groups(self):
+    async def test_get_all_groups(self):
 
         mock_group = [self.mock_group1, self.mock_group2]
-        mock_query = self.db.query.return_value
-        mock_query.all.return_value = mock_group
+        self.db.scalars.return_value = MagicMock()
+        self.db.scalars.return_value.all.return_value = mock_group
 
-        retrieved_groups = self.group_repository.get_all_groups()
+        retrieved_groups = await self.group_repository.get_all_groups(10)
 
-        self.db.query.assert_called_once_with(Group)
+        self.assertEqual(
+            str(self.db.scalars.call_args[0][0]),
+            str(select(Group).order_by(Group.uuid).limit(10)),
+        )
         self.assertEqual(len(retrieved_groups), len(mock_group))
         self.assertEqual(retrieved_groups[0].uuid, self.mock_group1.uuid)
         self.assertEqual(retrieved_groups[1].uuid, self.mock_group2.uuid)
 
-    def test_check_exist_group_name(self):
+    async def test_get_all_groups_after_cursor(self):
 
-        mock_query = self.db.query.return_value
-        mock_query.filter.return_value.first.return_value = self.mock_group1
+        self.db.scalars.return_value = MagicMock()
+        self.db.scalars.return_value.all.return_value = [self.mock_group2]
 
-        retrieved_group = self.group_repository.check_exist_group_name(
-            self.mock_group1.name
-        )
+        await self.group_repository.get_all_groups(10, self.mock_group1.uuid)
 
-        self.db.query.assert_called_once_with(Group)
-        self.assertEqual(retrieved_group, self.mock_group1)
+        statement = self.db.scalars.call_args[0][0]
+        self.assertIn('WHERE "group".uuid > :uuid_1', str(statement))
+        self.assertEqual(statement.compile().params["uuid_1"], self.mock_group1.uuid)
+
+    async def test_get_every_group(self):
+
+        self.db.scalars.return_value = MagicMock()
+        self.db.scalars.return_value.all.return_value = [
+            self.mock_group1,
+            self.mock_group2,
+        ]
 
-    @patch("uuid.uuid4", return_value="be2a91c4-df99-490d-9061-bc12f50a80b7")
-    def test_create_group(self, mock_uuid):
+        groups = await self.group_repository.get_every_group()
+
+        self.assertEqual(
+            str(self.db.scalars.call_args[0][0]),
+            str(select(Group).order_by(Group.uuid)),
+        )
+        self.assertEqual(groups, [self.mock_group1, self.mock_group2])
+
+    @patch(
+        "app.repository.group_repository.new_uuid",
+        return_value="be2a91c4-df99-490d-9061-bc12f50a80b7",
+    )
+    async def test_create_group(self, mock_uuid):
 
         new_group_name = "regular"
 
-        created_group = self.group_repository.create_group(new_group_name)
+        created_group = await self.group_repository.create_group(new_group_name)
 
         self.db.add.assert_called_once()
-        self.db.commit.assert_called_once()
-        self.db.refresh.assert_called_once_with(created_group)
+        self.db.commit.assert_awaited_once()
 
         self.assertEqual(created_group.uuid, self.mock_group1.uuid)
         self.assertEqual(created_group.name, new_group_name)
 
-    def test_update_group(self):
+    async def test_update_group(self):
 
         updated_group_name = "updated_name"
 
-        self.db.query.return_value.filter.return_value.first.return_value = (
-            self.mock_group1
-        )
+        self.mock_group1.name = updated_group_name
+        self.db.scalar.return_value = self.mock_group1
 
-        updated_group = self.group_repository.update_group(
+        updated_group = await self.group_repository.update_group(
             self.mock_group1.uuid, updated_group_name
         )
 
-        self.mock_group1.name = updated_group_name
-        self.db.query.return_value.filter.return_value.update.assert_called_once_with(
-            {Group.name: updated_group_name}
+        self.db.scalar.assert_awaited_once()
+        update_statement = self.db.scalar.call_args[0][0]
+        self.assertEqual(update_statement.table, Group.__table__)
+        self.assertEqual(update_statement.compile().params["name"], updated_group_name)
+        self.assertIn("RETURNING", str(update_statement))
+
+        # the members' and the registry versions are bumped in the same
+        # transaction
+        member_bump, registry_bump = self.db.execute.call_args_list
+        self.assertEqual(member_bump[0][0].table.name, User.__tablename__)
+        self.assertEqual(
+            registry_bump[0][0].table.name, GroupRegistryVersion.__tablename__
         )
-
-        self.db.commit.assert_called_once()
-        self.db.query.return_value.filter.return_value.first.assert_called_once()
+        self.db.commit.assert_awaited_once()
 
         self.assertEqual(updated_group.name, updated_group_name)
 
-    def test_delete_group_by_id(self):
+    async def test_update_group_stale_version(self):
+
+        self.db.scalar.return_value = None
+
+        updated_group = await self.group_repository.update_group(
+            self.mock_group1.uuid, "admin", {3}
+        )
+
+        update_statement = self.db.scalar.call_args[0][0]
+        self.assertIn('"group".version IN', str(update_statement))
+        self.db.execute.assert_not_awaited()
+        self.assertIsNone(updated_group)
+
+    async def test_delete_group_by_id(self):
+
+        self.db.scalar.return_value = self.mock_group1.uuid
+
+        deleted_id = await self.group_repository.delete_group_by_id(
+            self.mock_group1.uuid
+        )
+
+        # the members' versions are bumped first, then the memberships go
+        # with the group through the foreign key cascade
+        member_bump, registry_bump = [
+            call[0][0] for call in self.db.execute.call_args_list
+        ]
+        self.assertEqual(member_bump.table, User.__table__)
+        self.assertEqual(registry_bump.table.name, GroupRegistryVersion.__tablename__)
+        group_delete = self.db.scalar.call_args[0][0]
+        self.assertEqual(group_delete.table, Group.__table__)
+        self.assertIn("RETURNING", str(group_delete))
+        self.db.delete.assert_not_awaited()
+        self.db.commit.assert_awaited_once()
+        self.assertEqual(deleted_id, self.mock_group1.uuid)
+
+
+GROUP_ID = "be2a91c4-df99-490d-9061-bc12f50a80b7"
+USER_IDS = [f"10000000-0000-7000-8000-00000000000{i}" for i in range(5)]
+OTHER_GROUP_ID = "b34d63a3-12fd-456e-b6d7-27c8ab69a6e3"
+MISSING_USER_ID = "00000000-0000-0000-0000-000000000000"
+
+
+class TestGroupRepositoryMembers(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine, session_factory = await create_test_database()
+        self.db = session_factory()
+        self.group_repository = GroupRepository(self.db)
+        self.db.add(Group(uuid=GROUP_ID, name="admin"))
+        self.db.add_all(User(uuid=user_id, name=user_id) for user_id in USER_IDS)
+        await self.db.flush()
+        self.db.add(UserGroup(user_uuid=USER_IDS[0], group_uuid=GROUP_ID))
+        await self.db.commit()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        await self.engine.dispose()
+
+    async def members(self):
+        result = await self.db.scalars(
+            select(UserGroup.user_uuid).where(UserGroup.group_uuid == GROUP_ID)
+        )
+        return sorted(result.all())
+
+    async def versions(self):
+        result = await self.db.execute(
+            select(User.uuid, User.version).order_by(User.uuid)
+        )
+        return [version for _, version in result.all()]
+
+    @patch("app.repository.group_repository.SQL_IN_CHUNK_SIZE", 2)
+    async def test_add_members_skips_members_and_missing_users(self):
+
+        added = await self.group_repository.add_members(
+            GROUP_ID, [*USER_IDS, MISSING_USER_ID]
+        )
+
+        self.assertEqual(sorted(added), USER_IDS[1:])
+        self.assertEqual(await self.members(), USER_IDS)
+        self.assertEqual(await self.versions(), [1, 2, 2, 2, 2])
+
+    @patch("app.repository.group_repository.SQL_IN_CHUNK_SIZE", 2)
+    async def test_remove_members_skips_non_members(self):
+
+        removed = await self.group_repository.remove_members(GROUP_ID, USER_IDS[:3])
+
+        self.assertEqual(removed, USER_IDS[:1])
+        self.assertEqual(await self.members(), [])
+        self.assertEqual(await self.versions(), [2, 1, 1, 1, 1])
+
+    async def test_get_members_pages_in_user_order(self):
+        await self.group_repository.add_members(GROUP_ID, USER_IDS)
+
+        first = await self.group_repository.get_members(GROUP_ID, 3)
+        rest = await self.group_repository.get_members(GROUP_ID, 3, first[-1].uuid)
+
+        self.assertEqual([member.uuid for member in first], USER_IDS[:3])
+        self.assertEqual([member.uuid for member in rest], USER_IDS[3:])
+        self.assertEqual(first[0].name, USER_IDS[0])
+
+    async def test_count_members(self):
+        self.db.add(Group(uuid=OTHER_GROUP_ID, name="regular"))
+        await self.db.commit()
+
+        counts = await self.group_repository.count_members()
+
+        self.assertEqual(
+            [tuple(row) for row in counts],
+            [(OTHER_GROUP_ID, "regular", 0), (GROUP_ID, "admin", 1)],
+        )
+
+    async def test_group_writes_bump_registry_version(self):
+        self.assertEqual(await self.group_repository.get_registry_version(), 0)
+
+        group = await self.group_repository.create_group("regular")
+        await self.group_repository.update_group(group.uuid, "renamed")
+        await self.group_repository.update_group(group.uuid, "stale", {7})
+        await self.group_repository.delete_group_by_id(group.uuid)
+        await self.group_repository.delete_group_by_id(group.uuid)
+
+        # the stale update and the second delete changed nothing
+        self.assertEqual(await self.group_repository.get_registry_version(), 3)
 
-        mock_query = self.db.query.return_value
-        mock_query.filter.return_value.first.return_value = self.mock_group1
+    async def test_delete_group_cascades_to_memberships(self):
+        await self.group_repository.add_members(GROUP_ID, USER_IDS)
 
-        self.group_repository.delete_group_by_id(self.mock_group1.uuid)
+        await self.group_repository.delete_group_by_id(GROUP_ID)
 
-        self.db.query.assert_called_once_with(Group)
-        self.db.delete.assert_called_once_with(self.mock_group1)
-        self.db.commit.assert_called_once()
+        self.assertEqual(await self.members(), [])
+        self.assertEqual(await self.versions(), [2, 3, 3, 3, 3])
@@ -0,0 +1,106 @@
+from unittest import IsolatedAsyncioTestCase
+
+from sqlalchemy import insert, select
+
+from app.model.enrichment_job import EnrichmentJob
+from app.repository.job_repository import JobRepository, new_enrichment_job
+from app.tests.database import create_test_database
+
+URL = "https://api.github.com/"
+USER_IDS = [f"10000000-0000-7000-8000-00000000000{i}" for i in range(3)]
+
+
+class TestJobRepository(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine, session_factory = await create_test_database()
+        self.db = session_factory()
+        self.job_repository = JobRepository(self.db)
+        await self.db.execute(
+            insert(EnrichmentJob),
+            [new_enrichment_job(user_id, URL, now=100.0) for user_id in USER_IDS],
+        )
+        await self.db.commit()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        await self.engine.dispose()
+
+    async def statuses(self):
+        self.db.expire_all()
+        result = await self.db.execute(
+            select(EnrichmentJob.user_uuid, EnrichmentJob.status).order_by(
+                EnrichmentJob.id
+            )
+        )
+        return [status for _, status in result.all()]
+
+    async def test_claim_jobs_leases_oldest_pending(self):
+        jobs = await self.job_repository.claim_jobs(2, 30.0, now=200.0)
+
+        self.assertEqual([job.user_uuid for job in jobs], USER_IDS[:2])
+        self.assertEqual([job.attempts for job in jobs], [1, 1])
+        self.assertEqual(await self.statuses(), ["running", "running", "pending"])
+
+    async def test_claim_jobs_skips_leased_and_future_jobs(self):
+        await self.job_repository.claim_jobs(1, 30.0, now=200.0)
+
+        jobs = await self.job_repository.claim_jobs(10, 30.0, now=210.0)
+
+        self.assertEqual([job.user_uuid for job in jobs], USER_IDS[1:])
+        self.assertEqual(await self.job_repository.claim_jobs(10, 30.0, 220.0), [])
+
+    async def test_claim_jobs_redelivers_expired_lease(self):
+        await self.job_repository.claim_jobs(1, 30.0, now=200.0)
+
+        jobs = await self.job_repository.claim_jobs(1, 30.0, now=231.0)
+
+        self.assertEqual([job.user_uuid for job in jobs], USER_IDS[:1])
+        self.assertEqual(jobs[0].attempts, 2)
+
+    async def test_claim_jobs_fails_expired_lease_on_last_attempt(self):
+        await self.job_repository.claim_jobs(1, 30.0, now=200.0, max_attempts=2)
+        await self.job_repository.claim_jobs(1, 30.0, now=231.0, max_attempts=2)
+
+        jobs = await self.job_repository.claim_jobs(1, 30.0, now=262.0, max_attempts=2)
+
+        self.assertEqual([job.user_uuid for job in jobs], USER_IDS[1:2])
+        self.assertEqual(await self.statuses(), ["failed", "running", "pending"])
+        failed = await self.db.scalar(
+            select(EnrichmentJob).where(EnrichmentJob.user_uuid == USER_IDS[0])
+        )
+        self.assertEqual(failed.attempts, 2)
+        self.assertEqual(failed.last_error, "lease expired")
+        self.assertEqual(failed.finished_at, 262.0)
+
+    async def test_complete_jobs(self):
+        jobs = await self.job_repository.claim_jobs(3, 30.0, now=200.0)
+
+        await self.job_repository.complete_jobs([jobs[0].id, jobs[2].id], now=205.0)
+
+        self.assertEqual(await self.statuses(), ["done", "running", "done"])
+
+    async def test_fail_jobs_retries_then_gives_up(self):
+        jobs = await self.job_repository.claim_jobs(3, 30.0, now=200.0)
+
+        await self.job_repository.fail_jobs(jobs, "boom", max_attempts=2, now=205.0)
+
+        self.assertEqual(await self.statuses(), ["pending", "pending", "pending"])
+        self.assertEqual(await self.job_repository.claim_jobs(3, 30.0, 206.0), [])
+
+        jobs = await self.job_repository.claim_jobs(3, 30.0, now=300.0)
+        await self.job_repository.fail_jobs(jobs, "boom", max_attempts=2, now=305.0)
+
+        self.assertEqual(await self.statuses(), ["failed", "failed", "failed"])
+
+    async def test_get_job_metrics(self):
+        jobs = await self.job_repository.claim_jobs(2, 30.0, now=200.0)
+        await self.job_repository.complete_jobs([jobs[0].id], now=205.0)
+
+        counts, oldest_pending, recently_done = (
+            await self.job_repository.get_job_metrics(now=210.0)
+        )
+
+        self.assertEqual(counts, {"pending": 1, "running": 1, "done": 1})
+        self.assertEqual(oldest_pending, 100.0)
+        self.assertEqual(recently_done, 1)
@@ -0,0 +1,135 @@
+import re
+from unittest import IsolatedAsyncioTestCase
+
+from app.model import Group
+from app.repository.group_repository import GroupRepository
+from app.repository.job_repository import JobRepository
+from app.repository.user_repository import UserRepository
+from app.tests.database import (capture_statements, create_test_database,
+                                explain_query_plan)
+
+URL = "https://api.github.com/"
+GROUP_ID = "be2a91c4-df99-490d-9061-bc12f50a80b7"
+MISSING_GROUP_ID = "00000000-0000-0000-0000-000000000000"
+# every combination of the filters of user pages and bulk deletes
+USER_FILTERS = [
+    {"name_prefix": "cat"},
+    {"group_id": GROUP_ID},
+    {"name_prefix": "cat", "group_id": GROUP_ID},
+]
+
+
+class TestQueryPlans(IsolatedAsyncioTestCase):
+    """
+    Runs every repository query against SQLite and checks with EXPLAIN QUERY
+    PLAN that filtered queries search an index. Only an unfiltered page,
+    walking an index up to its LIMIT, and the reads of a whole table may scan
+    """
+
+    async def asyncSetUp(self):
+        self.engine, session_factory = await create_test_database()
+        self.db = session_factory()
+        self.db.add(Group(uuid=GROUP_ID, name="regular"))
+        await self.db.commit()
+        self.user = await UserRepository(self.db).create_user("catalin", GROUP_ID, URL)
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        await self.engine.dispose()
+
+    async def assert_indexed(self, statements, whole_table=False):
+        self.assertTrue(statements)
+        for statement, parameters in statements:
+            plan = await explain_query_plan(self.engine, statement, parameters)
+            may_scan = not re.search(r"\bWHERE\b", statement) and (
+                whole_table or re.search(r"\bLIMIT\b", statement)
+            )
+            for detail in plan:
+                if not detail.startswith("SCAN "):
+                    continue
+                with self.subTest(statement=statement, detail=detail):
+                    self.assertTrue(
+                        may_scan and "INDEX" in detail, f"table scan: {detail}"
+                    )
+
+    async def test_user_reads(self):
+        user_repository = UserRepository(self.db)
+
+        with capture_statements(self.engine) as statements:
+            await user_repository.get_user_by_id(self.user.uuid)
+            await user_repository.get_existing_user_names(["catalin", "iulia"])
+            await user_repository.get_all_users(10)
+            await user_repository.get_all_users(10, self.user.uuid)
+
+        await self.assert_indexed(statements)
+
+    async def test_filtered_user_pages(self):
+        user_repository = UserRepository(self.db)
+
+        for filters in USER_FILTERS:
+            with self.subTest(**filters):
+                with capture_statements(self.engine) as statements:
+                    await user_repository.get_all_users(10, **filters)
+                    await user_repository.get_all_users(10, self.user.uuid, **filters)
+
+                await self.assert_indexed(statements)
+
+    async def test_user_writes(self):
+        user_repository = UserRepository(self.db)
+
+        with capture_statements(self.engine) as statements:
+            await user_repository.update_users_urls({self.user.uuid: {"url": URL}})
+            await user_repository.update_user(self.user, "iulia")
+            await user_repository.delete_user(self.user.uuid)
+            await user_repository.delete_users([self.user.uuid])
+
+        await self.assert_indexed(statements)
+
+    async def test_filtered_user_deletes(self):
+        user_repository = UserRepository(self.db)
+
+        for filters in USER_FILTERS:
+            with self.subTest(**filters):
+                with capture_statements(self.engine) as statements:
+                    await user_repository.delete_users(**filters)
+
+                await self.assert_indexed(statements)
+
+    async def test_group_queries(self):
+        group_repository = GroupRepository(self.db)
+
+        with capture_statements(self.engine) as statements:
+            await group_repository.get_group_by_id(GROUP_ID)
+            await group_repository.get_registry_version()
+            await group_repository.get_all_groups(10, MISSING_GROUP_ID)
+            await group_repository.get_members(GROUP_ID, 10, self.user.uuid)
+            await group_repository.update_group(GROUP_ID, "admin")
+            await group_repository.add_members(GROUP_ID, [self.user.uuid])
+            await group_repository.remove_members(GROUP_ID, [self.user.uuid])
+            await group_repository.delete_group_by_id(GROUP_ID)
+
+        await self.assert_indexed(statements)
+
+    async def test_job_queries(self):
+        job_repository = JobRepository(self.db)
+
+        with capture_statements(self.engine) as statements:
+            jobs = await job_repository.claim_jobs(10, 30.0, now=2e9)
+            await job_repository.complete_jobs([jobs[0].id], now=2e9)
+            await job_repository.fail_jobs(jobs, "boom", max_attempts=5, now=2e9)
+
+        await self.assert_indexed(statements)
+
+    async def test_whole_table_reads(self):
+        user_repository = UserRepository(self.db)
+        group_repository = GroupRepository(self.db)
+        job_repository = JobRepository(self.db)
+
+        with capture_statements(self.engine) as statements:
+            async for _ in user_repository.stream_all_users(100):
+                pass
+            await group_repository.get_every_group()
+            await group_repository.count_members()
+            await job_repository.get_job_metrics(now=2e9)
+
+        await self.assert_indexed(statements, whole_table=True)
@@ -1,18 +1,24 @@
-from unittest import TestCase
+from unittest import IsolatedAsyncioTestCase
 from unittest.mock import MagicMock, create_autospec, patch
 
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.constants import SQL_IN_CHUNK_SIZE, LoadStrategy
+from app.model.enrichment_job import EnrichmentJob
 from app.model.group_model import Group
+from app.model.user_group import UserGroup
 from app.model.user_model import User
 from app.repository.user_repository import UserRepository
+from app.tests.database import count_statements, create_test_database
 
 
-class TestUserRepository(TestCase):
+class TestUserRepository(IsolatedAsyncioTestCase):
 
     def setUp(self):
 
-        self.db = create_autospec(Session)
+        self.db = create_autospec(AsyncSession)
         self.userRepository = UserRepository(self.db)
 
         self.mock_group = Group(
@@ -38,125 +44,422 @@ class TestUserRepository(TestCase):
             group=[self.mock_group],
         )
 
-    def test_get_user_by_id(self):
+    async def test_get_user_by_id(self):
 
-        mock_query = self.db.query.return_value
-        mock_query.filter.return_value.first.return_value = self.mock_user1
+        self.db.scalars.return_value = MagicMock()
+        self.db.scalars.return_value.unique.return_value.one_or_none.return_value = (
+            self.mock_user1
+        )
 
-        retrieved_user = self.userRepository.get_user_by_id(
+        retrieved_user = await self.userRepository.get_user_by_id(
             "510a0b32-d4e5-40bb-bc6e-a7ddbd2cacb3"
         )
 
-        self.db.query.assert_called_once_with(User)
+        self.db.scalars.assert_awaited_once()
+        statement = self.db.scalars.call_args[0][0]
+        self.assertEqual(statement.column_descriptions[0]["entity"], User)
+        self.assertNotIn("JOIN", str(statement))
         self.assertEqual(retrieved_user, self.mock_user1)
 
-    def test_get_user_by_name(self):
-
-        mock_query = self.db.query.return_value
-        mock_query.filter.return_value.first.return_value = self.mock_user1
-
-        retrieved_user = self.userRepository.get_user_by_name("catalin")
-
-        self.db.query.assert_called_once_with(User)
-        self.assertEqual(retrieved_user, self.mock_user1)
-
-    def test_get_all_users(self):
+    async def test_get_all_users(self):
 
         mock_users = [self.mock_user1, self.mock_user2]
 
-        mock_query = self.db.query.return_value
-        mock_query.options.return_value.all.return_value = mock_users
+        self.db.scalars.return_value = MagicMock()
+        self.db.scalars.return_value.unique.return_value.all.return_value = mock_users
 
-        retrieved_users = self.userRepository.get_all_users()
+        retrieved_users = await self.userRepository.get_all_users(10)
 
+        self.db.scalars.assert_awaited_once()
+        statement = str(self.db.scalars.call_args[0][0])
+        self.assertIn('ORDER BY "user".uuid', statement)
+        self.assertIn("LIMIT", statement)
+        self.assertNotIn("WHERE", statement)
         for i in range(len(mock_users)):
             self.assertEqual(retrieved_users[i].uuid, mock_users[i].uuid)
             self.assertEqual(retrieved_users[i].name, mock_users[i].name)
             self.assertEqual(retrieved_users[i].urls, mock_users[i].urls)
             self.assertEqual(retrieved_users[i].group, mock_users[i].group)
 
-    @patch("uuid.uuid4", return_value="510a0b32-d4e5-40bb-bc6e-a7ddbd2cacb3")
-    def test_create_user(self, mock_uuid):
+    async def test_get_all_users_with_cursor_and_filters(self):
 
-        mock_group = MagicMock(uuid=self.mock_group.uuid, name=self.mock_group.name)
-        self.db.query.return_value.filter.return_value.first.return_value = mock_group
+        self.db.scalars.return_value = MagicMock()
+        self.db.scalars.return_value.unique.return_value.all.return_value = [
+            self.mock_user2
+        ]
 
-        created_user = self.userRepository.create_user(
-            "catalin", "be2a91c4-df99-490d-9061-bc12f50a80b7"
+        await self.userRepository.get_all_users(
+            10, self.mock_user1.uuid, "iu", self.mock_group.uuid
         )
 
-        self.db.query.assert_called_once_with(Group)
+        statement = self.db.scalars.call_args[0][0]
+        compiled = str(statement)
+        params = statement.compile().params
+        self.assertIn("user_group.user_uuid > :user_uuid_1", compiled)
+        self.assertIn('"user".name >= :name_1 AND "user".name < :name_2', compiled)
+        self.assertIn("ORDER BY user_group.user_uuid", compiled)
+        self.assertNotIn("EXISTS", compiled)
+        self.assertEqual(params["user_uuid_1"], self.mock_user1.uuid)
+        self.assertEqual((params["name_1"], params["name_2"]), ("iu", "iv"))
+
+    async def test_stream_all_users(self):
+
+        async def rows():
+            yield self.mock_user1
+            yield self.mock_user2
+
+        self.db.stream_scalars.return_value = rows()
+
+        streamed = [user async for user in self.userRepository.stream_all_users(500)]
 
-        filter_call_args = self.db.query.return_value.filter.call_args[0]
-        self.assertEqual(str(filter_call_args[0]), str(Group.uuid == mock_group.uuid))
+        statement = self.db.stream_scalars.call_args[0][0]
+        self.assertEqual(statement.get_execution_options()["yield_per"], 500)
+        self.assertIn('ORDER BY "user".uuid', str(statement))
+        self.assertEqual(streamed, [self.mock_user1, self.mock_user2])
+        self.db.close.assert_awaited_once()
 
+    @patch(
+        "app.repository.user_repository.new_uuid",
+        return_value="510a0b32-d4e5-40bb-bc6e-a7ddbd2cacb3",
+    )
+    async def test_create_user(self, mock_uuid):
+
+        created_user = await self.userRepository.create_user(
+            "catalin", "be2a91c4-df99-490d-9061-bc12f50a80b7", "https://api.github.com/"
+        )
+
+        self.db.scalar.assert_not_awaited()
         self.assertEqual(created_user.uuid, self.mock_user1.uuid)
         self.assertEqual(created_user.name, self.mock_user1.name)
-        self.assertIn(mock_group, created_user.group)
 
-        self.db.add.assert_called_once_with(created_user)
-        self.db.commit.assert_called_once()
-        self.db.refresh.assert_called_once_with(created_user)
+        self.assertEqual(self.db.add.call_args_list[0][0][0], created_user)
+        membership = self.db.add.call_args_list[1][0][0]
+        self.assertIsInstance(membership, UserGroup)
+        self.assertEqual(membership.user_uuid, created_user.uuid)
+        self.assertEqual(membership.group_uuid, self.mock_group.uuid)
+        enrichment_job = self.db.add.call_args_list[2][0][0]
+        self.assertIsInstance(enrichment_job, EnrichmentJob)
+        self.assertEqual(enrichment_job.user_uuid, created_user.uuid)
+        self.assertEqual(enrichment_job.url, "https://api.github.com/")
+        self.assertEqual(enrichment_job.status, "pending")
+        self.db.commit.assert_awaited_once()
+        self.db.refresh.assert_not_awaited()
+
+    async def test_update_users_urls(self):
+
+        await self.userRepository.update_users_urls(
+            {
+                self.mock_user1.uuid: {"user_url": "1"},
+                self.mock_user2.uuid: {"user_url": "2"},
+            }
+        )
 
-    @patch("app.model.user_model.User")
-    def test_update_user_url(self, mock_user):
+        statement, rows = self.db.execute.call_args[0]
+        self.assertEqual(statement.table, User.__table__)
+        self.assertEqual(
+            rows,
+            [
+                {"user_uuid": self.mock_user1.uuid, "user_urls": {"user_url": "1"}},
+                {"user_uuid": self.mock_user2.uuid, "user_urls": {"user_url": "2"}},
+            ],
+        )
+        self.db.commit.assert_awaited_once()
 
-        updated_content = {"current_user_url": "https://api.github.com/user"}
+    async def test_update_user(self):
 
-        self.db.query.return_value.filter.return_value.first.return_value = (
-            self.mock_user1
+        new_user_name = "updated name"
+        row = MagicMock()
+        row._mapping = {"name": new_user_name, "urls": None, "version": 2}
+        self.db.execute.return_value = MagicMock()
+        self.db.execute.return_value.one_or_none.return_value = row
+
+        updated_user = await self.userRepository.update_user(
+            self.mock_user1, new_user_name
         )
 
-        self.userRepository.update_user_url(self.mock_user1.uuid, updated_content)
+        self.db.execute.assert_awaited_once()
+        update_statement = self.db.execute.call_args[0][0]
+        self.assertEqual(update_statement.table, User.__table__)
+        self.assertIn("RETURNING", str(update_statement))
+        self.db.commit.assert_awaited_once()
+        self.assertIs(updated_user, self.mock_user1)
+        self.assertEqual(updated_user.name, new_user_name)
+        self.assertEqual(updated_user.version, 2)
+        self.assertIsNone(updated_user.urls)
+
+    async def test_delete_user(self):
 
-        self.db.query.assert_called_once_with(User)
+        self.db.scalar.return_value = self.mock_user1.uuid
 
-        filter_call_args = self.db.query.return_value.filter.call_args[0]
+        deleted_id = await self.userRepository.delete_user(self.mock_user1.uuid)
 
+        # the memberships go with the user through the foreign key cascade
+        job_delete = self.db.execute.call_args[0][0]
+        user_delete = self.db.scalar.call_args[0][0]
+        self.db.execute.assert_awaited_once()
+        self.assertEqual(job_delete.table, EnrichmentJob.__table__)
+        self.assertEqual(user_delete.table, User.__table__)
+        self.assertIn("RETURNING", str(user_delete))
+        self.db.delete.assert_not_awaited()
+        self.db.commit.assert_awaited_once()
+        self.assertEqual(deleted_id, self.mock_user1.uuid)
+
+    async def test_get_existing_user_names_chunks_in_clause(self):
+
+        first_chunk, second_chunk = MagicMock(), MagicMock()
+        first_chunk.all.return_value = ["user-0"]
+        second_chunk.all.return_value = ["user-600"]
+        self.db.scalars.side_effect = [first_chunk, second_chunk]
+        names = [f"user-{i}" for i in range(700)]
+
+        existing = await self.userRepository.get_existing_user_names(names)
+
+        self.assertEqual(self.db.scalars.await_count, 2)
+        first_statement = self.db.scalars.call_args_list[0][0][0]
         self.assertEqual(
-            str(filter_call_args[0]), str(User.uuid == self.mock_user1.uuid)
+            len(first_statement.compile().params["name_1"]), SQL_IN_CHUNK_SIZE
         )
+        self.assertEqual(existing, {"user-0", "user-600"})
 
-        self.assertEqual(self.mock_user1.urls, updated_content)
+    async def test_create_users(self):
 
-        self.db.commit.assert_called_once()
-        self.db.refresh.assert_called_once_with(self.mock_user1)
+        new_users = [
+            {"uuid": "uuid-1", "name": "andreea", "group_uuid": "group-1"},
+            {"uuid": "uuid-2", "name": "mihai", "group_uuid": "group-1"},
+        ]
 
-    def test_update_user(self):
+        await self.userRepository.create_users(new_users, "https://api.github.com/")
 
-        new_user_name = "updated name"
+        self.assertEqual(self.db.execute.await_count, 3)
+        user_insert, user_rows = self.db.execute.call_args_list[0][0]
+        membership_insert, membership_rows = self.db.execute.call_args_list[1][0]
+        self.assertEqual(user_insert.table, User.__table__)
+        self.assertEqual(
+            user_rows,
+            [
+                {"uuid": "uuid-1", "name": "andreea"},
+                {"uuid": "uuid-2", "name": "mihai"},
+            ],
+        )
+        self.assertEqual(membership_insert.table, UserGroup.__table__)
+        self.assertEqual(
+            membership_rows,
+            [
+                {"user_uuid": "uuid-1", "group_uuid": "group-1"},
+                {"user_uuid": "uuid-2", "group_uuid": "group-1"},
+            ],
+        )
+        job_insert, job_rows = self.db.execute.call_args_list[2][0]
+        self.assertEqual(job_insert.table, EnrichmentJob.__table__)
+        self.assertEqual([job["user_uuid"] for job in job_rows], ["uuid-1", "uuid-2"])
+        self.assertEqual({job["status"] for job in job_rows}, {"pending"})
+        self.db.commit.assert_awaited_once()
 
-        self.db.query.return_value.filter.return_value.first.return_value = (
-            self.mock_user1
+
+GROUP_IDS = [f"00000000-0000-7000-8000-00000000000{i}" for i in range(3)]
+USER_IDS = [f"10000000-0000-7000-8000-00000000000{i}" for i in range(2)]
+URL = "https://api.github.com/"
+
+
+class TestUserRepositoryLoadStrategy(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine, session_factory = await create_test_database()
+        self.db = session_factory()
+        self.userRepository = UserRepository(self.db)
+        groups = [Group(uuid=GROUP_IDS[i], name=f"group-{i}") for i in range(3)]
+        self.db.add_all(groups)
+        self.db.add_all(
+            User(uuid=USER_IDS[i], name=f"user-{i}", group=groups) for i in range(2)
         )
+        await self.db.commit()
+        self.db.expunge_all()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        await self.engine.dispose()
+
+    async def test_get_user_by_id_selectin(self):
+        with count_statements(self.engine) as statements:
+            user = await self.userRepository.get_user_by_id(USER_IDS[0])
+
+        self.assertEqual(len(statements), 2)
+        self.assertEqual(len(user.group), 3)
+
+    async def test_get_user_by_id_joined_in_one_statement(self):
+        with count_statements(self.engine) as statements:
+            user = await self.userRepository.get_user_by_id(
+                USER_IDS[0], LoadStrategy.JOINED
+            )
+
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(len(user.group), 3)
+
+    async def test_get_user_by_id_raise_forbids_group_access(self):
+        user = await self.userRepository.get_user_by_id(USER_IDS[0], LoadStrategy.RAISE)
 
-        updated_user = self.userRepository.update_user(
-            self.mock_user1.uuid, new_user_name
+        with self.assertRaises(InvalidRequestError):
+            user.group
+
+    async def test_get_all_users_strategies_return_same_page(self):
+        for load in (LoadStrategy.SELECTIN, LoadStrategy.JOINED):
+            with self.subTest(load=load):
+                self.db.expunge_all()
+                users = await self.userRepository.get_all_users(10, load=load)
+
+                self.assertEqual([user.uuid for user in users], USER_IDS)
+                self.assertEqual([len(user.group) for user in users], [3, 3])
+
+
+class TestUserRepositoryFilters(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine, session_factory = await create_test_database()
+        self.db = session_factory()
+        self.userRepository = UserRepository(self.db)
+        self.db.add_all(Group(uuid=GROUP_IDS[i], name=f"group-{i}") for i in range(2))
+        await self.db.commit()
+        self.user_ids = {}
+        for i, name in enumerate(
+            ["cat", "catalin", "cat%", "ca_t", "cau", "iulia", "z\U0010ffff"]
+        ):
+            user = await self.userRepository.create_user(name, GROUP_IDS[i % 2], URL)
+            self.user_ids[name] = user.uuid
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        await self.engine.dispose()
+
+    async def names(self, limit=10, after=None, name_prefix=None, group_id=None):
+        users = await self.userRepository.get_all_users(
+            limit, after, name_prefix, group_id
         )
+        return [user.name for user in users]
 
-        self.mock_user1.name = new_user_name
-        self.db.query.return_value.filter.return_value.update.assert_called_once_with(
-            {User.name: new_user_name}
+    async def test_group_filter_pages_through_members(self):
+        members = sorted(
+            ["cat", "cat%", "cau", "z\U0010ffff"], key=self.user_ids.__getitem__
         )
 
-        self.db.commit.assert_called_once()
-        self.db.query.return_value.filter.return_value.first.assert_called_once()
+        first = await self.names(2, group_id=GROUP_IDS[0])
+        rest = await self.names(after=self.user_ids[first[-1]], group_id=GROUP_IDS[0])
 
-        self.assertEqual(updated_user.name, new_user_name)
+        self.assertEqual(first + rest, members)
 
-    def test_delete_user(self):
+    async def test_name_prefix_is_a_literal_range(self):
+        self.assertEqual(
+            sorted(await self.names(name_prefix="cat")), ["cat", "cat%", "catalin"]
+        )
+        self.assertEqual(await self.names(name_prefix="cat%"), ["cat%"])
+        self.assertEqual(await self.names(name_prefix="ca_"), ["ca_t"])
+        self.assertEqual(await self.names(name_prefix="z\U0010ffff"), ["z\U0010ffff"])
+        self.assertEqual(await self.names(name_prefix="zz"), [])
 
-        self.db.query.return_value.filter.return_value.first.return_value = (
-            self.mock_user1
+    async def test_name_prefix_within_group(self):
+        self.assertEqual(
+            sorted(await self.names(name_prefix="ca", group_id=GROUP_IDS[1])),
+            ["ca_t", "catalin"],
+        )
+
+
+class TestUserRepositoryVersions(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine, session_factory = await create_test_database()
+        self.db = session_factory()
+        self.userRepository = UserRepository(self.db)
+        self.db.add(User(uuid=USER_IDS[0], name="catalin"))
+        await self.db.commit()
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        await self.engine.dispose()
+
+    async def test_update_user_bumps_version(self):
+        user = await self.userRepository.get_user_by_id(USER_IDS[0])
+
+        updated = await self.userRepository.update_user(user, "iulia", {1})
+
+        self.assertEqual((updated.name, updated.version), ("iulia", 2))
+
+    async def test_update_user_stale_version_changes_nothing(self):
+        user = await self.userRepository.get_user_by_id(USER_IDS[0])
+        await self.userRepository.update_users_urls({USER_IDS[0]: {"url": "1"}})
+
+        updated = await self.userRepository.update_user(user, "iulia", {1})
+
+        self.assertIsNone(updated)
+        self.db.expunge_all()
+        user = await self.userRepository.get_user_by_id(USER_IDS[0])
+        self.assertEqual((user.name, user.version), ("catalin", 2))
+
+
+class TestUserRepositoryDeletes(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine, session_factory = await create_test_database()
+        self.db = session_factory()
+        self.userRepository = UserRepository(self.db)
+        self.db.add(Group(uuid=GROUP_IDS[0], name="regular"))
+        await self.db.commit()
+        self.user_ids = [
+            (await self.userRepository.create_user(name, GROUP_IDS[0], URL)).uuid
+            for name in ("catalin", "cata", "iulia")
+        ]
+
+    async def asyncTearDown(self):
+        await self.db.close()
+        await self.engine.dispose()
+
+    async def remaining(self, column):
+        result = await self.db.scalars(select(column))
+        return sorted(result.all())
+
+    async def test_delete_user_cascades_to_memberships(self):
+        await self.userRepository.delete_user(self.user_ids[0])
+
+        self.assertEqual(
+            await self.remaining(UserGroup.user_uuid),
+            sorted(self.user_ids[1:]),
         )
+        self.assertEqual(
+            await self.remaining(EnrichmentJob.user_uuid),
+            sorted(self.user_ids[1:]),
+        )
+
+    async def test_delete_user_by_uppercase_id_deletes_its_jobs(self):
+        await self.userRepository.delete_user(self.user_ids[0].upper())
 
-        self.userRepository.delete_user(self.mock_user1.uuid)
+        self.assertEqual(await self.remaining(User.uuid), sorted(self.user_ids[1:]))
+        self.assertEqual(
+            await self.remaining(EnrichmentJob.user_uuid),
+            sorted(self.user_ids[1:]),
+        )
 
-        filter_call_args = self.db.query.return_value.filter.call_args[0]
+    @patch("app.repository.user_repository.SQL_IN_CHUNK_SIZE", 1)
+    async def test_delete_users_by_id_skips_missing(self):
+        deleted = await self.userRepository.delete_users(
+            [self.user_ids[0], USER_IDS[0], self.user_ids[2]]
+        )
 
+        self.assertEqual(deleted, [self.user_ids[0], self.user_ids[2]])
+        self.assertEqual(await self.remaining(User.uuid), [self.user_ids[1]])
+        self.assertEqual(await self.remaining(UserGroup.user_uuid), [self.user_ids[1]])
         self.assertEqual(
-            str(filter_call_args[0]), str(User.uuid == self.mock_user1.uuid)
+            await self.remaining(EnrichmentJob.user_uuid),
+            [self.user_ids[1]],
+        )
+
+    async def test_delete_users_by_filter(self):
+        deleted = await self.userRepository.delete_users(
+            name_prefix="cat", group_id=GROUP_IDS[0]
         )
 
-        self.db.delete.assert_called_once_with(self.mock_user1)
-        self.db.commit.assert_called_once()
+        self.assertEqual(sorted(deleted), sorted(self.user_ids[:2]))
+        self.assertEqual(await self.remaining(User.uuid), [self.user_ids[2]])
+
+    async def test_delete_users_of_missing_group_deletes_nothing(self):
+        deleted = await self.userRepository.delete_users(group_id=GROUP_IDS[1])
+
+        self.assertEqual(deleted, [])
+        self.assertEqual(len(await self.remaining(User.uuid)), 3)
@@ -1,61 +1,117 @@
 import unittest
-from unittest.mock import MagicMock, create_autospec, patch
+from unittest.mock import AsyncMock, MagicMock, create_autospec, patch
 
-from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import MemoryCache
+from app.core.exceptions import PreconditionFailed
+from app.core.group_registry import GroupRegistry
+from app.core.pagination import decode_cursor, encode_cursor
 from app.model import Group
 from app.service.group_service import GroupService
 
 
-class TestGroupService(unittest.TestCase):
+class TestGroupService(unittest.IsolatedAsyncioTestCase):
 
     def setUp(self):
 
-        self.db = create_autospec(Session)
-        self.mock_group_repository = MagicMock()
-        self.group_service = GroupService(self.mock_group_repository)
+        self.db = create_autospec(AsyncSession)
+        self.mock_group_repository = AsyncMock()
+        self.cache = MemoryCache()
+        self.registry = GroupRegistry()
+        self.group_service = GroupService(
+            self.mock_group_repository, self.cache, self.registry
+        )
 
         self.mock_group1 = MagicMock(spec=Group)
         self.mock_group1.uuid = "be2a91c4-df99-490d-9061-bc12f50a80b7"
         self.mock_group1.name = "regular"
+        self.mock_group1.version = 1
 
         self.mock_group2 = MagicMock(spec=Group)
         self.mock_group2.uuid = "b34d63a3-12fd-456e-b6d7-27c8ab69a6e3"
         self.mock_group2.name = "admin"
+        self.mock_group2.version = 1
 
-    def test_get_group_by_id(self):
-        self.mock_group_repository.get_group_by_id.return_value = self.mock_group1
+        self.mock_group_repository.get_registry_version.return_value = 1
+        self.mock_group_repository.get_every_group.return_value = [
+            self.mock_group1,
+            self.mock_group2,
+        ]
 
-        response = self.group_service.get_group_by_id(self.mock_group1.uuid)
+    async def test_get_group_by_id(self):
+        response = await self.group_service.get_group_by_id(self.mock_group1.uuid)
 
-        self.mock_group_repository.get_group_by_id.assert_called_once_with(
-            self.mock_group1.uuid
+        self.assertEqual(
+            response,
+            {
+                "uuid": self.mock_group1.uuid,
+                "name": self.mock_group1.name,
+                "version": 1,
+            },
         )
-        self.assertEqual(response, self.mock_group1)
+        self.mock_group_repository.get_group_by_id.assert_not_called()
 
-    def test_get_group_by_id_not_found(self):
-        self.mock_group_repository.get_group_by_id.return_value = None
+    async def test_get_group_by_id_served_from_registry(self):
+        await self.group_service.get_group_by_id(self.mock_group1.uuid)
+        await self.group_service.get_group_by_id(self.mock_group2.uuid)
+
+        self.mock_group_repository.get_every_group.assert_called_once_with()
+        self.assertEqual(self.registry.loads, 1)
+
+    async def test_get_group_by_id_refreshes_on_miss(self):
+        self.mock_group_repository.get_every_group.return_value = [self.mock_group2]
+        await self.registry.load(self.mock_group_repository)
+        self.mock_group_repository.get_registry_version.return_value = 2
+        self.mock_group_repository.get_every_group.return_value = [
+            self.mock_group1,
+            self.mock_group2,
+        ]
+
+        response = await self.group_service.get_group_by_id(self.mock_group1.uuid)
+
+        self.assertEqual(response["uuid"], self.mock_group1.uuid)
+        self.assertEqual(self.registry.version, 2)
+
+    async def test_get_group_by_id_accepts_any_uuid_spelling(self):
+        response = await self.group_service.get_group_by_id(
+            self.mock_group1.uuid.upper()
+        )
+
+        self.assertEqual(response["uuid"], self.mock_group1.uuid)
+
+    async def test_get_group_by_id_malformed_id_is_not_found(self):
+        await self.registry.load(self.mock_group_repository)
+
+        with self.assertRaises(KeyError):
+            await self.group_service.get_group_by_id("not-a-uuid")
+
+        # no reload can bring in a group by that id
+        self.mock_group_repository.get_registry_version.assert_called_once_with()
+
+    async def test_get_group_by_id_not_found(self):
+        await self.registry.load(self.mock_group_repository)
         non_existing_group_id = "non-existing-uuid"
 
         with self.assertRaises(KeyError) as context:
-            self.group_service.get_group_by_id(non_existing_group_id)
+            await self.group_service.get_group_by_id(non_existing_group_id)
 
-        self.mock_group_repository.get_group_by_id.assert_called_once_with(
-            non_existing_group_id
-        )
+        # the registry is current, so the miss does not reload it
+        self.mock_group_repository.get_every_group.assert_called_once_with()
 
         expected_error_message = f"Group with id {non_existing_group_id} does not exist"
         self.assertEqual(str(context.exception.args[0]), expected_error_message)
 
-    def test_get_all_groups(self):
+    async def test_get_all_groups(self):
         self.mock_group_repository.get_all_groups.return_value = [
             self.mock_group1,
             self.mock_group2,
         ]
 
-        response = self.group_service.get_all_groups()
+        response = await self.group_service.get_all_groups()
 
-        self.mock_group_repository.get_all_groups.assert_called_once_with()
+        self.mock_group_repository.get_all_groups.assert_called_once_with(101, None)
 
         expected_response = [
             {"uuid": self.mock_group1.uuid, "name": self.mock_group1.name},
@@ -63,86 +119,262 @@ class TestGroupService(unittest.TestCase):
         ]
 
         actual_response = [
-            {"uuid": group.uuid, "name": group.name} for group in response
+            {"uuid": group.uuid, "name": group.name} for group in response["items"]
         ]
 
         self.assertEqual(actual_response, expected_response)
+        self.assertIsNone(response["next_cursor"])
 
-    def test_get_all_groups_no_groups(self):
+    async def test_get_all_groups_next_page(self):
+        self.mock_group_repository.get_all_groups.return_value = [
+            self.mock_group1,
+            self.mock_group2,
+        ]
+
+        response = await self.group_service.get_all_groups(
+            1, encode_cursor(self.mock_group2.uuid)
+        )
+
+        self.mock_group_repository.get_all_groups.assert_called_once_with(
+            2, self.mock_group2.uuid
+        )
+        self.assertEqual(response["items"], [self.mock_group1])
+        self.assertEqual(decode_cursor(response["next_cursor"]), self.mock_group1.uuid)
+
+    async def test_get_all_groups_no_groups(self):
         self.mock_group_repository.get_all_groups.return_value = []
 
         with self.assertRaises(ValueError) as context:
-            self.group_service.get_all_groups()
+            await self.group_service.get_all_groups()
 
         self.assertEqual(str(context.exception), "No group in the database")
-        self.mock_group_repository.get_all_groups.assert_called_once_with()
+        self.mock_group_repository.get_all_groups.assert_called_once_with(101, None)
+
+    async def test_add_new_group_success(self):
+        self.mock_group_repository.create_group.return_value = self.mock_group1
 
-    def test_check_existing_group_name_success(self):
-        self.mock_group_repository.check_exist_group_name.return_value = False
+        response = await self.group_service.add_new_group("regular")
 
-        self.group_service.check_existing_group_name("admin")
+        self.mock_group_repository.create_group.assert_called_once_with("regular")
+        self.assertEqual(response, self.mock_group1)
+        self.assertIn(self.mock_group1.uuid, self.registry.by_id)
 
-        self.mock_group_repository.check_exist_group_name.assert_called_once_with(
-            "admin"
+    async def test_add_new_group_name_taken(self):
+        self.mock_group_repository.create_group.side_effect = IntegrityError(
+            "INSERT", {}, Exception("UNIQUE constraint failed: group.name")
         )
 
-    def test_check_existing_group_name_fail(self):
-        self.mock_group_repository.check_exist_group_name.return_value = True
-
         with self.assertRaises(KeyError) as context:
-            self.group_service.check_existing_group_name("regular")
+            await self.group_service.add_new_group("regular")
 
         self.assertEqual(
             str(context.exception.args[0]), "Group with the name: regular already exist"
         )
-        self.mock_group_repository.check_exist_group_name.assert_called_once_with(
-            "regular"
-        )
-
-    def test_add_new_group_success(self):
-        self.mock_group_repository.create_group.return_value = self.mock_group1
-
-        response = self.group_service.add_new_group("regular")
-
-        self.mock_group_repository.create_group.assert_called_once_with("regular")
-        self.assertEqual(response, self.mock_group1)
 
-    def test_add_new_group_invalid_name(self):
+    async def test_add_new_group_invalid_name(self):
         with self.assertRaises(ValueError) as context:
-            self.group_service.add_new_group("invalid_group_name")
+            await self.group_service.add_new_group("invalid_group_name")
 
         self.assertEqual(
             str(context.exception),
             f"Group name must be {self.mock_group1.name} or {self.mock_group2.name}",
         )
 
-    def test_update_group(self):
+    async def test_get_existing_group_ids(self):
+        response = await self.group_service.get_existing_group_ids(
+            {self.mock_group1.uuid, "missing"}
+        )
+
+        self.assertEqual(response, {self.mock_group1.uuid})
+
+    async def test_get_existing_group_ids_keeps_the_given_spelling(self):
+        await self.registry.load(self.mock_group_repository)
+        group_id = self.mock_group1.uuid.upper()
+
+        response = await self.group_service.get_existing_group_ids({group_id})
+
+        self.assertEqual(response, {group_id})
+        # every id was in the registry, so it was not refreshed
+        self.mock_group_repository.get_registry_version.assert_called_once_with()
+
+    async def test_update_group(self):
         self.mock_group_repository.update_group.return_value = self.mock_group1
 
-        response = self.group_service.update_group(self.mock_group1.uuid, "regular")
+        response = await self.group_service.update_group(
+            self.mock_group1.uuid, "regular"
+        )
 
         self.mock_group_repository.update_group.assert_called_once_with(
-            self.mock_group1.uuid, "regular"
+            self.mock_group1.uuid, "regular", None
         )
         self.assertEqual(response, self.mock_group1)
 
-    def test_update_group_invalid_name(self):
+    async def test_update_group_reloads_registry_and_invalidates_users(self):
+        await self.registry.load(self.mock_group_repository)
+        await self.cache.set("user:510a0b32", {"group_name": ["regular"]})
+        self.mock_group1.name = "admin"
+
+        await self.group_service.update_group(self.mock_group1.uuid, "admin")
+
+        self.assertEqual(self.registry.loads, 2)
+        self.assertEqual(self.registry.by_id[self.mock_group1.uuid].name, "admin")
+        self.assertIsNone(await self.cache.get("user:510a0b32"))
+
+    async def test_update_group_not_found(self):
+        self.mock_group_repository.update_group.return_value = None
+
+        with self.assertRaises(KeyError) as context:
+            await self.group_service.update_group("non-existing-uuid", "admin")
+
+        self.assertEqual(
+            context.exception.args[0], "Group with id non-existing-uuid does not exist"
+        )
+
+    async def test_update_group_stale_version(self):
+        self.mock_group_repository.update_group.return_value = None
+        self.mock_group_repository.get_group_by_id.return_value = self.mock_group1
+
+        with self.assertRaises(PreconditionFailed):
+            await self.group_service.update_group(self.mock_group1.uuid, "admin", {3})
+
+        self.mock_group_repository.update_group.assert_called_once_with(
+            self.mock_group1.uuid, "admin", {3}
+        )
+
+    async def test_update_group_not_found_with_version(self):
+        self.mock_group_repository.update_group.return_value = None
+        self.mock_group_repository.get_group_by_id.return_value = None
+
+        with self.assertRaises(KeyError):
+            await self.group_service.update_group("non-existing-uuid", "admin", {3})
+
+    async def test_update_group_name_taken(self):
+        self.mock_group_repository.update_group.side_effect = IntegrityError(
+            "UPDATE", {}, Exception("UNIQUE constraint failed: group.name")
+        )
+
+        with self.assertRaises(KeyError) as context:
+            await self.group_service.update_group(self.mock_group1.uuid, "admin")
+
+        self.assertEqual(
+            str(context.exception.args[0]), "Group with the name: admin already exist"
+        )
+
+    async def test_update_group_invalid_name(self):
         invalid_group_name = "updated-name"
 
         with self.assertRaises(ValueError) as context:
-            self.group_service.update_group(self.mock_group1.uuid, invalid_group_name)
+            await self.group_service.update_group(
+                self.mock_group1.uuid, invalid_group_name
+            )
 
         self.assertEqual(
             str(context.exception),
             "Group with name: updated-name must be regular or admin",
         )
 
-    def test_delete_group(self):
-        self.mock_group_repository.delete_group_by_id.return_value = None
+    async def test_delete_group(self):
+        self.mock_group_repository.delete_group_by_id.return_value = (
+            self.mock_group1.uuid
+        )
 
-        result = self.group_service.delete_group_by_id(self.mock_group1.uuid)
+        result = await self.group_service.delete_group_by_id(self.mock_group1.uuid)
 
         self.mock_group_repository.delete_group_by_id.assert_called_once_with(
             self.mock_group1.uuid
         )
         self.assertIsNone(result)
+
+    async def test_delete_group_not_found(self):
+        self.mock_group_repository.delete_group_by_id.return_value = None
+
+        with self.assertRaises(KeyError) as context:
+            await self.group_service.delete_group_by_id("non-existing-uuid")
+
+        self.assertEqual(
+            context.exception.args[0], "Group with id non-existing-uuid does not exist"
+        )
+
+    async def test_delete_group_reloads_registry(self):
+        await self.group_service.get_group_by_id(self.mock_group1.uuid)
+        self.mock_group_repository.get_every_group.return_value = [self.mock_group2]
+
+        await self.group_service.delete_group_by_id(self.mock_group1.uuid)
+
+        with self.assertRaises(KeyError):
+            await self.group_service.get_group_by_id(self.mock_group1.uuid)
+
+    async def test_add_members(self):
+        self.mock_group_repository.add_members.return_value = ["user-1"]
+
+        response = await self.group_service.add_members(
+            self.mock_group1.uuid, ["user-1", "user-2", "user-1"]
+        )
+
+        self.mock_group_repository.add_members.assert_called_once_with(
+            self.mock_group1.uuid, ["user-1", "user-2"]
+        )
+        self.assertEqual(response, {"added": 1, "skipped": 1})
+
+    async def test_add_members_group_not_found(self):
+        with self.assertRaises(KeyError):
+            await self.group_service.add_members("non-existing-uuid", ["user-1"])
+
+        self.mock_group_repository.add_members.assert_not_called()
+
+    async def test_remove_members_invalidates_changed_users(self):
+        self.mock_group_repository.remove_members.return_value = ["user-1"]
+        await self.cache.set("user:user-1", {"uuid": "user-1"})
+        await self.cache.set("user:user-2", {"uuid": "user-2"})
+
+        response = await self.group_service.remove_members(
+            self.mock_group1.uuid, ["user-1", "user-2"]
+        )
+
+        self.assertEqual(response, {"removed": 1, "skipped": 1})
+        self.assertIsNone(await self.cache.get("user:user-1"))
+        self.assertIsNotNone(await self.cache.get("user:user-2"))
+
+    async def test_get_group_members(self):
+        members = [MagicMock(uuid=f"user-{i}") for i in range(3)]
+        for i, member in enumerate(members):
+            member.name = f"name-{i}"
+        self.mock_group_repository.get_members.return_value = members
+
+        response = await self.group_service.get_group_members(
+            self.mock_group1.uuid, 2, encode_cursor("user-0")
+        )
+
+        self.mock_group_repository.get_members.assert_called_once_with(
+            self.mock_group1.uuid, 3, "user-0"
+        )
+        self.assertEqual(
+            response["items"],
+            [
+                {"uuid": "user-0", "name": "name-0"},
+                {"uuid": "user-1", "name": "name-1"},
+            ],
+        )
+        self.assertEqual(decode_cursor(response["next_cursor"]), "user-1")
+
+    async def test_get_group_members_group_not_found(self):
+        with self.assertRaises(KeyError):
+            await self.group_service.get_group_members("non-existing-uuid")
+
+        self.mock_group_repository.get_members.assert_not_called()
+
+    async def test_get_member_counts(self):
+        self.mock_group_repository.count_members.return_value = [
+            (self.mock_group1.uuid, "regular", 3),
+            (self.mock_group2.uuid, "admin", 0),
+        ]
+
+        response = await self.group_service.get_member_counts()
+
+        self.assertEqual(
+            response,
+            [
+                {"uuid": self.mock_group1.uuid, "name": "regular", "member_count": 3},
+                {"uuid": self.mock_group2.uuid, "name": "admin", "member_count": 0},
+            ],
+        )
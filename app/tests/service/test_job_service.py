@@ -0,0 +1,43 @@
+import unittest
+from unittest.mock import AsyncMock, patch
+
+from app.service.job_service import JobService
+
+
+class TestJobService(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.mock_job_repository = AsyncMock()
+        self.job_service = JobService(self.mock_job_repository)
+
+    @patch("app.service.job_service.time.time", return_value=1000.0)
+    async def test_get_job_metrics(self, mock_time):
+        self.mock_job_repository.get_job_metrics.return_value = (
+            {"pending": 4, "done": 30},
+            990.0,
+            30,
+        )
+
+        response = await self.job_service.get_job_metrics()
+
+        self.mock_job_repository.get_job_metrics.assert_called_once_with(1000.0)
+        self.assertEqual(
+            response,
+            {
+                "pending": 4,
+                "running": 0,
+                "done": 30,
+                "failed": 0,
+                "oldest_pending_age_seconds": 10.0,
+                "completed_per_minute": 30.0,
+            },
+        )
+
+    async def test_get_job_metrics_empty_queue(self):
+        self.mock_job_repository.get_job_metrics.return_value = ({}, None, 0)
+
+        response = await self.job_service.get_job_metrics()
+
+        self.assertEqual(response["pending"], 0)
+        self.assertIsNone(response["oldest_pending_age_seconds"])
+        self.assertEqual(response["completed_per_minute"], 0)
@@ -1,46 +1,53 @@
-import asyncio
-from unittest import TestCase
+import json
+from unittest import IsolatedAsyncioTestCase
 from unittest.mock import AsyncMock, MagicMock, create_autospec, patch
 
-from fastapi import BackgroundTasks
-from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.cache import MemoryCache
+from app.core.constants import BULK_CREATE_ATTEMPTS
+from app.core.exceptions import PreconditionFailed
+from app.core.pagination import decode_cursor, encode_cursor
 from app.model import Group, User
+from app.schemas.user_schema import UserCreate
 
 
-class TestUserService(TestCase):
+class TestUserService(IsolatedAsyncioTestCase):
 
     def setUp(self):
 
         from app.service.user_service import UserService
 
-        self.db = create_autospec(Session)
-        self.mock_user_repository = MagicMock()
-        self.user_service = UserService(self.mock_user_repository)
-        self.mock_background_task = MagicMock(spec=BackgroundTasks)
+        self.db = create_autospec(AsyncSession)
+        self.mock_user_repository = AsyncMock()
+        self.cache = MemoryCache()
+        self.user_service = UserService(self.mock_user_repository, self.cache)
 
         self.mock_user1 = MagicMock(spec=User)
         self.mock_user1.uuid = "510a0b32-d4e5-40bb-bc6e-a7ddbd2cacb3"
         self.mock_user1.name = "catalin"
-        self.mock_user1.urls = '{"current_user_url": "https://api.github.com/user"}'
+        self.mock_user1.urls = {"current_user_url": "https://api.github.com/user"}
         self.mock_user1.group = [MagicMock()]
         self.mock_user1.group[0].name = "regular"
+        self.mock_user1.version = 1
 
         self.mock_user2 = MagicMock(spec=User)
         self.mock_user2.uuid = "d9bc8265-8abc-406c-aee2-2a3584431d5e"
         self.mock_user2.name = "iulia"
-        self.mock_user2.urls = '{"current_user_url": "https://api.github.com/user"}'
+        self.mock_user2.urls = {"current_user_url": "https://api.github.com/user"}
         self.mock_user2.group = [MagicMock()]
         self.mock_user2.group[0].name = "regular"
+        self.mock_user2.version = 1
 
         self.mock_group = MagicMock(spec=Group)
         self.mock_group.uuid = "be2a91c4-df99-490d-9061-bc12f50a80b7"
         self.mock_group.name = "regular"
 
-    def test_get_user_by_id(self):
+    async def test_get_user_by_id(self):
         self.mock_user_repository.get_user_by_id.return_value = self.mock_user1
 
-        response = self.user_service.get_user_by_id(self.mock_user1.uuid)
+        response = await self.user_service.get_user_by_id(self.mock_user1.uuid)
 
         self.mock_user_repository.get_user_by_id.assert_called_once_with(
             self.mock_user1.uuid
@@ -51,16 +58,51 @@ class TestUserService(TestCase):
             "name": "catalin",
             "url": {"current_user_url": "https://api.github.com/user"},
             "group_name": ["regular"],
+            "version": 1,
         }
         self.assertEqual(response, expected_response)
 
-    def test_get_user_by_id_not_found(self):
+    async def test_update_user_name_taken(self):
+
+        self.mock_user_repository.update_user.side_effect = IntegrityError(
+            "UPDATE", {}, Exception("UNIQUE constraint failed: user.name")
+        )
+
+        with self.assertRaises(ValueError) as context:
+            await self.user_service.update_user(self.mock_user1, "iulia")
+
+        self.assertEqual(
+            str(context.exception),
+            "User with name: iulia already exist in the database",
+        )
+
+    async def test_get_user_by_id_not_enriched_yet(self):
+        self.mock_user1.urls = None
+        self.mock_user_repository.get_user_by_id.return_value = self.mock_user1
+
+        response = await self.user_service.get_user_by_id(self.mock_user1.uuid)
+
+        self.assertIsNone(response["url"])
+
+    async def test_get_user_by_id_served_from_cache(self):
+        self.mock_user_repository.get_user_by_id.return_value = self.mock_user1
+
+        first = await self.user_service.get_user_by_id(self.mock_user1.uuid)
+        second = await self.user_service.get_user_by_id(self.mock_user1.uuid)
+
+        self.assertEqual(first, second)
+        self.mock_user_repository.get_user_by_id.assert_called_once_with(
+            self.mock_user1.uuid
+        )
+        self.assertEqual(self.cache.hits, 1)
+
+    async def test_get_user_by_id_not_found(self):
 
         self.mock_user_repository.get_user_by_id.return_value = None
-        non_existing_user_id = "non-existing-uuid"
+        non_existing_user_id = "00000000-0000-7000-8000-000000000000"
 
         with self.assertRaises(KeyError) as context:
-            self.user_service.get_user_by_id(non_existing_user_id)
+            await self.user_service.get_user_by_id(non_existing_user_id)
 
         self.mock_user_repository.get_user_by_id.assert_called_once_with(
             non_existing_user_id
@@ -70,70 +112,187 @@ class TestUserService(TestCase):
             f"User with id: {non_existing_user_id} does not exist in the database",
         )
 
-    def test_get_all_users(self):
+    async def test_get_user_by_id_not_a_uuid(self):
+
+        with self.assertRaises(KeyError) as context:
+            await self.user_service.get_user_by_id("non-existing-uuid")
+
+        self.mock_user_repository.get_user_by_id.assert_not_awaited()
+        self.assertEqual(
+            context.exception.args[0],
+            "User with id: non-existing-uuid does not exist in the database",
+        )
+
+    async def test_get_all_users(self):
 
         mock_users = [self.mock_user1, self.mock_user2]
         self.mock_user_repository.get_all_users.return_value = mock_users
 
-        response = self.user_service.get_all_users()
-
-        self.mock_user_repository.get_all_users.assert_called_once_with()
-
-        expected_response = [
-            {
-                "uuid": "510a0b32-d4e5-40bb-bc6e-a7ddbd2cacb3",
-                "name": "catalin",
-                "group_name": ["regular"],
-                "url": {"current_user_url": "https://api.github.com/user"},
-            },
-            {
-                "uuid": "d9bc8265-8abc-406c-aee2-2a3584431d5e",
-                "name": "iulia",
-                "group_name": ["regular"],
-                "url": {"current_user_url": "https://api.github.com/user"},
-            },
-        ]
+        response = await self.user_service.get_all_users()
+
+        self.mock_user_repository.get_all_users.assert_called_once_with(
+            101, None, None, None
+        )
+
+        expected_response = {
+            "items": [
+                {
+                    "uuid": "510a0b32-d4e5-40bb-bc6e-a7ddbd2cacb3",
+                    "name": "catalin",
+                    "group_name": ["regular"],
+                    "url": {"current_user_url": "https://api.github.com/user"},
+                    "version": 1,
+                },
+                {
+                    "uuid": "d9bc8265-8abc-406c-aee2-2a3584431d5e",
+                    "name": "iulia",
+                    "group_name": ["regular"],
+                    "url": {"current_user_url": "https://api.github.com/user"},
+                    "version": 1,
+                },
+            ],
+            "next_cursor": None,
+        }
         self.assertEqual(response, expected_response)
 
-    def test_get_all_users_no_user_in_database(self):
+    async def test_get_all_users_next_page(self):
+
+        self.mock_user_repository.get_all_users.return_value = [
+            self.mock_user1,
+            self.mock_user2,
+        ]
+
+        response = await self.user_service.get_all_users(
+            1, encode_cursor("00000000-0000-0000-0000-000000000000"), "ca", "group"
+        )
+
+        self.mock_user_repository.get_all_users.assert_called_once_with(
+            2, "00000000-0000-0000-0000-000000000000", "ca", "group"
+        )
+        self.assertEqual(
+            [user["uuid"] for user in response["items"]], [self.mock_user1.uuid]
+        )
+        self.assertEqual(decode_cursor(response["next_cursor"]), self.mock_user1.uuid)
+
+    async def test_get_all_users_empty_filtered_page(self):
+
+        self.mock_user_repository.get_all_users.return_value = []
+
+        response = await self.user_service.get_all_users(name_prefix="zz")
+
+        self.assertEqual(response, {"items": [], "next_cursor": None})
+
+    async def test_get_all_users_invalid_cursor(self):
+
+        with self.assertRaises(ValueError):
+            await self.user_service.get_all_users(cursor="not a cursor")
+
+        self.mock_user_repository.get_all_users.assert_not_called()
+
+    async def test_get_all_users_no_user_in_database(self):
 
         self.mock_user_repository.get_all_users.return_value = None
 
         with self.assertRaises(ValueError) as context:
-            self.user_service.get_all_users()
+            await self.user_service.get_all_users()
 
-        self.mock_user_repository.get_all_users.assert_called_once_with()
+        self.mock_user_repository.get_all_users.assert_called_once_with(
+            101, None, None, None
+        )
         self.assertEqual(str(context.exception.args[0]), f"No user in the database")
 
-    def test_check_user_validation_success(self):
+    async def test_export_users_ndjson(self):
+
+        self.mock_user_repository.stream_all_users = MagicMock(
+            return_value=self._stream(self.mock_user1, self.mock_user2)
+        )
+
+        chunks = [chunk async for chunk in self.user_service.export_users("ndjson", 1)]
+
+        self.mock_user_repository.stream_all_users.assert_called_once_with(1)
+        self.assertEqual(len(chunks), 2)
+        lines = b"".join(chunks).decode().splitlines()
+        self.assertEqual(
+            [json.loads(line)["uuid"] for line in lines],
+            [self.mock_user1.uuid, self.mock_user2.uuid],
+        )
+
+    async def test_export_users_json_array(self):
+
+        self.mock_user_repository.stream_all_users = MagicMock(
+            return_value=self._stream(self.mock_user1, self.mock_user2)
+        )
+
+        body = b"".join(
+            [chunk async for chunk in self.user_service.export_users("json", 1)]
+        )
+
+        self.assertEqual(
+            json.loads(body),
+            [
+                {
+                    "uuid": self.mock_user1.uuid,
+                    "name": "catalin",
+                    "group_name": ["regular"],
+                    "url": {"current_user_url": "https://api.github.com/user"},
+                    "version": 1,
+                },
+                {
+                    "uuid": self.mock_user2.uuid,
+                    "name": "iulia",
+                    "group_name": ["regular"],
+                    "url": {"current_user_url": "https://api.github.com/user"},
+                    "version": 1,
+                },
+            ],
+        )
+
+    async def test_export_users_empty_json_array(self):
+
+        self.mock_user_repository.stream_all_users = MagicMock(
+            return_value=self._stream()
+        )
+
+        body = b"".join(
+            [chunk async for chunk in self.user_service.export_users("json")]
+        )
+
+        self.assertEqual(json.loads(body), [])
+
+    @staticmethod
+    async def _stream(*users):
+        for user in users:
+            yield user
+
+    async def test_check_user_validation_success(self):
 
         self.mock_user_repository.get_user_by_id.return_value = self.mock_user1
-        result = self.user_service.check_user_validation(self.mock_user1.uuid)
+        result = await self.user_service.check_user_validation(self.mock_user1.uuid)
         self.mock_user_repository.get_user_by_id.assert_called_once_with(
-            self.mock_user1.uuid
+            self.mock_user1.uuid, primary=True
         )
         self.assertEqual(result, self.mock_user1)
 
-    def test_check_user_validation_fails(self):
+    async def test_check_user_validation_fails(self):
 
         self.mock_user_repository.get_user_by_id.return_value = None
 
         with self.assertRaises(KeyError) as context:
-            self.user_service.check_user_validation("non-existing-uuid")
+            await self.user_service.check_user_validation("non-existing-uuid")
 
         self.mock_user_repository.get_user_by_id.assert_called_once_with(
-            "non-existing-uuid"
+            "non-existing-uuid", primary=True
         )
         self.assertEqual(
             context.exception.args[0], "User with id non-existing-uuid does not exist"
         )
 
-    def test_check_group_in_user_success(self):
+    async def test_check_group_in_user_success(self):
 
         self.user_service.check_group_in_user(self.mock_user1, self.mock_group.name)
         self.assertTrue(True)
 
-    def test_check_group_in_user_fails(self):
+    async def test_check_group_in_user_fails(self):
 
         with self.assertRaises(ValueError) as context:
             self.user_service.check_group_in_user(self.mock_user1, "non-existing-group")
@@ -143,15 +302,15 @@ class TestUserService(TestCase):
             f"Group non-existing-group does not part of the user id {self.mock_user1.uuid}",
         )
 
-    def test_update_user(self):
+    async def test_update_user(self):
 
         updated_name = "andreea"
         self.mock_user1.name = updated_name
         self.mock_user_repository.update_user.return_value = self.mock_user1
 
-        response = self.user_service.update_user(self.mock_user1.uuid, updated_name)
+        response = await self.user_service.update_user(self.mock_user1, updated_name)
         self.mock_user_repository.update_user.assert_called_once_with(
-            self.mock_user1.uuid, updated_name
+            self.mock_user1, updated_name, None
         )
 
         expected_response = {
@@ -159,87 +318,301 @@ class TestUserService(TestCase):
             "name": "andreea",
             "url": {"current_user_url": "https://api.github.com/user"},
             "group_name": ["regular"],
+            "version": 1,
         }
 
         self.assertEqual(response, expected_response)
 
-    def test_delete_user(self):
+    async def test_update_user_stale_version(self):
 
-        self.mock_user_repository.delete_user.return_value = None
+        with self.assertRaises(PreconditionFailed):
+            await self.user_service.update_user(self.mock_user1, "andreea", {2})
 
-        result = self.user_service.delete_user_by_id(self.mock_user1.uuid)
+        self.mock_user_repository.update_user.assert_not_called()
 
-        self.assertIsNone(result)
+    async def test_update_user_changed_concurrently(self):
+        self.mock_user_repository.update_user.return_value = None
+
+        with self.assertRaises(PreconditionFailed):
+            await self.user_service.update_user(self.mock_user1, "andreea", {1})
+
+        self.mock_user_repository.update_user.assert_called_once_with(
+            self.mock_user1, "andreea", {1}
+        )
 
-    @patch("app.service.user_service.httpx.AsyncClient")
-    def test_process_content(self, MockAsyncClient):
+    async def test_update_user_invalidates_cache(self):
+        self.mock_user_repository.get_user_by_id.return_value = self.mock_user1
+        await self.user_service.get_user_by_id(self.mock_user1.uuid)
+        self.mock_user_repository.update_user.return_value = self.mock_user1
 
-        replace_placeholder = '{"current_user_url": "https://api.github.com/510a0b32-d4e5-40bb-bc6e-a7ddbd2cacb3"}'
+        await self.user_service.update_user(self.mock_user1, "andreea")
+        await self.user_service.get_user_by_id(self.mock_user1.uuid)
 
-        mock_client_instance = AsyncMock()
-        mock_response = MagicMock()
-        mock_response.text = '{"current_user_url": "https://api.github.com/{user}"}'
-        mock_client_instance.__aenter__.return_value = mock_client_instance
-        mock_client_instance.get.return_value = mock_response
+        self.assertEqual(self.mock_user_repository.get_user_by_id.call_count, 2)
 
-        MockAsyncClient.return_value = mock_client_instance
+    async def test_delete_user(self):
 
-        async def run_test():
-            await self.user_service.process_content(
-                self.mock_user1.uuid, "https://api.github.com/{user}"
-            )
+        self.mock_user_repository.delete_user.return_value = self.mock_user1.uuid
 
-        asyncio.run(run_test())
+        result = await self.user_service.delete_user_by_id(self.mock_user1.uuid)
 
-        MockAsyncClient.assert_called_once()
-        mock_client_instance.get.assert_awaited_once_with(
-            "https://api.github.com/{user}"
+        self.mock_user_repository.delete_user.assert_called_once_with(
+            self.mock_user1.uuid
         )
+        self.assertIsNone(result)
+
+    async def test_delete_user_not_found(self):
+
+        self.mock_user_repository.delete_user.return_value = None
+
+        with self.assertRaises(KeyError) as context:
+            await self.user_service.delete_user_by_id("non-existing-uuid")
 
-        self.mock_user_repository.update_user_url.assert_called_once_with(
-            self.mock_user1.uuid, replace_placeholder
+        self.assertEqual(
+            context.exception.args[0],
+            "User with id: non-existing-uuid does not exist in the database",
         )
 
-    def test_add_new_user_success(self):
+    async def test_delete_user_not_a_uuid(self):
 
-        self.mock_user_repository.get_user_by_name.return_value = None
-        self.mock_user_repository.create_user.return_value = self.mock_user1
+        with self.assertRaises(KeyError):
+            await self.user_service.delete_user_by_id("non-existing-uuid")
 
-        response = self.user_service.add_new_user(
-            self.mock_user1.name,
-            self.mock_group.name,
-            self.mock_background_task,
+        self.mock_user_repository.delete_user.assert_not_awaited()
+
+    async def test_delete_user_invalidates_cache(self):
+        self.mock_user_repository.get_user_by_id.return_value = self.mock_user1
+        await self.user_service.get_user_by_id(self.mock_user1.uuid)
+        self.mock_user_repository.get_user_by_id.return_value = None
+
+        await self.user_service.delete_user_by_id(self.mock_user1.uuid)
+
+        with self.assertRaises(KeyError):
+            await self.user_service.get_user_by_id(self.mock_user1.uuid)
+
+    async def test_delete_users_by_id(self):
+        user_1 = "0190d4a8-5b2e-7c3f-8a1d-2e4f6a8b0c1d"
+        user_2 = "0190d4a8-5b2e-7c3f-8a1d-2e4f6a8b0c2e"
+        self.mock_user_repository.delete_users.return_value = [user_1]
+        await self.cache.set(f"user:{user_1}", {"uuid": user_1})
+
+        response = await self.user_service.delete_users([user_1, user_2, user_1])
+
+        self.mock_user_repository.delete_users.assert_called_once_with(
+            [user_1, user_2], None, None
         )
+        self.assertEqual(response, {"deleted": 1, "skipped": 1})
+        self.assertIsNone(await self.cache.get(f"user:{user_1}"))
+
+    async def test_delete_users_dedupes_canonical_ids(self):
+        user_id = "0190d4a8-5b2e-7c3f-8a1d-2e4f6a8b0c1d"
+        self.mock_user_repository.delete_users.return_value = [user_id]
 
-        self.mock_user_repository.get_user_by_name.assert_called_once_with(
-            self.mock_user1.name
+        response = await self.user_service.delete_users(
+            [user_id, user_id.upper(), user_id.replace("-", ""), "user-1"]
         )
-        self.mock_user_repository.create_user.assert_called_once_with(
+
+        self.mock_user_repository.delete_users.assert_called_once_with(
+            [user_id], None, None
+        )
+        self.assertEqual(response, {"deleted": 1, "skipped": 1})
+
+    async def test_delete_users_by_filter(self):
+
+        self.mock_user_repository.delete_users.return_value = ["user-1", "user-2"]
+
+        response = await self.user_service.delete_users(group_id=self.mock_group.uuid)
+
+        self.mock_user_repository.delete_users.assert_called_once_with(
+            None, None, self.mock_group.uuid
+        )
+        self.assertEqual(response, {"deleted": 2, "skipped": 0})
+
+    async def test_delete_users_without_selection(self):
+
+        with self.assertRaises(ValueError):
+            await self.user_service.delete_users(name_prefix="")
+
+        self.mock_user_repository.delete_users.assert_not_called()
+
+    async def test_add_new_user_success(self):
+
+        self.mock_user_repository.create_user.return_value = self.mock_user1
+
+        response = await self.user_service.add_new_user(
             self.mock_user1.name, self.mock_group.name
         )
-        self.mock_background_task.add_task.assert_called_once_with(
-            self.user_service.process_content,
-            user_id=self.mock_user1.uuid,
-            url="https://api.github.com/",
+
+        self.mock_user_repository.create_user.assert_called_once_with(
+            self.mock_user1.name, self.mock_group.name, "https://api.github.com/"
         )
         self.assertEqual(response, self.mock_user1)
 
-    def test_add_new_user_already_exist(self):
+    async def test_add_new_user_already_exist(self):
 
-        self.mock_user_repository.get_user_by_name.return_value = self.mock_user1
+        self.mock_user_repository.create_user.side_effect = IntegrityError(
+            "INSERT", {}, Exception("UNIQUE constraint failed: user.name")
+        )
 
         with self.assertRaises(ValueError) as context:
-            self.user_service.add_new_user(
-                self.mock_user1.name,
-                self.mock_group.name,
-                self.mock_background_task,
+            await self.user_service.add_new_user(
+                self.mock_user1.name, self.mock_group.name
             )
 
         self.assertEqual(
             str(context.exception),
             f"User with name: {self.mock_user1.name} already exist in the database",
         )
-        self.mock_user_repository.get_user_by_name.assert_called_once_with(
-            self.mock_user1.name
+
+    async def test_add_new_user_group_deleted(self):
+
+        self.mock_user_repository.create_user.side_effect = IntegrityError(
+            "INSERT", {}, Exception("FOREIGN KEY constraint failed")
+        )
+
+        with self.assertRaises(KeyError) as context:
+            await self.user_service.add_new_user(
+                self.mock_user1.name, self.mock_group.uuid
+            )
+
+        self.assertEqual(
+            context.exception.args[0],
+            f"Group with id {self.mock_group.uuid} does not exist",
+        )
+
+    @patch("app.service.user_service.new_uuid")
+    async def test_add_new_users(self, mock_uuid):
+
+        mock_uuid.side_effect = ["new-uuid-1", "new-uuid-2"]
+        self.mock_user_repository.get_existing_user_names.return_value = {"catalin"}
+        users = [
+            UserCreate(user_name="andreea", user_group=self.mock_group.uuid),
+            UserCreate(user_name="catalin", user_group=self.mock_group.uuid),
+            UserCreate(user_name="diana", user_group="missing-group"),
+            UserCreate(user_name="andreea", user_group=self.mock_group.uuid),
+            UserCreate(user_name="mihai", user_group=self.mock_group.uuid),
+        ]
+
+        response = await self.user_service.add_new_users(users, {self.mock_group.uuid})
+
+        self.assertCountEqual(
+            self.mock_user_repository.get_existing_user_names.call_args[0][0],
+            ["andreea", "catalin", "diana", "mihai"],
         )
-        self.mock_background_task.add_task.assert_not_called()
+        self.mock_user_repository.create_users.assert_awaited_once_with(
+            [
+                {
+                    "uuid": "new-uuid-1",
+                    "name": "andreea",
+                    "group_uuid": self.mock_group.uuid,
+                },
+                {
+                    "uuid": "new-uuid-2",
+                    "name": "mihai",
+                    "group_uuid": self.mock_group.uuid,
+                },
+            ],
+            "https://api.github.com/",
+        )
+        self.assertEqual(response["created"], 2)
+        self.assertEqual(response["failed"], 3)
+        self.assertEqual(
+            response["results"],
+            [
+                {"index": 0, "uuid": "new-uuid-1"},
+                {
+                    "index": 1,
+                    "detail": "User with name: catalin already exist in the database",
+                },
+                {"index": 2, "detail": "Group with id missing-group does not exist"},
+                {
+                    "index": 3,
+                    "detail": "User with name: andreea already exist in the database",
+                },
+                {"index": 4, "uuid": "new-uuid-2"},
+            ],
+        )
+
+    async def test_add_new_users_replans_names_taken_concurrently(self):
+
+        self.mock_user_repository.get_existing_user_names.side_effect = [
+            set(),
+            {"iulia"},
+        ]
+        self.mock_user_repository.create_users.side_effect = [
+            IntegrityError("INSERT", {}, Exception("UNIQUE constraint failed")),
+            None,
+        ]
+
+        response = await self.user_service.add_new_users(
+            [
+                UserCreate(user_name="catalin", user_group=self.mock_group.uuid),
+                UserCreate(user_name="iulia", user_group=self.mock_group.uuid),
+            ],
+            {self.mock_group.uuid},
+        )
+
+        self.assertEqual(self.mock_user_repository.create_users.await_count, 2)
+        created = self.mock_user_repository.create_users.call_args[0][0]
+        self.assertEqual([user["name"] for user in created], ["catalin"])
+        self.assertEqual(response["created"], 1)
+        self.assertEqual(response["failed"], 1)
+        self.assertIn("already exist", response["results"][1]["detail"])
+
+    async def test_add_new_users_gives_up_after_last_attempt(self):
+
+        self.mock_user_repository.get_existing_user_names.side_effect = (
+            lambda names: set()
+        )
+        self.mock_user_repository.create_users.side_effect = IntegrityError(
+            "INSERT", {}, Exception("CHECK constraint failed")
+        )
+
+        response = await self.user_service.add_new_users(
+            [UserCreate(user_name="catalin", user_group=self.mock_group.uuid)],
+            {self.mock_group.uuid},
+        )
+
+        self.assertEqual(
+            self.mock_user_repository.create_users.await_count, BULK_CREATE_ATTEMPTS
+        )
+        self.assertEqual(response["created"], 0)
+        self.assertEqual(response["failed"], 1)
+        self.assertEqual(
+            response["results"],
+            [
+                {
+                    "index": 0,
+                    "detail": "User with name: catalin could not be created, "
+                    "the insert kept failing",
+                }
+            ],
+        )
+
+    async def test_add_new_users_group_deleted_meanwhile(self):
+
+        self.mock_user_repository.get_existing_user_names.return_value = set()
+        self.mock_user_repository.create_users.side_effect = IntegrityError(
+            "INSERT", {}, Exception("FOREIGN KEY constraint failed")
+        )
+
+        with self.assertRaises(KeyError):
+            await self.user_service.add_new_users(
+                [UserCreate(user_name="catalin", user_group=self.mock_group.uuid)],
+                {self.mock_group.uuid},
+            )
+
+        self.mock_user_repository.create_users.assert_awaited_once()
+
+    async def test_add_new_users_nothing_to_create(self):
+
+        self.mock_user_repository.get_existing_user_names.return_value = {"catalin"}
+
+        response = await self.user_service.add_new_users(
+            [UserCreate(user_name="catalin", user_group=self.mock_group.uuid)],
+            {self.mock_group.uuid},
+        )
+
+        self.mock_user_repository.create_users.assert_not_called()
+        self.assertEqual(response["created"], 0)
+        self.assertEqual(response["failed"], 1)
@@ -0,0 +1,121 @@
+import time
+from unittest import IsolatedAsyncioTestCase
+
+import httpx
+from sqlalchemy import insert, select
+
+from app.core.cache import MemoryCache
+from app.core.http_client import UrlFetcher
+from app.core.url_template_cache import UrlTemplateCache
+from app.model import EnrichmentJob, Group, User
+from app.repository.user_repository import UserRepository
+from app.tests.database import create_test_database
+from app.worker.enrichment_worker import EnrichmentWorker
+
+URL = "https://api.github.com/"
+GROUP_ID = "be2a91c4-df99-490d-9061-bc12f50a80b7"
+
+
+class TestEnrichmentWorker(IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.engine, self.session_factory = await create_test_database()
+        self.upstream_status = 200
+        self.upstream_body = '{"current_user_url": "https://x/{user}"}'
+        self.upstream_requests = 0
+        self.http_client = httpx.AsyncClient(
+            transport=httpx.MockTransport(self.upstream)
+        )
+        self.url_templates = UrlTemplateCache(
+            UrlFetcher(self.http_client, backoff_seconds=0)
+        )
+        self.now = time.time() + 1
+        self.cache = MemoryCache()
+        self.worker = EnrichmentWorker(
+            self.session_factory,
+            self.url_templates,
+            self.cache,
+            batch_size=10,
+            max_attempts=2,
+            clock=lambda: self.now,
+        )
+        async with self.session_factory() as db:
+            await db.execute(insert(Group).values(uuid=GROUP_ID, name="regular"))
+            await db.commit()
+            repository = UserRepository(db)
+            self.user_ids = []
+            for name in ["catalin", "iulia"]:
+                user = await repository.create_user(name, GROUP_ID, URL)
+                self.user_ids.append(user.uuid)
+
+    async def asyncTearDown(self):
+        await self.http_client.aclose()
+        await self.engine.dispose()
+
+    def upstream(self, request):
+        self.upstream_requests += 1
+        return httpx.Response(self.upstream_status, text=self.upstream_body)
+
+    async def rows(self, model):
+        async with self.session_factory() as db:
+            return (await db.scalars(select(model))).all()
+
+    async def test_run_once_enriches_users_in_one_batch(self):
+        claimed = await self.worker.run_once()
+
+        self.assertEqual(claimed, 2)
+        self.assertEqual(self.upstream_requests, 1)
+        users = {user.uuid: user for user in await self.rows(User)}
+        for user_id in self.user_ids:
+            self.assertEqual(
+                users[user_id].urls,
+                {"current_user_url": f"https://x/{user_id}"},
+            )
+        jobs = await self.rows(EnrichmentJob)
+        self.assertEqual({job.status for job in jobs}, {"done"})
+        self.assertEqual(await self.worker.run_once(), 0)
+
+    async def test_run_once_fails_jobs_on_invalid_template(self):
+        self.upstream_body = "not json {user}"
+
+        await self.worker.run_once()
+
+        jobs = await self.rows(EnrichmentJob)
+        self.assertEqual({job.status for job in jobs}, {"pending"})
+        self.assertTrue(all("JSONDecodeError" in job.last_error for job in jobs))
+
+    async def test_run_once_invalidates_cached_users(self):
+        for user_id in self.user_ids:
+            await self.cache.set(f"user:{user_id}", {"uuid": user_id, "url": None})
+
+        await self.worker.run_once()
+
+        self.assertEqual(self.cache.metrics()["entries"], 0)
+
+    async def test_run_once_retries_failed_fetch(self):
+        self.upstream_status = 404
+
+        await self.worker.run_once()
+
+        jobs = await self.rows(EnrichmentJob)
+        self.assertEqual({job.status for job in jobs}, {"pending"})
+        self.assertTrue(all("404" in job.last_error for job in jobs))
+        self.assertEqual({user.urls for user in await self.rows(User)}, {None})
+
+        self.now += 60
+        self.upstream_status = 200
+        await self.worker.run_once()
+
+        jobs = await self.rows(EnrichmentJob)
+        self.assertEqual({job.status for job in jobs}, {"done"})
+
+    async def test_run_once_gives_up_after_max_attempts(self):
+        self.upstream_status = 404
+
+        await self.worker.run_once()
+        self.now += 60
+        await self.worker.run_once()
+
+        jobs = await self.rows(EnrichmentJob)
+        self.assertEqual({job.status for job in jobs}, {"failed"})
+        self.assertEqual({job.attempts for job in jobs}, {2})
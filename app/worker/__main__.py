@@ -0,0 +1,43 @@
+import asyncio
+import logging
+
+from app.core.cache import create_cache
+from app.core.config import get_settings
+from app.core.constants import CACHE_TTL_SECONDS
+from app.core.database import SessionLocal, dispose_engines
+from app.core.http_client import UrlFetcher, create_http_client
+from app.core.url_template_cache import UrlTemplateCache
+from app.worker.enrichment_worker import run_workers
+
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    settings = get_settings()
+    async with create_http_client() as client:
+        url_templates = UrlTemplateCache(
+            UrlFetcher(client), persist_path=settings.url_template_cache_path
+        )
+        if not settings.cache_redis_url:
+            # the in-process cache invalidated here is not the API's
+            logger.warning(
+                "CACHE_REDIS_URL is not set: the API serves enriched urls "
+                "from its cache for up to %ss after enrichment",
+                CACHE_TTL_SECONDS,
+            )
+        cache = create_cache(settings.cache_redis_url)
+        try:
+            await run_workers(
+                max(settings.enrichment_workers, 1),
+                SessionLocal,
+                url_templates,
+                cache,
+            )
+        finally:
+            await cache.close()
+            await dispose_engines()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
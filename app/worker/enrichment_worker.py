@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import time
+from collections import defaultdict
+
+import httpx
+import orjson
+
+from app.core.cache import Cache
+from app.core.constants import (JOB_BATCH_SIZE, JOB_LEASE_SECONDS,
+                                JOB_MAX_ATTEMPTS, JOB_POLL_INTERVAL_SECONDS)
+from app.core.url_template_cache import UrlTemplateCache
+from app.repository.job_repository import JobRepository
+from app.repository.user_repository import UserRepository
+
+logger = logging.getLogger(__name__)
+
+
+class EnrichmentWorker:
+    """
+    Claims pending enrichment jobs in batches, fills in the users' urls from
+    the cached upstream template and marks the jobs done. A job whose lease
+    expires before it is completed is claimed again, so delivery is
+    at-least-once
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        url_templates: UrlTemplateCache,
+        cache: Cache | None = None,
+        batch_size: int = JOB_BATCH_SIZE,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+        poll_interval: float = JOB_POLL_INTERVAL_SECONDS,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        clock=time.time,
+    ):
+        self.session_factory = session_factory
+        self.url_templates = url_templates
+        self.cache = cache
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.clock = clock
+
+    async def run(self):
+        while True:
+            try:
+                claimed = await self.run_once()
+            except Exception:
+                logger.exception("Enrichment batch failed")
+                claimed = 0
+            if claimed < self.batch_size:
+                await asyncio.sleep(self.poll_interval)
+
+    async def run_once(self) -> int:
+        async with self.session_factory() as db:
+            job_repository = JobRepository(db)
+            jobs = await job_repository.claim_jobs(
+                self.batch_size, self.lease_seconds, self.clock(), self.max_attempts
+            )
+            jobs_by_url = defaultdict(list)
+            for job in jobs:
+                jobs_by_url[job.url].append(job)
+            for url, url_jobs in jobs_by_url.items():
+                try:
+                    template = await self.url_templates.get(url)
+                    urls_by_user = {
+                        job.user_uuid: orjson.loads(
+                            template.replace("{user}", job.user_uuid)
+                        )
+                        for job in url_jobs
+                    }
+                except (httpx.HTTPError, orjson.JSONDecodeError) as e:
+                    await job_repository.fail_jobs(
+                        url_jobs, repr(e), self.max_attempts, self.clock()
+                    )
+                    continue
+                await UserRepository(db).update_users_urls(urls_by_user)
+                await job_repository.complete_jobs(
+                    [job.id for job in url_jobs], self.clock()
+                )
+                if self.cache is not None:
+                    await self.cache.delete(
+                        *(f"user:{job.user_uuid}" for job in url_jobs)
+                    )
+            return len(jobs)
+
+
+async def run_workers(
+    count: int,
+    session_factory,
+    url_templates: UrlTemplateCache,
+    cache: Cache | None = None,
+):
+    async with asyncio.TaskGroup() as workers:
+        for _ in range(count):
+            workers.create_task(
+                EnrichmentWorker(session_factory, url_templates, cache).run()
+            )
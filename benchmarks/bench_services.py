@@ -0,0 +1,176 @@
+"""
+Service microbenchmarks.
+
+Times UserService and GroupService methods with pytest-benchmark against a
+SQLite file seeded through the repositories. Every call gets a fresh
+session and, unless the benchmark is about the cache, a fresh cache, so
+each round reaches the database.
+
+    python -m pytest benchmarks/bench_services.py --benchmark-json=services.json
+"""
+
+import asyncio
+from itertools import count
+
+import pytest
+
+from app.core.cache import MemoryCache
+from app.core.group_registry import GroupRegistry
+from app.core.pagination import encode_cursor
+from app.repository.group_repository import GroupRepository
+from app.repository.user_repository import UserRepository
+from app.schemas.user_schema import UserCreate
+from app.service.group_service import GroupService
+from app.service.user_service import UserService
+from benchmarks.common import temporary_engine
+from benchmarks.seed import group_names, seed_database, user_name
+
+USERS = 5000
+GROUPS = 10
+PAGE_SIZE = 100
+BATCH_SIZE = 100
+
+
+class Bench:
+    """
+    Runs service calls on the module's event loop, each on its own session
+    """
+
+    def __init__(self, loop, session_factory, seeded: dict):
+        self.loop = loop
+        self.session_factory = session_factory
+        self.group_ids = seeded["group_ids"]
+        self.user_ids = seeded["user_ids"]
+        self.registry = GroupRegistry()
+        self.names = count()
+
+    def run(self, call):
+        async def once():
+            async with self.session_factory() as db:
+                return await call(db)
+
+        return self.loop.run_until_complete(once())
+
+    def users(self, db, cache=None) -> UserService:
+        return UserService(UserRepository(db), cache or MemoryCache())
+
+    def groups(self, db) -> GroupService:
+        return GroupService(GroupRepository(db), MemoryCache(), self.registry)
+
+    def new_names(self, size: int) -> list[str]:
+        return [f"bench-user-{next(self.names)}" for _ in range(size)]
+
+
+@pytest.fixture(scope="module")
+def bench():
+    loop = asyncio.new_event_loop()
+    database = temporary_engine()
+    _, session_factory = loop.run_until_complete(database.__aenter__())
+    try:
+        seeded = loop.run_until_complete(seed_database(session_factory, USERS, GROUPS))
+        bench = Bench(loop, session_factory, seeded)
+        bench.run(lambda db: bench.registry.load(GroupRepository(db)))
+        yield bench
+    finally:
+        loop.run_until_complete(database.__aexit__(None, None, None))
+        loop.close()
+
+
+def test_get_user_by_id(benchmark, bench):
+    user_id = bench.user_ids[USERS // 2]
+
+    benchmark(bench.run, lambda db: bench.users(db).get_user_by_id(user_id))
+
+
+def test_get_user_by_id_cached(benchmark, bench):
+    user_id = bench.user_ids[USERS // 2]
+    cache = MemoryCache()
+    bench.run(lambda db: bench.users(db, cache).get_user_by_id(user_id))
+
+    benchmark(bench.run, lambda db: bench.users(db, cache).get_user_by_id(user_id))
+
+
+def test_get_all_users(benchmark, bench):
+    cursor = encode_cursor(bench.user_ids[USERS // 2])
+
+    benchmark(bench.run, lambda db: bench.users(db).get_all_users(PAGE_SIZE, cursor))
+
+
+def test_get_all_users_in_group(benchmark, bench):
+    group_id = bench.group_ids[1]
+
+    benchmark(
+        bench.run,
+        lambda db: bench.users(db).get_all_users(PAGE_SIZE, group_id=group_id),
+    )
+
+
+def test_export_users(benchmark, bench):
+    async def export(db):
+        async for _ in bench.users(db).export_users():
+            pass
+
+    benchmark(bench.run, export)
+
+
+def test_add_new_users(benchmark, bench):
+    group_id = bench.group_ids[0]
+
+    def add(db):
+        users = [
+            UserCreate(user_name=name, user_group=group_id)
+            for name in bench.new_names(BATCH_SIZE)
+        ]
+        return bench.users(db).add_new_users(users, {group_id})
+
+    benchmark(bench.run, add)
+
+
+def test_update_user(benchmark, bench):
+    index = USERS // 2
+    user_id = bench.user_ids[index]
+    group_name = group_names(GROUPS)[index % GROUPS]
+
+    async def update(db):
+        service = bench.users(db)
+        user = await service.check_user_validation(user_id)
+        service.check_group_in_user(user, group_name)
+        return await service.update_user(user, user_name(index))
+
+    benchmark(bench.run, update)
+
+
+def test_get_group_by_id(benchmark, bench):
+    group_id = bench.group_ids[0]
+
+    benchmark(bench.run, lambda db: bench.groups(db).get_group_by_id(group_id))
+
+
+def test_get_all_groups(benchmark, bench):
+    benchmark(bench.run, lambda db: bench.groups(db).get_all_groups(PAGE_SIZE))
+
+
+def test_get_group_members(benchmark, bench):
+    group_id = bench.group_ids[0]
+    cursor = encode_cursor(bench.user_ids[USERS // 2])
+
+    benchmark(
+        bench.run,
+        lambda db: bench.groups(db).get_group_members(group_id, PAGE_SIZE, cursor),
+    )
+
+
+def test_get_member_counts(benchmark, bench):
+    benchmark(bench.run, lambda db: bench.groups(db).get_member_counts())
+
+
+def test_add_and_remove_members(benchmark, bench):
+    group_id = bench.group_ids[-1]
+    user_ids = bench.user_ids[:BATCH_SIZE]
+
+    async def add_and_remove(db):
+        service = bench.groups(db)
+        await service.add_members(group_id, user_ids)
+        await service.remove_members(group_id, user_ids)
+
+    benchmark(bench.run, add_and_remove)
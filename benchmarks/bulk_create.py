@@ -0,0 +1,82 @@
+"""
+Bulk user creation benchmark.
+
+Creates the same number of users once through POST /user (one request per
+user) and once through POST /user/bulk, each against a fresh SQLite database,
+and reports the wall time and users per second of both paths. URL enrichment
+jobs are only queued, so only the write path is measured.
+
+    python -m benchmarks.bulk_create --users 2000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from app.main import app
+from benchmarks.common import temporary_database
+
+
+async def create_group(client: httpx.AsyncClient) -> str:
+    response = await client.post("/group", json={"name": "regular"})
+    response.raise_for_status()
+    return response.json()["uuid"]
+
+
+async def per_row(client: httpx.AsyncClient, users: int) -> None:
+    group_id = await create_group(client)
+    for i in range(users):
+        response = await client.post(
+            "/user", json={"user_name": f"user-{i}", "user_group": group_id}
+        )
+        response.raise_for_status()
+
+
+async def bulk(client: httpx.AsyncClient, users: int) -> None:
+    group_id = await create_group(client)
+    response = await client.post(
+        "/user/bulk",
+        json={
+            "users": [
+                {"user_name": f"user-{i}", "user_group": group_id} for i in range(users)
+            ]
+        },
+    )
+    response.raise_for_status()
+    assert response.json()["created"] == users
+
+
+async def measure(path, users: int) -> dict:
+    async with temporary_database():
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench"
+        ) as client:
+            started = time.perf_counter()
+            await path(client, users)
+            elapsed = time.perf_counter() - started
+    return {
+        "seconds": round(elapsed, 3),
+        "users_per_second": round(users / elapsed, 1),
+    }
+
+
+async def run(users: int) -> dict:
+    return {
+        "users": users,
+        "per_row": await measure(per_row, users),
+        "bulk": await measure(bulk, users),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=2000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.users))))
+
+
+if __name__ == "__main__":
+    main()
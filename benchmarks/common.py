@@ -0,0 +1,94 @@
+import os
+import re
+import statistics
+import tempfile
+from contextlib import asynccontextmanager
+from unittest.mock import patch
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import Settings, get_settings
+from app.core.database import Base, create_database_engine, get_db
+from app.main import app
+
+# the description the instrumentation middleware gives its statement count
+STATEMENTS = re.compile(r'desc="(\d+) queries"')
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """
+    Returns the pct-th percentile of samples using nearest-rank
+    """
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples: list[float], elapsed: float) -> dict:
+    """
+    Returns latency percentiles in milliseconds and throughput for samples
+    measured in seconds
+    """
+    return {
+        "requests": len(samples),
+        "rps": round(len(samples) / elapsed, 1),
+        "mean_ms": round(statistics.mean(samples) * 1000, 2),
+        "p50_ms": round(percentile(samples, 50) * 1000, 2),
+        "p95_ms": round(percentile(samples, 95) * 1000, 2),
+        "p99_ms": round(percentile(samples, 99) * 1000, 2),
+    }
+
+
+def statement_count(response) -> int:
+    """
+    Returns how many SQL statements the request sent, as counted by the
+    instrumentation middleware in its Server-Timing header
+    """
+    return int(STATEMENTS.search(response.headers["server-timing"]).group(1))
+
+
+@asynccontextmanager
+async def temporary_engine(**settings):
+    """
+    Creates a throwaway SQLite file with the application schema. Keyword
+    arguments override the database settings of the engine
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}"
+        engine = create_database_engine(Settings(database_url=url, **settings))
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(
+            bind=engine, autoflush=False, expire_on_commit=False
+        )
+        try:
+            yield engine, session_factory
+        finally:
+            await engine.dispose()
+
+
+@asynccontextmanager
+async def temporary_database(**settings):
+    """
+    Creates a throwaway SQLite file with the application schema, routes the
+    application's get_db dependency to it and runs the application lifespan.
+    Keyword arguments override the database settings of the engine
+    """
+    async with temporary_engine(**settings) as (engine, session_factory):
+
+        async def get_bench_db():
+            async with session_factory() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = get_bench_db
+        try:
+            # Enrichment workers would poll the application database, not
+            # this one, so the lifespan runs without them. The group registry
+            # is loaded and watched through the patched session factory.
+            with patch.object(get_settings(), "enrichment_workers", 0), patch(
+                "app.main.SessionLocal", session_factory
+            ):
+                async with app.router.lifespan_context(app):
+                    yield engine, session_factory
+        finally:
+            app.dependency_overrides.pop(get_db, None)
@@ -0,0 +1,77 @@
+"""
+Concurrency benchmark for the read path.
+
+Seeds a temporary SQLite database, then fires GET /user/{id} from a number of
+parallel clients through the ASGI app and reports throughput and latency
+percentiles. A blocking data layer shows up here as a p99 that grows with the
+number of clients, because every request waits behind every other query.
+
+    python -m benchmarks.concurrency --clients 200 --requests 5
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import httpx
+from sqlalchemy import insert
+
+from app.main import app
+from app.model import Group, User, UserGroup
+from benchmarks.common import summarize, temporary_database
+
+
+async def seed(session_factory, users: int) -> list[str]:
+    group_id = str(uuid.uuid4())
+    user_ids = [str(uuid.uuid4()) for _ in range(users)]
+    async with session_factory() as db:
+        await db.execute(insert(Group).values(uuid=group_id, name="regular"))
+        await db.execute(
+            insert(User),
+            [{"uuid": user_id, "name": user_id, "urls": {}} for user_id in user_ids],
+        )
+        await db.execute(
+            insert(UserGroup),
+            [{"user_uuid": user_id, "group_uuid": group_id} for user_id in user_ids],
+        )
+        await db.commit()
+    return user_ids
+
+
+async def run(clients: int, requests: int, users: int) -> dict:
+    async with temporary_database() as (_, session_factory):
+        user_ids = await seed(session_factory, users)
+        latencies: list[float] = []
+        transport = httpx.ASGITransport(app=app)
+
+        async def client_loop(client: httpx.AsyncClient, offset: int):
+            for i in range(requests):
+                user_id = user_ids[(offset + i) % len(user_ids)]
+                started = time.perf_counter()
+                response = await client.get(f"/user/{user_id}")
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            started = time.perf_counter()
+            await asyncio.gather(*(client_loop(client, n) for n in range(clients)))
+            elapsed = time.perf_counter() - started
+
+    return {"clients": clients, **summarize(latencies, elapsed)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--users", type=int, default=1000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.clients, args.requests, args.users))))
+
+
+if __name__ == "__main__":
+    main()
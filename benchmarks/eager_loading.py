@@ -0,0 +1,134 @@
+"""
+Group loading strategy benchmark.
+
+Seeds users that belong to 1, 10 and 100 groups and, for each membership
+count, reads single users by id and pages of users through UserRepository
+with every LoadStrategy, plus the lazy load the repository used to fall back
+to. Reports the mean time and the statements sent per read.
+
+    python -m benchmarks.eager_loading --users 200 --reads 200
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+from sqlalchemy import insert
+
+from app.core.constants import LoadStrategy
+from app.core.ids import new_uuid
+from app.core.instrumentation import QueryStats, current_query_stats
+from app.model import Group, User, UserGroup
+from app.repository.user_repository import UserRepository
+from benchmarks.common import temporary_database
+
+MEMBERSHIPS = (1, 10, 100)
+
+
+async def seed(session_factory, users: int, memberships: int) -> list[str]:
+    # sorted, so every hundredth id is the cursor of the next page
+    user_ids = sorted(new_uuid() for _ in range(users))
+    group_ids = [new_uuid() for _ in range(100)]
+    async with session_factory() as db:
+        await db.execute(
+            insert(Group),
+            [
+                {"uuid": group_id, "name": f"group-{i}"}
+                for i, group_id in enumerate(group_ids)
+            ],
+        )
+        await db.execute(
+            insert(User),
+            [
+                {"uuid": user_id, "name": f"user-{i}"}
+                for i, user_id in enumerate(user_ids)
+            ],
+        )
+        await db.execute(
+            insert(UserGroup),
+            [
+                {"user_uuid": user_id, "group_uuid": group_id}
+                for user_id in user_ids
+                for group_id in group_ids[:memberships]
+            ],
+        )
+        await db.commit()
+    return user_ids
+
+
+async def lazy_by_id(db, user_id: str):
+    # the lazy load only works inside the session's greenlet
+    def load(session):
+        return [group.name for group in session.get(User, user_id).group]
+
+    return await db.run_sync(load)
+
+
+async def measure(session_factory, read, ids: list) -> dict:
+    stats = QueryStats()
+    token = current_query_stats.set(stats)
+    try:
+        started = time.perf_counter()
+        for value in ids:
+            # a fresh session per read, so nothing comes from the identity map
+            async with session_factory() as db:
+                await read(db, value)
+        elapsed = time.perf_counter() - started
+    finally:
+        current_query_stats.reset(token)
+    return {
+        "mean_ms": round(elapsed / len(ids) * 1000, 3),
+        "statements_per_read": round(stats.count / len(ids), 2),
+    }
+
+
+def by_id(load: LoadStrategy):
+    async def read(db, user_id: str):
+        user = await UserRepository(db).get_user_by_id(user_id, load)
+        return [group.name for group in user.group]
+
+    return read
+
+
+def page(load: LoadStrategy):
+    async def read(db, after: str | None):
+        users = await UserRepository(db).get_all_users(100, after, load=load)
+        return [[group.name for group in user.group] for user in users]
+
+    return read
+
+
+async def run(users: int, reads: int) -> dict:
+    results = {"users": users}
+    for memberships in MEMBERSHIPS:
+        async with temporary_database() as (_, session_factory):
+            user_ids = await seed(session_factory, users, memberships)
+            sample = (user_ids * (reads // len(user_ids) + 1))[:reads]
+            pages = [None, *user_ids[99::100]][: max(1, users // 100)]
+            results[f"{memberships}_groups"] = {
+                "by_id": {
+                    "lazy": await measure(session_factory, lazy_by_id, sample),
+                    **{
+                        load.value: await measure(session_factory, by_id(load), sample)
+                        for load in (LoadStrategy.JOINED, LoadStrategy.SELECTIN)
+                    },
+                },
+                "page_of_100": {
+                    load.value: await measure(session_factory, page(load), pages)
+                    for load in (LoadStrategy.SELECTIN, LoadStrategy.JOINED)
+                },
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--reads", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.users, args.reads))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Group membership benchmark.
+
+Seeds users, then adds all of them to a group and removes them again through
+POST and DELETE /group/{id}/members, one request per direction. In between
+it reads pages of 1000 members from the start and the middle of the group
+and the member counts of every group. Reports the time each request took
+and the statements it sent, as counted by the instrumentation middleware.
+
+    python -m benchmarks.group_members --users 100000
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+from sqlalchemy import insert
+
+from app.core.ids import new_uuid
+from app.core.pagination import encode_cursor
+from app.main import app
+from app.model import User
+from app.repository.group_repository import GroupRepository
+from benchmarks.common import statement_count, temporary_database
+
+
+async def seed(session_factory, users: int) -> tuple[str, list[str]]:
+    user_ids = [new_uuid() for _ in range(users)]
+    async with session_factory() as db:
+        # created through the repository, which bumps the registry version,
+        # so the registry loaded at startup learns the group on its first miss
+        group_id = (await GroupRepository(db).create_group("admin")).uuid
+        await db.execute(
+            insert(User),
+            [
+                {"uuid": user_id, "name": f"user-{i}"}
+                for i, user_id in enumerate(user_ids)
+            ],
+        )
+        await db.commit()
+    return group_id, user_ids
+
+
+async def request(client, method: str, url: str, **kwargs) -> tuple:
+    started = time.perf_counter()
+    response = await client.request(method, url, **kwargs)
+    elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    return response, elapsed, statement_count(response)
+
+
+async def measure(client, method: str, url: str, user_ids: list[str]) -> dict:
+    response, elapsed, statements = await request(
+        client, method, url, json={"user_ids": user_ids}
+    )
+    return {
+        "seconds": round(elapsed, 2),
+        "changes_per_second": round(len(user_ids) / elapsed, 1),
+        "statements": statements,
+        "response": response.json(),
+    }
+
+
+async def measure_read(client, url: str, **params) -> dict:
+    _, elapsed, statements = await request(client, "GET", url, params=params)
+    return {"ms": round(elapsed * 1000, 2), "statements": statements}
+
+
+async def run(users: int) -> dict:
+    async with temporary_database() as (_, session_factory):
+        group_id, user_ids = await seed(session_factory, users)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench", timeout=None
+        ) as client:
+            url = f"/group/{group_id}/members"
+            middle = encode_cursor(sorted(user_ids)[users // 2])
+            return {
+                "users": users,
+                "add": await measure(client, "POST", url, user_ids),
+                "add_again": await measure(client, "POST", url, user_ids),
+                "first_page": await measure_read(client, url, limit=1000),
+                "middle_page": await measure_read(
+                    client, url, limit=1000, cursor=middle
+                ),
+                "member_counts": await measure_read(client, "/group/member-counts"),
+                "remove": await measure(client, "DELETE", url, user_ids),
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=100000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.users))))
+
+
+if __name__ == "__main__":
+    main()
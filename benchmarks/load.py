@@ -0,0 +1,302 @@
+"""
+HTTP load driver for every route.
+
+Seeds a temporary SQLite database through the repositories, serves the
+application with uvicorn on a free local port and sends each route its
+requests from a number of concurrent httpx clients, one route at a time.
+Writes, per route, throughput, latency percentiles, the status codes and the
+mean statement count from the Server-Timing header as JSON. A route of
+app.routes without a scenario here stops the run, so new endpoints are
+benchmarked from the start. Extra scenarios send a route requests that take
+another path through it, such as creates that fail on a taken name.
+
+    python -m benchmarks.load --users 10000 --requests 200 --output load.json
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter
+
+import httpx
+import uvicorn
+from fastapi.routing import APIRoute
+
+from app.core.constants import ENRICHMENT_URL
+from app.core.ids import new_uuid
+from app.main import app
+from app.repository.group_repository import GroupRepository
+from app.repository.user_repository import UserRepository
+from benchmarks.common import statement_count, summarize, temporary_database
+from benchmarks.seed import group_names, seed_database, user_name
+
+PAGE_SIZE = 100
+# users each POST /user/bulk creates and each DELETE /user removes
+BATCH_SIZE = 10
+# scenarios run after the one of every route, for paths a route scenario
+# does not take
+EXTRA_SCENARIOS = ["POST /user taken names"]
+
+
+async def create_users(session_factory, group_id: str, names: list[str]) -> list:
+    new_users = [
+        {"uuid": new_uuid(), "name": name, "group_uuid": group_id} for name in names
+    ]
+    async with session_factory() as db:
+        await UserRepository(db).create_users(new_users, ENRICHMENT_URL)
+    return [user["uuid"] for user in new_users]
+
+
+async def create_groups(session_factory, names: list[str]) -> list[str]:
+    async with session_factory() as db:
+        repository = GroupRepository(db)
+        return [(await repository.create_group(name)).uuid for name in names]
+
+
+async def scenarios(session_factory, seeded: dict, groups: int, requests: int):
+    """
+    Returns, by "METHOD /path" route key, a function turning the index of a
+    request into its method, URL and keyword arguments. Routes that delete
+    rows or change memberships get rows of their own, so every request finds
+    what it changes
+    """
+    group_ids, user_ids = seeded["group_ids"], seeded["user_ids"]
+    names = group_names(groups)
+    users, indexes = len(user_ids), range(requests)
+    doomed_users = await create_users(
+        session_factory, group_ids[0], [f"doomed-{i}" for i in indexes]
+    )
+    doomed_batches = await create_users(
+        session_factory,
+        group_ids[0],
+        [f"doomed-batch-{i}" for i in range(requests * BATCH_SIZE)],
+    )
+    doomed_groups = await create_groups(
+        session_factory, [f"doomed-{i}" for i in indexes]
+    )
+    joined_groups = await create_groups(
+        session_factory, [f"joined-{i}" for i in indexes]
+    )
+    left_groups = await create_groups(session_factory, [f"left-{i}" for i in indexes])
+    async with session_factory() as db:
+        repository = GroupRepository(db)
+        for group_id in left_groups:
+            await repository.add_members(group_id, user_ids[:BATCH_SIZE])
+
+    def new_user(i):
+        return {"user_name": f"load-user-{i}", "user_group": group_ids[0]}
+
+    def batch(i):
+        return [f"load-batch-{i}-{n}" for n in range(BATCH_SIZE)]
+
+    members = {"json": {"user_ids": user_ids[:BATCH_SIZE]}}
+
+    return {
+        "POST /user": lambda i: ("POST", "/user", {"json": new_user(i)}),
+        # every other name is a seeded user's, so half the inserts fail on
+        # the unique index while the other half wait for the write lock
+        "POST /user taken names": lambda i: (
+            "POST",
+            "/user",
+            {
+                "json": {
+                    "user_name": user_name(i % users) if i % 2 else f"taken-{i}",
+                    "user_group": group_ids[0],
+                }
+            },
+        ),
+        "POST /user/bulk": lambda i: (
+            "POST",
+            "/user/bulk",
+            {
+                "json": {
+                    "users": [
+                        {"user_name": name, "user_group": group_ids[0]}
+                        for name in batch(i)
+                    ]
+                }
+            },
+        ),
+        "GET /user": lambda i: (
+            "GET",
+            "/user",
+            {"params": {"limit": PAGE_SIZE, "name_prefix": f"user-{i % 10}"}},
+        ),
+        "GET /user/export": lambda i: ("GET", "/user/export", {}),
+        "GET /user/{user_id}": lambda i: ("GET", f"/user/{user_ids[i % users]}", {}),
+        "PUT /user/{user_id}": lambda i: (
+            "PUT",
+            f"/user/{user_ids[i % users]}",
+            {
+                "json": {
+                    "user_name": user_name(i % users),
+                    "group_name": names[i % users % groups],
+                }
+            },
+        ),
+        "DELETE /user/{user_id}": lambda i: ("DELETE", f"/user/{doomed_users[i]}", {}),
+        "DELETE /user": lambda i: (
+            "DELETE",
+            "/user",
+            {
+                "json": {
+                    "user_ids": doomed_batches[i * BATCH_SIZE : (i + 1) * BATCH_SIZE]
+                }
+            },
+        ),
+        # the seeded regular and admin groups hold the only names a group may
+        # take, so creating one answers 404 and renaming one keeps its name
+        "POST /group": lambda i: ("POST", "/group", {"json": {"name": names[i % 2]}}),
+        "GET /group": lambda i: ("GET", "/group", {"params": {"limit": PAGE_SIZE}}),
+        "GET /group/member-counts": lambda i: ("GET", "/group/member-counts", {}),
+        "GET /group/{group_id}": lambda i: (
+            "GET",
+            f"/group/{group_ids[i % groups]}",
+            {},
+        ),
+        "GET /group/{group_id}/members": lambda i: (
+            "GET",
+            f"/group/{group_ids[i % groups]}/members",
+            {"params": {"limit": PAGE_SIZE}},
+        ),
+        "PUT /group/{group_id}": lambda i: (
+            "PUT",
+            f"/group/{group_ids[i % 2]}",
+            {"json": {"name": names[i % 2]}},
+        ),
+        "DELETE /group/{group_id}": lambda i: (
+            "DELETE",
+            f"/group/{doomed_groups[i]}",
+            {},
+        ),
+        "POST /group/{group_id}/members": lambda i: (
+            "POST",
+            f"/group/{joined_groups[i]}/members",
+            members,
+        ),
+        "DELETE /group/{group_id}/members": lambda i: (
+            "DELETE",
+            f"/group/{left_groups[i]}/members",
+            members,
+        ),
+        "GET /stats/fetcher": lambda i: ("GET", "/stats/fetcher", {}),
+        "GET /stats/url-templates": lambda i: ("GET", "/stats/url-templates", {}),
+        "GET /stats/cache": lambda i: ("GET", "/stats/cache", {}),
+        "GET /stats/group-registry": lambda i: ("GET", "/stats/group-registry", {}),
+        "GET /stats/jobs": lambda i: ("GET", "/stats/jobs", {}),
+        "GET /metrics": lambda i: ("GET", "/metrics", {}),
+    }
+
+
+def route_keys() -> list[str]:
+    return [
+        f"{method} {route.path}"
+        for route in app.routes
+        if isinstance(route, APIRoute)
+        for method in sorted(route.methods)
+    ]
+
+
+async def load_route(client, calls, requests: int, concurrency: int) -> dict:
+    pending = iter(range(requests))
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    statements: list[int] = []
+
+    async def worker():
+        # the workers share one iterator, so each request is sent once
+        for i in pending:
+            method, url, kwargs = calls(i)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+            except httpx.TransportError as e:
+                # a dropped connection is a result of the run, not its end
+                statuses[type(e).__name__] += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            statuses[str(response.status_code)] += 1
+            # the 500 of an unhandled error is sent around the instrumentation
+            if "server-timing" in response.headers:
+                statements.append(statement_count(response))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        **summarize(latencies, elapsed),
+        "statements": round(statistics.mean(statements), 1) if statements else None,
+        "statuses": dict(statuses),
+    }
+
+
+async def run(users: int, groups: int, requests: int, concurrency: int) -> dict:
+    async with temporary_database() as (_, session_factory):
+        seeded = await seed_database(session_factory, users, groups)
+        routes = await scenarios(session_factory, seeded, groups, requests)
+        missing = sorted(set(route_keys()) - set(routes))
+        if missing:
+            raise SystemExit(f"no load scenario for {', '.join(missing)}")
+
+        # the lifespan already ran in temporary_database
+        server = uvicorn.Server(
+            uvicorn.Config(
+                app,
+                host="127.0.0.1",
+                port=0,
+                lifespan="off",
+                log_level="warning",
+                access_log=False,
+            )
+        )
+        serving = asyncio.create_task(server.serve())
+        while not server.started and not serving.done():
+            await asyncio.sleep(0.01)
+        if not server.started:
+            raise SystemExit("the server did not start")
+        port = server.servers[0].sockets[0].getsockname()[1]
+        try:
+            async with httpx.AsyncClient(
+                base_url=f"http://127.0.0.1:{port}",
+                limits=httpx.Limits(max_connections=concurrency),
+                timeout=60,
+            ) as client:
+                results = {
+                    key: await load_route(client, routes[key], requests, concurrency)
+                    for key in [*route_keys(), *EXTRA_SCENARIOS]
+                }
+        finally:
+            server.should_exit = True
+            await serving
+
+    return {
+        "users": users,
+        "groups": groups,
+        "requests": requests,
+        "concurrency": concurrency,
+        "routes": results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--groups", type=int, default=10)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--output", default="load.json")
+    args = parser.parse_args()
+    if args.groups < 2:
+        parser.error("--groups must be at least 2, regular and admin")
+    if args.users < BATCH_SIZE:
+        parser.error(f"--users must be at least {BATCH_SIZE}")
+    result = asyncio.run(run(args.users, args.groups, args.requests, args.concurrency))
+    with open(args.output, "w") as output:
+        json.dump(result, output, indent=2, sort_keys=True)
+    print(json.dumps({key: route["rps"] for key, route in result["routes"].items()}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark results file.
+
+Condenses the pytest-benchmark JSON of the service microbenchmarks and the
+JSON of the load driver into one file with sorted keys and rounded numbers,
+leaving out machine details and raw samples, so the results of two commits
+can be compared with a plain diff.
+
+    python -m benchmarks.results services.json load.json --output results.json
+"""
+
+import argparse
+import json
+
+
+def service_results(report: dict) -> dict:
+    return {
+        benchmark["name"]: {
+            "mean_ms": round(benchmark["stats"]["mean"] * 1000, 3),
+            "median_ms": round(benchmark["stats"]["median"] * 1000, 3),
+            "stddev_ms": round(benchmark["stats"]["stddev"] * 1000, 3),
+            "ops": round(benchmark["stats"]["ops"], 1),
+            "rounds": benchmark["stats"]["rounds"],
+        }
+        for benchmark in report["benchmarks"]
+    }
+
+
+def combine(services: dict, load: dict) -> dict:
+    return {
+        "commit": services.get("commit_info", {}).get("id"),
+        "services": service_results(services),
+        "load": load,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("services", help="pytest-benchmark JSON")
+    parser.add_argument("load", help="benchmarks.load JSON")
+    parser.add_argument("--output", default="benchmarks/results.json")
+    args = parser.parse_args()
+    with open(args.services) as services, open(args.load) as load:
+        results = combine(json.load(services), json.load(load))
+    with open(args.output, "w") as output:
+        json.dump(results, output, indent=2, sort_keys=True)
+        output.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""
+Benchmark data generator.
+
+Seeds groups and users into a fresh SQLite database through GroupRepository
+and UserRepository, the write paths the API itself uses. Every user belongs
+to one group in turn and every tenth user to the admin group as well, so
+users list more than one group.
+
+    python -m benchmarks.seed --users 10000 --groups 10 --database bench.db
+"""
+
+import argparse
+import asyncio
+import json
+import os
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.config import Settings
+from app.core.constants import BULK_CREATE_MAX_USERS, ENRICHMENT_URL, GroupType
+from app.core.database import Base, create_database_engine
+from app.core.ids import new_uuid
+from app.repository.group_repository import GroupRepository
+from app.repository.user_repository import UserRepository
+
+
+def group_names(groups: int) -> list[str]:
+    names = [GroupType.REGULAR.value, GroupType.ADMIN.value]
+    return (names + [f"group-{i}" for i in range(len(names), groups)])[:groups]
+
+
+def user_name(index: int) -> str:
+    return f"user-{index}"
+
+
+async def seed_database(session_factory, users: int, groups: int) -> dict:
+    """
+    Returns the ids of the seeded groups and users, in creation order; user
+    i is named user_name(i) and belongs to group i % groups
+    """
+    async with session_factory() as db:
+        group_repository = GroupRepository(db)
+        user_repository = UserRepository(db)
+        group_ids = [
+            (await group_repository.create_group(name)).uuid
+            for name in group_names(groups)
+        ]
+        user_ids = []
+        for start in range(0, users, BULK_CREATE_MAX_USERS):
+            new_users = [
+                {
+                    "uuid": new_uuid(),
+                    "name": user_name(i),
+                    "group_uuid": group_ids[i % groups],
+                }
+                for i in range(start, min(users, start + BULK_CREATE_MAX_USERS))
+            ]
+            await user_repository.create_users(new_users, ENRICHMENT_URL)
+            user_ids.extend(user["uuid"] for user in new_users)
+        await group_repository.add_members(group_ids[1], user_ids[::10])
+    return {"group_ids": group_ids, "user_ids": user_ids}
+
+
+async def run(database: str, users: int, groups: int) -> dict:
+    engine = create_database_engine(
+        Settings(database_url=f"sqlite+aiosqlite:///{database}")
+    )
+    try:
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        session_factory = async_sessionmaker(
+            bind=engine, autoflush=False, expire_on_commit=False
+        )
+        seeded = await seed_database(session_factory, users, groups)
+    finally:
+        await engine.dispose()
+    return {"groups": len(seeded["group_ids"]), "users": len(seeded["user_ids"])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--groups", type=int, default=10)
+    parser.add_argument("--database", default="bench.db")
+    args = parser.parse_args()
+    if args.groups < 2:
+        parser.error("--groups must be at least 2, regular and admin")
+    if os.path.exists(args.database):
+        parser.error(f"{args.database} already exists; seeding needs a fresh file")
+    print(json.dumps(asyncio.run(run(args.database, args.users, args.groups))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Response serialization benchmark.
+
+Builds a GET /user page of 10k users in the shape UserService returns and
+renders it the way FastAPI does for a response_model route (validate every
+item, dump to JSON-compatible data, encode with the stdlib json module), with
+a TypeAdapter validating and dumping straight to JSON, and with
+ORJSONResponse encoding the page as-is. Reports the best time of each path.
+
+    python -m benchmarks.serialization --users 10000
+"""
+
+import argparse
+import json
+import time
+import uuid
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+
+from app.schemas.user_schema import UserResponsePage
+
+PAGE_ADAPTER = TypeAdapter(UserResponsePage)
+
+
+def build_page(users: int) -> dict:
+    items = []
+    for _ in range(users):
+        user_id = str(uuid.uuid4())
+        items.append(
+            {
+                "uuid": user_id,
+                "name": f"user-{user_id[:8]}",
+                "group_name": ["regular"],
+                "url": {
+                    "current_user_url": "https://api.github.com/user",
+                    "user_url": f"https://api.github.com/users/{user_id}",
+                    "emails_url": "https://api.github.com/user/emails",
+                    "followers_url": "https://api.github.com/user/followers",
+                },
+                "version": 1,
+            }
+        )
+    return {"items": items, "next_cursor": None}
+
+
+def validated_stdlib(page: dict) -> bytes:
+    validated = PAGE_ADAPTER.validate_python(page)
+    return JSONResponse(PAGE_ADAPTER.dump_python(validated, mode="json")).body
+
+
+def validated_dump_json(page: dict) -> bytes:
+    return PAGE_ADAPTER.dump_json(PAGE_ADAPTER.validate_python(page))
+
+
+def orjson_response(page: dict) -> bytes:
+    return ORJSONResponse(page).body
+
+
+def best_of(render, page: dict, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        render(page)
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def run(users: int, repeat: int) -> dict:
+    page = build_page(users)
+    assert json.loads(validated_stdlib(page)) == json.loads(orjson_response(page))
+    results = {"users": users}
+    for render in (validated_stdlib, validated_dump_json, orjson_response):
+        seconds = best_of(render, page, repeat)
+        results[render.__name__] = {
+            "ms": round(seconds * 1000, 2),
+            "bytes": len(render(page)),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps(run(args.users, args.repeat)))
+
+
+if __name__ == "__main__":
+    main()
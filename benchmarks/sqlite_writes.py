@@ -0,0 +1,84 @@
+"""
+SQLite write throughput benchmark.
+
+Creates users through POST /user from a number of parallel writers while the
+same number of readers page through GET /user, once with SQLite's rollback
+journal and synchronous=FULL (the behaviour before the database settings
+existed) and once with the default settings (WAL and synchronous=NORMAL),
+each against a fresh database file. Reports throughput and latency
+percentiles of the writes and of the reads.
+
+    python -m benchmarks.sqlite_writes --clients 5 --users 500
+"""
+
+import argparse
+import asyncio
+import json
+import time
+
+import httpx
+
+from app.main import app
+from benchmarks.common import summarize, temporary_database
+
+JOURNAL_MODES = {
+    "rollback_journal": {"sqlite_journal_mode": "DELETE", "sqlite_synchronous": "FULL"},
+    "wal": {},
+}
+
+
+async def measure(clients: int, users: int, settings: dict) -> dict:
+    async with temporary_database(**settings):
+        writes: list[float] = []
+        reads: list[float] = []
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url="http://bench"
+        ) as client:
+            response = await client.post("/group", json={"name": "regular"})
+            response.raise_for_status()
+            group_id = response.json()["uuid"]
+            writing = True
+
+            async def writer(offset: int):
+                for i in range(offset, users, clients):
+                    started = time.perf_counter()
+                    response = await client.post(
+                        "/user", json={"user_name": f"user-{i}", "user_group": group_id}
+                    )
+                    writes.append(time.perf_counter() - started)
+                    response.raise_for_status()
+
+            async def reader():
+                while writing:
+                    started = time.perf_counter()
+                    response = await client.get("/user", params={"limit": 50})
+                    reads.append(time.perf_counter() - started)
+                    if response.status_code != 400:
+                        response.raise_for_status()
+
+            readers = [asyncio.create_task(reader()) for _ in range(clients)]
+            started = time.perf_counter()
+            await asyncio.gather(*(writer(n) for n in range(clients)))
+            elapsed = time.perf_counter() - started
+            writing = False
+            await asyncio.gather(*readers)
+    return {"writes": summarize(writes, elapsed), "reads": summarize(reads, elapsed)}
+
+
+async def run(clients: int, users: int) -> dict:
+    results = {"clients": clients, "users": users}
+    for name, settings in JOURNAL_MODES.items():
+        results[name] = await measure(clients, users, settings)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--clients", type=int, default=5)
+    parser.add_argument("--users", type=int, default=500)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.clients, args.users))))
+
+
+if __name__ == "__main__":
+    main()
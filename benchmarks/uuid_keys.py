@@ -0,0 +1,120 @@
+"""
+UUID primary key benchmark.
+
+Inserts users and one group membership per user into the user and user_group
+tables, once with keys stored as 36-character strings and once as 16-byte
+GUIDs, each with random (version 4) and time-ordered (version 7) keys.
+Reports insert throughput and the on-disk size of every table and index,
+read from SQLite's dbstat table.
+
+    python -m benchmarks.uuid_keys --rows 1000000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+import uuid
+
+from sqlalchemy import MetaData, String, insert, text
+from sqlalchemy.schema import Column, ForeignKey, Index, Table
+
+from app.core.config import Settings
+from app.core.database import create_database_engine
+from app.core.ids import GUID, uuid7
+
+BATCH_SIZE = 10000
+GROUPS = 10
+KEY_TYPES = {"string": String, "binary": GUID}
+KEY_VERSIONS = {"uuid4": uuid.uuid4, "uuid7": uuid7}
+
+
+def build_tables(key_type) -> MetaData:
+    """
+    Returns the user and user_group tables with the indexes of the models,
+    their keys declared as key_type
+    """
+    metadata = MetaData()
+    Table(
+        "user",
+        metadata,
+        Column("uuid", key_type, primary_key=True),
+        Column("name", String, unique=True, index=True),
+    )
+    Table(
+        "user_group",
+        metadata,
+        Column("user_uuid", key_type, ForeignKey("user.uuid"), primary_key=True),
+        Column("group_uuid", key_type, primary_key=True),
+        Index("ix_user_group_group_uuid_user_uuid", "group_uuid", "user_uuid"),
+    )
+    return metadata
+
+
+async def measure(key_type, new_key, rows: int) -> dict:
+    metadata = build_tables(key_type)
+    user, user_group = metadata.tables["user"], metadata.tables["user_group"]
+    group_ids = [str(new_key()) for _ in range(GROUPS)]
+    with tempfile.TemporaryDirectory() as directory:
+        url = f"sqlite+aiosqlite:///{os.path.join(directory, 'bench.db')}"
+        engine = create_database_engine(Settings(database_url=url))
+        try:
+            async with engine.begin() as connection:
+                await connection.run_sync(metadata.create_all)
+            started = time.perf_counter()
+            for start in range(0, rows, BATCH_SIZE):
+                user_ids = [
+                    str(new_key()) for _ in range(min(BATCH_SIZE, rows - start))
+                ]
+                async with engine.begin() as connection:
+                    await connection.execute(
+                        insert(user),
+                        [
+                            {"uuid": user_id, "name": f"user-{start + i}"}
+                            for i, user_id in enumerate(user_ids)
+                        ],
+                    )
+                    await connection.execute(
+                        insert(user_group),
+                        [
+                            {"user_uuid": user_id, "group_uuid": group_ids[i % GROUPS]}
+                            for i, user_id in enumerate(user_ids)
+                        ],
+                    )
+            elapsed = time.perf_counter() - started
+            async with engine.connect() as connection:
+                sizes = (
+                    await connection.execute(
+                        text("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name")
+                    )
+                ).all()
+        finally:
+            await engine.dispose()
+    return {
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(rows / elapsed, 1),
+        "mib": {name: round(size / 2**20, 2) for name, size in sorted(sizes)},
+    }
+
+
+async def run(rows: int) -> dict:
+    results = {"rows": rows}
+    for type_name, key_type in KEY_TYPES.items():
+        for version_name, new_key in KEY_VERSIONS.items():
+            results[f"{type_name}_{version_name}"] = await measure(
+                key_type, new_key, rows
+            )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(run(args.rows))))
+
+
+if __name__ == "__main__":
+    main()